@@ -0,0 +1,198 @@
+"""
+Query API over the processed sites, so a client fetches only what is on screen
+instead of the whole sites.json.
+
+Sites are loaded once at startup into a geohash-bucketed index (common/geohash.py).
+Every response is compact JSON, gzipped when the client accepts it, and carries an ETag
+so unchanged results revalidate with an empty 304.
+
+  GET /sites?bbox=west,south,east,north[&category=museums,landmarks]
+  GET /sites/nearby?lat=40.7484&lng=-73.9857[&radius=500][&category=...][&limit=50]   (limit <= 500)
+  GET /sites/<id>
+
+  python src/api/app.py --port 5000
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import sys
+
+from flask import Flask, request
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+from common.geohash import GeohashIndex
+from common.paths import SITES_JSON_PATH
+from common.site import read_sites
+
+# Nearby searches default to this radius and are capped at the second, in meters
+DEFAULT_RADIUS_M = 500
+MAX_RADIUS_M = 5000
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Responses smaller than this are not worth compressing
+MIN_GZIP_BYTES = 512
+
+
+class SiteStore:
+    """The sites' JSON records, keyed by id, plus the spatial index over the ones with coordinates."""
+
+    def __init__(self, sites):
+        self.sites = {site.id: site.to_dict() for site in sites}
+        self.index = GeohashIndex(
+            (key, site["latitude"], site["longitude"]) for key, site in self.sites.items()
+            if site.get("latitude") is not None and site.get("longitude") is not None
+        )
+
+    @classmethod
+    def load(cls, path=SITES_JSON_PATH):
+        return cls(read_sites(path))
+
+    def in_bbox(self, south, west, north, east, categories=None):
+        return [self.sites[key] for key in self.index.in_bbox(south, west, north, east)
+                if not categories or self.sites[key].get("category") in categories]
+
+    def nearby(self, lat, lng, radius_m, categories=None, limit=DEFAULT_LIMIT):
+        results = []
+        for distance, key in self.index.nearby(lat, lng, radius_m):
+            site = self.sites[key]
+            if categories and site.get("category") not in categories:
+                continue
+            results.append(dict(site, distance_m=round(distance, 1)))
+            if len(results) >= limit:
+                break
+        return results
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def json_response(payload, status=200):
+    """Compact JSON, gzipped if accepted, with an ETag over the bytes sent (304 on a match)."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    response = Flask.response_class(body, status=status, mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    if len(body) >= MIN_GZIP_BYTES and "gzip" in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+        response.headers["Content-Encoding"] = "gzip"
+    if status == 200:
+        response.add_etag()
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+    return response
+
+
+def _float_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None:
+        if default is None:
+            raise BadRequest(f"missing '{name}'")
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be a number")
+    # float() also takes "nan" and "inf"
+    if not math.isfinite(number):
+        raise BadRequest(f"'{name}' must be a finite number")
+    return number
+
+
+def _limit_arg():
+    """A positive whole number, capped at MAX_LIMIT."""
+    value = request.args.get("limit")
+    if value is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest("'limit' must be a positive whole number")
+    if limit < 1:
+        raise BadRequest("'limit' must be a positive whole number")
+    return min(limit, MAX_LIMIT)
+
+
+def _check_lat_lng(lat, lng):
+    if not -90 <= lat <= 90:
+        raise BadRequest("latitudes must be between -90 and 90")
+    if not -180 <= lng <= 180:
+        raise BadRequest("longitudes must be between -180 and 180")
+
+
+def _categories_arg():
+    value = request.args.get("category")
+    return {part.strip() for part in value.split(",") if part.strip()} if value else None
+
+
+def _bbox_arg():
+    """Leaflet's map.getBounds().toBBoxString() order: west,south,east,north."""
+    try:
+        west, south, east, north = (float(part) for part in request.args["bbox"].split(","))
+    except ValueError:
+        raise BadRequest("bbox must be west,south,east,north")
+    if not all(math.isfinite(value) for value in (west, south, east, north)):
+        raise BadRequest("bbox must be finite numbers")
+    _check_lat_lng(south, west)
+    _check_lat_lng(north, east)
+    if south > north or west > east:
+        raise BadRequest("bbox must be west,south,east,north")
+    return south, west, north, east
+
+
+def create_app(sites_path=SITES_JSON_PATH, store=None):
+    app = Flask(__name__)
+    store = store or SiteStore.load(sites_path)
+    app.config["SITE_STORE"] = store
+
+    @app.errorhandler(BadRequest)
+    def bad_request(error):
+        return json_response({"error": str(error)}, status=400)
+
+    @app.get("/sites")
+    def sites_in_bbox():
+        categories = _categories_arg()
+        if "bbox" not in request.args:
+            sites = [site for site in store.sites.values()
+                     if not categories or site.get("category") in categories]
+        else:
+            sites = store.in_bbox(*_bbox_arg(), categories)
+        return json_response({"count": len(sites), "sites": sites})
+
+    @app.get("/sites/nearby")
+    def sites_nearby():
+        lat, lng = _float_arg("lat"), _float_arg("lng")
+        _check_lat_lng(lat, lng)
+        radius = _float_arg("radius", DEFAULT_RADIUS_M)
+        if not 0 < radius <= MAX_RADIUS_M:
+            raise BadRequest(f"radius must be between 0 and {MAX_RADIUS_M} meters")
+        sites = store.nearby(lat, lng, radius, _categories_arg(), _limit_arg())
+        return json_response({"count": len(sites), "sites": sites})
+
+    @app.get("/sites/<site_id>")
+    def site_detail(site_id):
+        site = store.sites.get(site_id)
+        if site is None:
+            return json_response({"error": f"no site with id {site_id}"}, status=404)
+        return json_response(site)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the site query API.")
+    parser.add_argument("--input", default=SITES_JSON_PATH)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app(args.input)
+    print(f"Loaded {len(app.config['SITE_STORE'].sites)} sites")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
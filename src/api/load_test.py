@@ -0,0 +1,162 @@
+"""
+Load test: the query API against the current approach of downloading the whole
+static sites.json.
+
+Both are served locally (the API with Werkzeug's threaded server, sites.json with
+http.server), and the same number of clients hit each with keep-alive sessions.
+Each API request is a random viewport-sized bbox or nearby query around Manhattan;
+the revalidation scenario repeats requests with If-None-Match.
+
+Started in-process, the servers share the interpreter (and GIL) with the clients, so
+absolute numbers are pessimistic; for deployment figures run the API under a real WSGI
+server and pass --api-url.
+
+  python src/api/load_test.py
+  python src/api/load_test.py --requests 2000 --concurrency 16
+  python src/api/load_test.py --api-url http://127.0.0.1:5000   # against a running server
+"""
+import argparse
+import functools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from werkzeug.serving import make_server
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+from app import create_app
+from common.paths import PROCESSED_DIR
+
+# Roughly what a phone/laptop map shows at zoom 15-16 around Midtown
+VIEW_HEIGHT, VIEW_WIDTH = 0.02, 0.03
+CENTER_LAT, CENTER_LNG = 40.7580, -73.9855
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_static_server(directory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def start_api_server():
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def random_bbox(rng):
+    lat = CENTER_LAT + rng.uniform(-0.08, 0.08)
+    lng = CENTER_LNG + rng.uniform(-0.06, 0.06)
+    return f"{lng:.5f},{lat:.5f},{lng + VIEW_WIDTH:.5f},{lat + VIEW_HEIGHT:.5f}"
+
+
+def random_nearby(rng):
+    lat = CENTER_LAT + rng.uniform(-0.08, 0.08)
+    lng = CENTER_LNG + rng.uniform(-0.06, 0.06)
+    return f"lat={lat:.5f}&lng={lng:.5f}&radius=800"
+
+
+def run(urls, concurrency, conditional=False):
+    """
+    Fetches every URL with `concurrency` threads, one keep-alive session each.
+    Returns (latencies in ms, wall time, bytes transferred).
+    """
+    local = threading.local()
+    etags = {}
+    transferred = [0]
+    lock = threading.Lock()
+
+    def fetch_one(url):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+        start = time.perf_counter()
+        response = session.get(url, headers=headers, stream=True)
+        raw = response.raw.read(decode_content=False)
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{url}: HTTP {response.status_code}")
+        if "ETag" in response.headers:
+            etags[url] = response.headers["ETag"]
+        with lock:
+            transferred[0] += len(raw)
+        return elapsed
+
+    if conditional:
+        # Prime the ETags so the timed run is all revalidations
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fetch_one, dict.fromkeys(urls)))
+        transferred[0] = 0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(fetch_one, urls))
+    return latencies, time.perf_counter() - start, transferred[0]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def report(name, latencies, wall, transferred):
+    print(f"{name:<28} {percentile(latencies, 50):>8.2f}ms {percentile(latencies, 99):>8.2f}ms "
+          f"{len(latencies) / wall:>9.0f} {transferred / len(latencies) / 1024:>10.1f} KB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the site API against static sites.json.")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--api-url", help="test this running API instead of starting one")
+    parser.add_argument("--static-url", help="URL of sites.json to test instead of serving it locally")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    servers = []
+    static_url = args.static_url
+    if not static_url:
+        server, base = start_static_server(PROCESSED_DIR)
+        servers.append(server)
+        static_url = f"{base}/sites.json"
+    api_url = args.api_url
+    if not api_url:
+        server, api_url = start_api_server()
+        servers.append(server)
+
+    rng = random.Random(args.seed)
+    # A small pool of distinct views, so repeated requests can revalidate
+    bbox_urls = [f"{api_url}/sites?bbox={random_bbox(rng)}" for _ in range(args.requests)]
+    nearby_urls = [f"{api_url}/sites/nearby?{random_nearby(rng)}" for _ in range(args.requests)]
+    revisit_urls = [rng.choice(bbox_urls[:50]) for _ in range(args.requests)]
+
+    print(f"{args.requests} requests per scenario, {args.concurrency} concurrent clients")
+    print(f"{'scenario':<28} {'p50':>10} {'p99':>10} {'req/s':>9} {'avg bytes':>13}")
+    report("static sites.json", *run([static_url] * args.requests, args.concurrency))
+    report("GET /sites?bbox=", *run(bbox_urls, args.concurrency))
+    report("GET /sites/nearby", *run(nearby_urls, args.concurrency))
+    report("GET /sites?bbox= (304)", *run(revisit_urls, args.concurrency, conditional=True))
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
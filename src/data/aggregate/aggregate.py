@@ -1,61 +1,289 @@
-import json
+import argparse
+import hashlib
 import os
+import sys
+import time
 
-def main():
-    # 1) Define the mapping of filenames to categories
-    file_category_map = {
-        "designated_landmarks.json": "landmarks",
-        "libraries.json": "libraries",
-        "museums.json": "museums",
-        "national_historic_landmarks.json": "landmarks",
-        "national_monuments.json": "monuments",
-        "national_register_historical_places.json": "historical places",
-        "performing_arts.json": "performing arts",
-        "tourist_attractions.json": "tourist attractions",
-        "zoos_gardens.json": "zoos and gardens"
-    }
-
-    # 2) Paths to raw data and processed data
-    raw_dir = os.path.join("..", "..", "..", "data", "raw")
-    processed_dir = os.path.join("..", "..", "..", "data", "processed")
-    output_file = os.path.join(processed_dir, "sites.json")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import instrument
+from common import serialization
+from common.boroughs import list_page_borough
+from common.paths import PROCESSED_DIR, RAW_DIR, SITES_DB_PATH
+from common.site import Category, Site, read_sites, write_sites
+from geocode.coordinates import parse_coordinate_column
+
+# 1) Mapping of raw filenames to categories (Category only has what the frontend's iconMap draws)
+FILE_CATEGORY_MAP = {
+    "designated_landmarks.json": Category.LANDMARKS,
+    "libraries.json": Category.LIBRARIES,
+    "museums.json": Category.MUSEUMS,
+    "national_historic_landmarks.json": Category.LANDMARKS,
+    # There is no monuments marker: "monuments" used to come out grey on the map
+    "national_monuments.json": Category.LANDMARKS,
+    "national_register_historical_places.json": Category.HISTORICAL_PLACES,
+    "performing_arts.json": Category.PERFORMING_ARTS,
+    "skyscrapers.json": Category.SKYSCRAPERS,
+    "tourist_attractions.json": Category.TOURIST_ATTRACTIONS,
+    "zoos_gardens.json": Category.ZOOS_AND_GARDENS
+}
+
+OUTPUT_FILE = os.path.join(PROCESSED_DIR, "sites.json")
+
+# Fingerprints from the last aggregation: per raw file, its hash and its records' fingerprints
+STATE_FILE = os.path.join(PROCESSED_DIR, "aggregate_state.json")
+
+# What the last aggregation added / changed / removed, for downstream stages (pipeline.py --delta)
+MANIFEST_FILE = os.path.join(PROCESSED_DIR, "changes.json")
+
+
+def file_digest(filepath):
+    """sha256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def record_fingerprint(entry):
+    """Hash of the raw fields that later stages derive from (name, link, location, image)."""
+    raw = "\x1f".join(entry.get(k, "") or "" for k in ("name", "wikipedia_link", "location", "image"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_entry(entry, category):
+    # Build a new Site from a raw record; its id is derived from category, name and link.
+    # Rows of a per-borough list page keep that borough for areas/tag_areas.py to check
+    # against; files scraped before the field existed still name the page in their image link
+    listed_borough = entry.get("listed_borough") or list_page_borough(entry.get("image", ""))
+    return Site(
+        name=entry.get("name", "Unknown"),
+        category=category,
+        image=entry.get("image", ""),  # or None
+        location=entry.get("location", ""),  # can be address or lat/lon
+        wikipedia_link=entry.get("wikipedia_link", ""),
+        extra={"listed_borough": listed_borough} if listed_borough else None
+    )
 
-    # Ensure processed_dir exists
-    os.makedirs(processed_dir, exist_ok=True)
 
-    # 3) Accumulate data in a single list
+def read_entries(filepath, category):
+    """{id: bare Site} for a raw file's records, the first of any duplicates winning."""
+    entries = {}
+    for entry in serialization.load_raw(filepath):
+        new_entry = build_entry(entry, category)
+        entries.setdefault(new_entry.id, new_entry)
+    return entries
+
+
+def fill_coordinates(sites):
+    """
+    Fills coordinates that the scrapers captured as text (geo-dms / geo-dec),
+    so those sites never need geocoding.
+    """
+    lats, lngs, unparsed = parse_coordinate_column([site.location for site in sites])
+    unparsed_rows = set(unparsed.tolist())
+    for i, site in enumerate(sites):
+        if i not in unparsed_rows:
+            site.latitude = float(lats[i])
+            site.longitude = float(lngs[i])
+    print(f"Parsed coordinates for {len(sites) - len(unparsed_rows)} entries; "
+          f"{len(unparsed_rows)} left for geocoding")
+
+
+def aggregate(raw_dir=RAW_DIR, previous_sites=None, previous_state=None):
+    """
+    Builds the site list from the raw files.
+
+    With previous_sites / previous_state (incremental mode), records whose raw
+    fingerprint is unchanged are carried forward as already processed (coordinates,
+    resolved image, ...), raw files whose hash is unchanged are not even re-read, and
+    only new or changed records come out bare. The user's "visited" value is kept even
+    for changed records.
+
+    A merged record (clean/dedupe.py) stands for every record in its merged_ids. It is
+    carried forward only while all of them are unchanged; otherwise it is dropped and the
+    ones still in the raw files come out bare (as changed), for dedupe to merge again.
+
+    Returns (sites, state, manifest).
+    """
+    previous_by_id = {}
+    for site in previous_sites or []:
+        for key in site.merged_ids or [site.id]:
+            previous_by_id[key] = site
+    previous_files = (previous_state or {}).get("files", {})
+    # Per merged record's id: the record, its unchanged members' raw files, whether any changed
+    groups = {}
+
+    def group(site):
+        return groups.setdefault(site.id, {"site": site, "unchanged": {}, "dirty": False})
+
     all_sites = []
+    seen = set()
+    state = {"files": {}}
+    manifest = {"added": [], "changed": [], "removed": [], "unchanged": 0, "files": {}}
+    fresh = []
+    duplicates = 0
 
-    for filename, category in file_category_map.items():
+    for filename, category in FILE_CATEGORY_MAP.items():
         filepath = os.path.join(raw_dir, filename)
-        if os.path.exists(filepath):
-            with open(filepath, "r", encoding="utf-8") as f:
-                try:
-                    data = json.load(f)
-                    # data is expected to be a list of site entries
-                    for entry in data:
-                        # Build a new entry that ensures we have
-                        # the five expected keys: name, image, location, wikipedia_link, category
-                        new_entry = {
-                            "name": entry.get("name", "Unknown"),
-                            "image": entry.get("image", ""),  # or None
-                            "location": entry.get("location", ""),  # can be address or lat/lon
-                            "wikipedia_link": entry.get("wikipedia_link", ""),
-                            "category": category
-                        }
-
-                        # Append to the master list
-                        all_sites.append(new_entry)
-                except json.JSONDecodeError:
-                    print(f"Warning: Could not decode JSON from file {filepath}. Skipping.")
-        else:
+        if not os.path.exists(filepath):
             print(f"Warning: {filepath} not found. Skipping.")
+            continue
+
+        digest = file_digest(filepath)
+        previous_file = previous_files.get(filename, {})
+
+        # Unchanged source: carry its records forward without parsing it again
+        if previous_by_id and previous_file.get("sha256") == digest:
+            manifest["files"][filename] = "unchanged"
+            state["files"][filename] = previous_file
+            for key in previous_file.get("records", {}):
+                if key in previous_by_id and key not in seen:
+                    seen.add(key)
+                    previous = previous_by_id[key]
+                    if previous.merged_ids:
+                        group(previous)["unchanged"][key] = filename
+                    else:
+                        all_sites.append(previous)
+                        manifest["unchanged"] += 1
+            continue
+
+        manifest["files"][filename] = "changed" if previous_file else "new"
+        try:
+            data = serialization.load_raw(filepath)
+        except ValueError as e:
+            print(f"Warning: Could not load {filepath} ({e}). Skipping.")
+            continue
+
+        fingerprints = {}
+        previous_fingerprints = previous_file.get("records", {})
+        # data is expected to be a list of site entries
+        for entry in data:
+            new_entry = build_entry(entry, category)
+            key = new_entry.id
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            fingerprint = record_fingerprint(entry)
+            fingerprints[key] = fingerprint
+
+            previous = previous_by_id.get(key)
+            if previous is not None:
+                # Without a fingerprint from last time (first incremental run), the processed
+                # record is adopted as the baseline: it may hold hand-edited locations
+                unchanged = previous_fingerprints.get(key, fingerprint) == fingerprint
+                if unchanged and previous.merged_ids:
+                    group(previous)["unchanged"][key] = filename
+                    continue
+                if unchanged:
+                    all_sites.append(previous)
+                    manifest["unchanged"] += 1
+                    continue
+                if previous.merged_ids:
+                    group(previous)["dirty"] = True
+                new_entry.visited = previous.visited
+                manifest["changed"].append(key)
+            else:
+                manifest["added"].append(key)
+
+            all_sites.append(new_entry)
+            fresh.append(new_entry)
+
+        state["files"][filename] = {"sha256": digest, "records": fingerprints}
+
+    # Records that came from a raw file last time but no longer exist there are removed;
+    # records no raw file ever produced (added by hand) are kept as they are
+    tracked = {key for info in previous_files.values() for key in info.get("records", {})}
+    for site in previous_sites or []:
+        members = site.merged_ids or [site.id]
+        gone = [key for key in members if key not in seen]
+        if not gone:
+            continue
+        if any(key in tracked for key in members):
+            manifest["removed"].extend(key for key in gone if key in tracked)
+            if site.merged_ids:
+                group(site)["dirty"] = True
+        else:
+            all_sites.append(site)
+            seen.update(members)
+
+    # Merged records whose members are all unchanged go on as they are; the others split
+    # back into their members, re-read from the raw files
+    raw_entries = {}
+    for info in groups.values():
+        site = info["site"]
+        if not info["dirty"]:
+            all_sites.append(site)
+            manifest["unchanged"] += len(info["unchanged"])
+            continue
+        for key, filename in info["unchanged"].items():
+            if filename not in raw_entries:
+                raw_entries[filename] = read_entries(os.path.join(raw_dir, filename), FILE_CATEGORY_MAP[filename])
+            new_entry = raw_entries[filename][key]
+            new_entry.visited = site.visited
+            manifest["changed"].append(key)
+            all_sites.append(new_entry)
+            fresh.append(new_entry)
+
+    if fresh:
+        fill_coordinates(fresh)
+    if duplicates:
+        print(f"Skipped {duplicates} duplicate entries (same category, name and link)")
+
+    manifest["generated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return all_sites, state, manifest
+
+
+def store_records(db_path, sites):
+    """Writes the raw files read and the aggregated sites to the SQLite store (store/sitedb.py)."""
+    from store.sitedb import SiteDB  # imported here: store.sitedb imports FILE_CATEGORY_MAP from this module
+
+    db = SiteDB(db_path)
+    try:
+        for filename, category in FILE_CATEGORY_MAP.items():
+            filepath = os.path.join(RAW_DIR, filename)
+            if os.path.exists(filepath):
+                db.write_raw(filename, serialization.load_raw(filepath), category)
+        written, deleted = db.write_sites(sites)
+    finally:
+        db.close()
+    print(f"Stored {written} sites in {db_path} ({deleted} removed)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate the raw scraper output into sites.json.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="merge only new/changed records into the existing sites.json")
+    parser.add_argument("--db", nargs="?", const=SITES_DB_PATH,
+                        help="also store the raw and aggregated records in the SQLite store")
+    args = parser.parse_args()
+
+    # Ensure processed_dir exists
+    os.makedirs(PROCESSED_DIR, exist_ok=True)
+
+    previous_sites, previous_state = None, None
+    if args.incremental and os.path.exists(OUTPUT_FILE):
+        previous_sites = read_sites(OUTPUT_FILE)
+        if os.path.exists(STATE_FILE):
+            previous_state = serialization.load(STATE_FILE)
+
+    with instrument.span("aggregate", incremental=args.incremental) as fields:
+        all_sites, state, manifest = aggregate(RAW_DIR, previous_sites, previous_state)
+        fields["records_out"] = len(all_sites)
+
+    # Write the aggregated sites, the fingerprints and the change manifest
+    write_sites(all_sites, OUTPUT_FILE)
+    serialization.dump(state, STATE_FILE)
+    serialization.dump(manifest, MANIFEST_FILE)
+
+    if args.db:
+        store_records(args.db, all_sites)
 
-    # 4) Write the aggregated sites to sites.json
-    with open(output_file, "w", encoding="utf-8") as out:
-        json.dump(all_sites, out, indent=2, ensure_ascii=False)
+    print(f"Aggregated {len(all_sites)} entries into {OUTPUT_FILE}: "
+          f"{len(manifest['added'])} added, {len(manifest['changed'])} changed, "
+          f"{len(manifest['removed'])} removed, {manifest['unchanged']} unchanged")
 
-    print(f"Aggregated {len(all_sites)} entries into {output_file}")
 
 if __name__ == "__main__":
     main()
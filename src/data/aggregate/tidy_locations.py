@@ -1,16 +1,30 @@
-import json
+import os
+import sys
 
-# Load the JSON file
-with open("../../../data/processed/sites.json", "r", encoding="utf-8") as file:
-    data = json.load(file)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import SITES_JSON_PATH
+from common.site import read_sites, write_sites
 
-# Process each entry
-for entry in data:
-    if entry.get("location") == "New York, NY":
-        entry["location"] = f'{entry["name"]}, New York, NY'
 
-# Save the updated JSON
-with open("../../../data/processed/sites.json", "w", encoding="utf-8") as file:
-    json.dump(data, file, indent=2)
+def tidy_locations(sites):
+    """Replaces bare "New York, NY" locations with "<name>, New York, NY" so they can be geocoded."""
+    for site in sites:
+        if site.location == "New York, NY":
+            site.location = f"{site.name}, New York, NY"
+    return sites
 
-print("Update complete! Locations updated where necessary.")
+
+def main():
+    # Load the JSON file
+    sites = read_sites(SITES_JSON_PATH)
+
+    tidy_locations(sites)
+
+    # Save the updated JSON
+    write_sites(sites, SITES_JSON_PATH)
+
+    print("Update complete! Locations updated where necessary.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Tags every site with the borough and neighborhood (NTA) its coordinates fall in, from
+boundary polygons in local GeoJSON files:
+  data/external/borough_boundaries.geojson   NYC Open Data "Borough Boundaries"
+  data/external/nta_boundaries.geojson       NYC Open Data "2020 Neighborhood Tabulation Areas"
+(or BOROUGH_BOUNDARIES_PATH / NTA_BOUNDARIES_PATH). Either file is enough: NTAs carry
+their borough's name. All sites are located in one vectorized pass per file through
+common/polygons.py (an STRtree with shapely installed, a banded numpy test without).
+
+The result is cross-checked against the borough of the list page a site was scraped
+from ("listed_borough", see common/boroughs.py): a site placed in another borough, or
+outside all of them, almost always has a bad geocode. Those are printed, and when run as
+a script also written to data/processed/area_check.json (or --check; --check "" to skip).
+The file is only written when something is flagged.
+
+  python areas/tag_areas.py
+  python areas/tag_areas.py --engine numpy
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import instrument
+from common import serialization
+from common.boroughs import normalize_borough
+from common.paths import EXTERNAL_DIR, PROCESSED_DIR, SITES_JSON_PATH
+from common.polygons import ENGINES, PolygonIndex
+from common.site import SiteTable, read_sites, write_sites
+
+BOROUGH_BOUNDARIES_PATH = os.getenv("BOROUGH_BOUNDARIES_PATH",
+                                    os.path.join(EXTERNAL_DIR, "borough_boundaries.geojson"))
+NTA_BOUNDARIES_PATH = os.getenv("NTA_BOUNDARIES_PATH", os.path.join(EXTERNAL_DIR, "nta_boundaries.geojson"))
+
+# Sites whose coordinates disagree with their list page, or lie outside every borough
+AREA_CHECK_PATH = os.path.join(PROCESSED_DIR, "area_check.json")
+
+# Property names used for the area's name across versions of the Open Data exports
+BOROUGH_NAME_KEYS = ("boro_name", "boroname", "BoroName", "borough")
+NTA_NAME_KEYS = ("ntaname", "NTAName", "nta_name")
+
+# How many flagged sites to print
+SHOW_FLAGGED = 10
+
+
+def first_property(properties, keys):
+    for key in keys:
+        if properties.get(key):
+            return properties[key]
+    return None
+
+
+class Areas:
+    """The named polygons of one boundary file, with their index."""
+
+    def __init__(self, features, name_keys, engine=None):
+        features = [feature for feature in features if feature.get("geometry")]
+        properties = [feature.get("properties") or {} for feature in features]
+        self.names = [first_property(props, name_keys) for props in properties]
+        self.boroughs = [normalize_borough(first_property(props, BOROUGH_NAME_KEYS)) for props in properties]
+        self.index = PolygonIndex([feature["geometry"] for feature in features], engine)
+
+    @classmethod
+    def load(cls, path, name_keys, engine=None):
+        """The areas in a GeoJSON file, or None if there is no such file."""
+        if not path or not os.path.exists(path):
+            return None
+        return cls(serialization.load(path)["features"], name_keys, engine)
+
+    def locate(self, lngs, lats):
+        """Row of the area each point is in, -1 for none."""
+        return self.index.locate(lngs, lats)
+
+
+def tag_areas(sites, borough_path=BOROUGH_BOUNDARIES_PATH, nta_path=NTA_BOUNDARIES_PATH,
+              engine=None, check_path=None):
+    """
+    Pipeline stage: sets "borough" and "neighborhood" on every site inside the boundaries,
+    and reports the ones that contradict their list page's borough (also to check_path,
+    if given and any are flagged).
+    A site outside every borough keeps the borough it had (e.g. from Wikidata).
+    """
+    boroughs = Areas.load(borough_path, BOROUGH_NAME_KEYS, engine)
+    ntas = Areas.load(nta_path, NTA_NAME_KEYS, engine)
+    if boroughs is None and ntas is None:
+        print(f"Warning: no boundary files ({borough_path}, {nta_path}) found; sites are not tagged.")
+        return sites
+
+    # 1) Locate every site in one pass per boundary file
+    table = SiteTable.from_sites(sites)
+    start = time.perf_counter()
+    with instrument.span("areas.locate", points=len(sites)):
+        borough_rows = boroughs.locate(table.longitudes, table.latitudes) if boroughs else None
+        nta_rows = ntas.locate(table.longitudes, table.latitudes) if ntas else None
+    seconds = time.perf_counter() - start
+
+    # 2) Tag, and check against the list page
+    tagged = {"borough": 0, "neighborhood": 0}
+    mismatched, outside = [], []
+    for i, site in enumerate(sites):
+        borough = neighborhood = None
+        if nta_rows is not None and nta_rows[i] >= 0:
+            neighborhood = ntas.names[nta_rows[i]]
+            borough = ntas.boroughs[nta_rows[i]]
+        if borough_rows is not None and borough_rows[i] >= 0:
+            borough = normalize_borough(boroughs.names[borough_rows[i]]) or borough
+        if borough:
+            site.extra["borough"] = borough
+            tagged["borough"] += 1
+        if neighborhood:
+            site.extra["neighborhood"] = neighborhood
+            tagged["neighborhood"] += 1
+
+        if site.coords is None:
+            continue
+        listed = site.extra.get("listed_borough")
+        flag = {"id": site.id, "name": site.name, "category": str(site.category),
+                "location": site.location, "latitude": site.latitude, "longitude": site.longitude,
+                "listed_borough": listed, "found": borough}
+        if borough is None:
+            outside.append(flag)
+        elif listed and listed != borough:
+            mismatched.append(flag)
+
+    print(f"Located {len(sites)} sites ({boroughs.index.engine if boroughs else ntas.index.engine}) "
+          f"in {seconds * 1000:.1f} ms: {tagged['borough']} tagged with a borough, "
+          f"{tagged['neighborhood']} with a neighborhood")
+    print(f"{len(mismatched)} sites are outside the borough their list page names; "
+          f"{len(outside)} are outside every borough")
+    for flag in (mismatched + outside)[:SHOW_FLAGGED]:
+        print(f"  {flag['name']} ({flag['latitude']}, {flag['longitude']}): "
+              f"listed in {flag['listed_borough'] or '-'}, found in {flag['found'] or 'no borough'}")
+    if check_path and (mismatched or outside):
+        serialization.dump({"mismatched": mismatched, "outside": outside}, check_path)
+        print(f"Wrote the flagged sites to {check_path}")
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag sites with their borough and neighborhood.")
+    parser.add_argument("--boroughs", default=BOROUGH_BOUNDARIES_PATH, help="borough boundaries GeoJSON")
+    parser.add_argument("--ntas", default=NTA_BOUNDARIES_PATH, help="neighborhood (NTA) boundaries GeoJSON")
+    parser.add_argument("--engine", choices=ENGINES, help="default: shapely when installed, else numpy")
+    parser.add_argument("--check", default=AREA_CHECK_PATH, help="where to write the flagged sites")
+    args = parser.parse_args()
+
+    sites = read_sites(SITES_JSON_PATH)
+    tag_areas(sites, args.boroughs, args.ntas, args.engine, args.check)
+    write_sites(sites, SITES_JSON_PATH)
+
+
+if __name__ == "__main__":
+    main()
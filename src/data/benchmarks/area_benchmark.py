@@ -0,0 +1,191 @@
+"""
+Point-in-polygon throughput of areas/tag_areas.py: every point against the borough and
+neighborhood polygons in one pass (common/polygons.py, with each engine available)
+against a per-point loop that tests each polygon's bounding box and then its rings.
+
+Polygons come from the boundary files in data/external when they exist (or --synthetic
+is given); otherwise a synthetic city is used: a grid of jagged cells over the NYC
+bounding box as neighborhoods, grouped into five column strips as boroughs, sharing
+the same edges so they tile exactly. Points are uniform over the polygons' extent.
+
+  python benchmarks/area_benchmark.py
+  python benchmarks/area_benchmark.py --points 2500,250000 --segments 100
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from areas.tag_areas import (BOROUGH_BOUNDARIES_PATH, BOROUGH_NAME_KEYS, NTA_BOUNDARIES_PATH, NTA_NAME_KEYS,
+                             Areas)
+from common import serialization
+from common.boroughs import BOROUGHS
+from common.polygons import ENGINES, rings, shapely
+
+# South-west and north-east corners of the five boroughs
+NYC_BOUNDS = ((40.4774, -74.2591), (40.9176, -73.7004))
+
+# The per-point loop is only timed up to this many points
+LOOP_POINTS = 2500
+
+
+def synthetic_city(rows, cols, segments, seed=0):
+    """(borough features, neighborhood features) tiling NYC_BOUNDS, as GeoJSON dicts."""
+    rng = random.Random(seed)
+    (south, west), (north, east) = NYC_BOUNDS
+    height, width = (north - south) / rows, (east - west) / cols
+    corners = {}
+    for r in range(rows + 1):
+        for c in range(cols + 1):
+            inner = 0 < r < rows and 0 < c < cols
+            jitter_lat = rng.uniform(-0.3, 0.3) * height if inner else 0
+            jitter_lng = rng.uniform(-0.3, 0.3) * width if inner else 0
+            corners[r, c] = (west + c * width + jitter_lng, south + r * height + jitter_lat)
+
+    edges = {}
+
+    def edge(a, b):
+        """Points from corner a up to (not including) corner b, the same for both cells sharing it."""
+        key = (min(a, b), max(a, b))
+        if key not in edges:
+            (x0, y0), (x1, y1) = corners[key[0]], corners[key[1]]
+            length = math.hypot(x1 - x0, y1 - y0)
+            nx, ny = (y0 - y1) / length, (x1 - x0) / length
+            points = []
+            for k in range(segments):
+                t = k / segments
+                # Wiggles perpendicular to the edge, pinned at the corners
+                offset = rng.uniform(-0.08, 0.08) * length * math.sin(math.pi * t) if k else 0
+                points.append((x0 + (x1 - x0) * t + nx * offset, y0 + (y1 - y0) * t + ny * offset))
+            edges[key] = points
+        points = edges[key]
+        return points if key[0] == a else [corners[key[1]]] + points[:0:-1]
+
+    def ring(path):
+        points = [point for a, b in zip(path, path[1:]) for point in edge(a, b)]
+        return [list(point) for point in points + points[:1]]
+
+    strips = np.array_split(np.arange(cols), len(BOROUGHS))
+    boroughs, neighborhoods = [], []
+    for borough, strip in zip(BOROUGHS, strips):
+        first, last = int(strip[0]), int(strip[-1]) + 1
+        path = ([(0, c) for c in range(first, last + 1)] + [(r, last) for r in range(1, rows + 1)]
+                + [(rows, c) for c in range(last - 1, first - 1, -1)] + [(r, first) for r in range(rows - 1, -1, -1)])
+        boroughs.append({"type": "Feature", "properties": {"boro_name": borough},
+                         "geometry": {"type": "Polygon", "coordinates": [ring(path)]}})
+        for c in range(first, last):
+            for r in range(rows):
+                path = [(r, c), (r, c + 1), (r + 1, c + 1), (r + 1, c), (r, c)]
+                neighborhoods.append({"type": "Feature",
+                                      "properties": {"ntaname": f"Area {r}-{c}", "boroname": borough},
+                                      "geometry": {"type": "Polygon", "coordinates": [ring(path)]}})
+    return boroughs, neighborhoods
+
+
+def loop_locate(features, lngs, lats):
+    """The straightforward way: for each point, each polygon's box, then a ray cast over its rings."""
+    polygons = []
+    for feature in features:
+        feature_rings = [ring.tolist() for ring in rings(feature["geometry"])]
+        xs = [x for ring in feature_rings for x, _ in ring]
+        ys = [y for ring in feature_rings for _, y in ring]
+        polygons.append((min(xs), min(ys), max(xs), max(ys), feature_rings))
+    found = []
+    for x, y in zip(lngs.tolist(), lats.tolist()):
+        hit = -1
+        for i, (west, south, east, north, polygon_rings) in enumerate(polygons):
+            if not (west <= x <= east and south <= y <= north):
+                continue
+            inside = False
+            for ring in polygon_rings:
+                for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+                    if min(y0, y1) <= y < max(y0, y1) and x0 + (y - y0) * (x1 - x0) / (y1 - y0) > x:
+                        inside = not inside
+            if inside:
+                hit = i
+                break
+        found.append(hit)
+    return np.array(found, dtype=np.int64)
+
+
+def extent(features):
+    points = np.concatenate([ring for feature in features for ring in rings(feature["geometry"])])
+    return points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark borough / neighborhood tagging.")
+    parser.add_argument("--points", default="2500,250000", help="comma-separated point counts")
+    parser.add_argument("--synthetic", action="store_true", help="ignore the boundary files in data/external")
+    parser.add_argument("--grid", type=int, default=16, help="synthetic neighborhoods per side")
+    parser.add_argument("--segments", type=int, default=40, help="synthetic vertices per cell side")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.synthetic and os.path.exists(BOROUGH_BOUNDARIES_PATH) and os.path.exists(NTA_BOUNDARIES_PATH):
+        layers = {"borough": (serialization.load(BOROUGH_BOUNDARIES_PATH)["features"], BOROUGH_NAME_KEYS),
+                  "neighborhood": (serialization.load(NTA_BOUNDARIES_PATH)["features"], NTA_NAME_KEYS)}
+        print("Boundary files from data/external")
+    else:
+        boroughs, neighborhoods = synthetic_city(args.grid, args.grid, args.segments, args.seed)
+        layers = {"borough": (boroughs, BOROUGH_NAME_KEYS), "neighborhood": (neighborhoods, NTA_NAME_KEYS)}
+        print("Synthetic boundaries")
+    for layer, (features, _) in layers.items():
+        vertices = sum(len(ring) for feature in features for ring in rings(feature["geometry"]))
+        print(f"  {layer}: {len(features)} polygons, {vertices:,} vertices")
+
+    engines = [engine for engine in ENGINES if engine != "shapely" or shapely is not None]
+    if shapely is None:
+        print("(shapely not installed: numpy engine only)")
+    rng = np.random.default_rng(args.seed)
+    west, south, east, north = extent(layers["borough"][0])
+
+    print(f"\n{'layer':<14} {'engine':<8} {'build':>9} " + " ".join(f"{count:>12,}" for count in
+                                                                    map(int, args.points.split(","))))
+    for layer, (features, name_keys) in layers.items():
+        counts = [int(count) for count in args.points.split(",")]
+        points = {count: (rng.uniform(west, east, count), rng.uniform(south, north, count)) for count in counts}
+        results = {}
+        rows = []
+        for engine in engines:
+            start = time.perf_counter()
+            areas = Areas(features, name_keys, engine)
+            build = time.perf_counter() - start
+            cells = []
+            for count in counts:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    found = areas.locate(*points[count])
+                    best = min(best, time.perf_counter() - start)
+                results[engine, count] = found
+                cells.append(f"{best * 1000:>10.1f}ms")
+            rows.append(f"{layer:<14} {engine:<8} {build * 1000:>7.1f}ms " + " ".join(cells))
+
+        cells = []
+        for count in counts:
+            if count > LOOP_POINTS:
+                cells.append(f"{'-':>12}")
+                continue
+            start = time.perf_counter()
+            results["loop", count] = loop_locate(features, *points[count])
+            cells.append(f"{(time.perf_counter() - start) * 1000:>10.1f}ms")
+        rows.append(f"{layer:<14} {'loop':<8} {'-':>9} " + " ".join(cells))
+        print("\n".join(rows))
+
+        # Every engine must put every point in the same polygon
+        for (engine, count), found in results.items():
+            reference = results[engines[0], count]
+            assert np.array_equal(found, reference), (layer, engine, count, int((found != reference).sum()))
+        located = int((results[engines[0], counts[-1]] >= 0).sum())
+        print(f"{'':<14} {located:,} of {counts[-1]:,} points inside a polygon; engines agree")
+
+
+if __name__ == "__main__":
+    main()
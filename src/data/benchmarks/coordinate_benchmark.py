@@ -0,0 +1,57 @@
+"""
+Throughput of coordinate extraction on the NRHP raw file: a per-row loop over
+parse_coordinates against the single-pass parse_coordinate_column.
+
+  python benchmarks/coordinate_benchmark.py
+  python benchmarks/coordinate_benchmark.py --scale 100 --repeat 5
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import RAW_DIR
+from geocode.coordinates import parse_coordinate_column, parse_coordinates
+
+NRHP_JSON_PATH = os.path.join(RAW_DIR, "national_register_historical_places.json")
+
+
+def best_of(repeat, fn, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark coordinate parsing throughput.")
+    parser.add_argument("--input", default=NRHP_JSON_PATH)
+    parser.add_argument("--scale", type=int, default=1, help="repeat the input this many times")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as f:
+        texts = [record.get("location", "") for record in json.load(f)] * args.scale
+
+    loop_results, loop_time = best_of(args.repeat, lambda: [parse_coordinates(t) for t in texts])
+    (lats, lngs, unparsed), bulk_time = best_of(args.repeat, parse_coordinate_column, texts)
+
+    # Both paths must agree row for row
+    mismatches = 0
+    for i, expected in enumerate(loop_results):
+        got = None if math.isnan(lats[i]) else (float(lats[i]), float(lngs[i]))
+        mismatches += got != expected
+
+    print(f"Rows: {len(texts)}  parsed: {len(texts) - len(unparsed)}  unparsed: {len(unparsed)}")
+    print(f"Per-row loop:  {loop_time * 1000:8.1f} ms  ({len(texts) / loop_time:,.0f} rows/s)")
+    print(f"Column parse:  {bulk_time * 1000:8.1f} ms  ({len(texts) / bulk_time:,.0f} rows/s)")
+    print(f"Mismatches between the two: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
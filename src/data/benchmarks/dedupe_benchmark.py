@@ -0,0 +1,137 @@
+"""
+Precision/recall and timing of clean/dedupe.py.
+
+Ground truth comes from a labelled set built out of the real data: sites that share
+neither a name key nor a link with any other site (so, as far as the data tells, not
+duplicates of each other), plus
+  - planted duplicates: copies under another category with a reworded name ("X Building"
+    -> "Building at X", "Street" -> "St", "The" added, parenthetical dropped), up to 60 m
+    of coordinate jitter, and the link kept only 70% of the time
+  - planted near-misses: a neighbour 10-40 m away with a different house number, or with
+    another site's name
+Timing runs over the real sites.json and over --scale copies of it, spread apart.
+
+  python benchmarks/dedupe_benchmark.py
+  python benchmarks/dedupe_benchmark.py --scale 10
+"""
+import argparse
+import math
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from itertools import combinations
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from clean.dedupe import THRESHOLD, find_duplicates, name_key, name_tokens
+from common.paths import SITES_JSON_PATH
+from common.site import Category, read_sites
+
+CATEGORIES = [Category.LANDMARKS, Category.HISTORICAL_PLACES, Category.MUSEUMS,
+              Category.TOURIST_ATTRACTIONS, Category.SKYSCRAPERS]
+
+
+def jitter(site, rng, low, high):
+    distance = rng.uniform(low, high)
+    angle = rng.uniform(0, 2 * math.pi)
+    lat = site.latitude + distance * math.cos(angle) / 111320
+    lng = site.longitude + distance * math.sin(angle) / (111320 * math.cos(math.radians(site.latitude)))
+    return round(lat, 5), round(lng, 5)
+
+
+def reword(name, rng):
+    options = []
+    if name.endswith(" Building"):
+        options.append("Building at " + name[:-len(" Building")])
+    if "Street" in name:
+        options.append(name.replace("Street", "St."))
+    if "(" in name:
+        options.append(re.sub(r"\s*\(.*?\)", "", name))
+    options.append("The " + name)
+    options.append(name.upper())
+    options.append(name + " (Former)")
+    return rng.choice(options)
+
+
+def labelled_set(sites, rng, duplicates=300, near_misses=200):
+    """Returns (records, truth pairs as frozensets of record indices)."""
+    names = Counter(name_key(name_tokens(site.name)) for site in sites)
+    links = Counter(site.wikipedia_link for site in sites)
+    base = [site.copy() for site in sites
+            if site.latitude is not None
+            and names[name_key(name_tokens(site.name))] == 1 and links[site.wikipedia_link] == 1]
+
+    records = list(base)
+    truth = set()
+    for i in rng.sample(range(len(base)), min(duplicates, len(base))):
+        original = base[i]
+        copy = original.copy(name=reword(original.name, rng),
+                             category=rng.choice([c for c in CATEGORIES if c != original.category]))
+        copy.latitude, copy.longitude = jitter(original, rng, 0, 60)
+        if rng.random() > 0.7:
+            copy.wikipedia_link = ""
+        truth.add(frozenset((i, len(records))))
+        records.append(copy)
+
+    for i in rng.sample(range(len(base)), min(near_misses, len(base))):
+        original = base[i]
+        numbers = re.findall(r"\d+", original.name)
+        if numbers:
+            name = original.name.replace(numbers[0], str(int(numbers[0]) + 2), 1)
+        else:
+            name = rng.choice(base).name
+        neighbour = original.copy(name=name, wikipedia_link=f"{original.wikipedia_link}_(neighbour)")
+        neighbour.latitude, neighbour.longitude = jitter(original, rng, 10, 40)
+        records.append(neighbour)
+    return records, truth
+
+
+def predicted_pairs(groups):
+    return {frozenset(pair) for group in groups for pair in combinations(group, 2)}
+
+
+def scaled(sites, scale):
+    """`scale` copies of the sites, each copy moved 1 degree north and renamed, so copies never match."""
+    copies = []
+    for k in range(scale):
+        for site in sites:
+            copy = site.copy(name=f"{site.name} x{k}", wikipedia_link=f"{site.wikipedia_link}#{k}")
+            if site.latitude is not None:
+                copy.latitude = site.latitude + k
+            copies.append(copy)
+    return copies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate detection.")
+    parser.add_argument("--scale", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sites = read_sites(SITES_JSON_PATH)
+
+    records, truth = labelled_set(sites, random.Random(args.seed))
+    print(f"Labelled set: {len(records)} records, {len(truth)} planted duplicate pairs")
+    print(f"{'threshold':>9} {'precision':>10} {'recall':>8} {'f1':>6}")
+    for threshold in (0.6, 0.65, 0.7, THRESHOLD, 0.8, 0.85, 0.9):
+        found = predicted_pairs(find_duplicates(records, threshold)[0])
+        true_positives = len(found & truth)
+        precision = true_positives / len(found) if found else 1.0
+        recall = true_positives / len(truth)
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        marker = "  <- default" if threshold == THRESHOLD else ""
+        print(f"{threshold:>9.2f} {precision:>10.3f} {recall:>8.3f} {f1:>6.3f}{marker}")
+
+    print(f"\n{'records':>8} {'candidate pairs':>16} {'all pairs':>14} {'groups':>7} {'time':>8}")
+    for data in (sites, scaled(sites, args.scale)):
+        start = time.perf_counter()
+        groups, stats = find_duplicates(data)
+        elapsed = time.perf_counter() - start
+        print(f"{len(data):>8} {stats['candidate_pairs']:>16,} {len(data) * (len(data) - 1) // 2:>14,} "
+              f"{len(groups):>7} {elapsed:>7.2f}s")
+
+
+if __name__ == "__main__":
+    main()
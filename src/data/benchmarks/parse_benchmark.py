@@ -0,0 +1,181 @@
+"""
+Compares scraper parse time and peak memory: the old full-tree html.parser path
+against the targeted lxml + SoupStrainer path, on saved HTML fixtures. With --pool,
+also times the multi-page scrapers' pages parsed one after another against the
+process-pool parse phase (common/parsing.py parse_pages).
+
+Fixtures are looked up where common/fixture_server.py records them. They are not
+committed, so record them once (with network access) through
+benchmarks/pipeline_benchmark.py --record; without any the benchmark is skipped.
+Extra pages can be passed explicitly:
+  python benchmarks/parse_benchmark.py
+  python benchmarks/parse_benchmark.py --page nrhp saved/brooklyn.html --repeat 5
+  python benchmarks/parse_benchmark.py --pool --workers 4
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scrapers"))
+from common import parsing
+from common.fixture_server import FIXTURES_DIR, fixture_path
+import designated_landmarks
+import museums
+import national_historical_landmarks
+import national_register_historical_places
+import skyscrapers
+
+# kind -> (source URLs, parse function taking (url, html))
+SCRAPERS = {
+    "nrhp": (
+        national_register_historical_places.WIKI_PAGES,
+        national_register_historical_places.parse_wikipedia_page,
+    ),
+    "designated": (
+        designated_landmarks.ADDITIONAL_WIKI_PAGES,
+        designated_landmarks.parse_additional_wiki_page,
+    ),
+    "nhl": (
+        [national_historical_landmarks.SOURCE_URL],
+        lambda url, html: national_historical_landmarks.extract_landmarks(html),
+    ),
+    "skyscrapers": (
+        [skyscrapers.URL],
+        skyscrapers.scrape_tallest_buildings,
+    ),
+    "museums": (
+        [museums.SOURCE_URL],
+        lambda url, html: museums.extract_museum_data(html),
+    ),
+}
+
+# Kinds whose parse functions can be sent to worker processes (the lambdas can't be pickled)
+POOL_KINDS = ("nrhp", "designated")
+
+
+def find_fixtures(root):
+    """Yields (kind, url, path) for every scraper page that has a saved fixture."""
+    for kind, (urls, _) in SCRAPERS.items():
+        for url in urls:
+            parts = urlsplit(url)
+            path = fixture_path(root, parts.netloc, parts.path)
+            if os.path.isfile(path):
+                yield kind, url, path
+
+
+def measure(parse, url, html, repeat, parser, targeted):
+    """Returns (records, best seconds, peak bytes) for one parse configuration."""
+    parsing.PARSER, parsing.TARGETED = parser, targeted
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = parse(url, html)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(url, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, best, peak
+
+
+def pool_comparison(pages, workers):
+    """Wall time of parsing the pool-capable pages serially and through parse_pages."""
+    jobs = [(kind, url, path) for kind, url, path in pages if kind in POOL_KINDS]
+    if not jobs:
+        print("No nrhp / designated fixtures to compare on")
+        return None
+    contents = {}
+    for _, url, path in jobs:
+        with open(path, "rb") as f:
+            contents[url] = f.read()
+
+    start = time.perf_counter()
+    serial = {url: SCRAPERS[kind][1](url, contents[url]) for kind, url, _ in jobs}
+    serial_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pooled = {}
+    for kind in POOL_KINDS:
+        kind_pages = [(url, contents[url], None) for job_kind, url, _ in jobs if job_kind == kind]
+        for url, records, error in parsing.parse_pages(kind_pages, SCRAPERS[kind][1], workers):
+            pooled[url] = records if error is None else error
+    pool_seconds = time.perf_counter() - start
+
+    workers = workers or os.cpu_count()
+    same = pooled == serial
+    print(f"{len(jobs)} pages: serial {serial_seconds:.2f}s, pool of {workers} {pool_seconds:.2f}s "
+          f"({serial_seconds / pool_seconds:.1f}x), identical output: {'yes' if same else 'NO'}")
+    return {"pages": len(jobs), "workers": workers, "serial_seconds": serial_seconds,
+            "pool_seconds": pool_seconds, "identical_output": same}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper HTML parsing.")
+    parser.add_argument("--root", default=FIXTURES_DIR)
+    parser.add_argument("--page", nargs=2, action="append", default=[], metavar=("KIND", "PATH"),
+                        help=f"extra fixture to parse; KIND is one of {', '.join(SCRAPERS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pool", action="store_true", help="also compare serial parsing with the process pool")
+    parser.add_argument("--workers", type=int, help="pool size for --pool (default: one per core)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    pages = list(find_fixtures(args.root))
+    for kind, path in args.page:
+        pages.append((kind, "https://en.wikipedia.org/wiki/" + os.path.basename(path), path))
+    if not pages:
+        print(f"Skipping: no fixtures under {args.root}. Recorded pages are not committed; record them "
+              f"once (online) with benchmarks/pipeline_benchmark.py --record, or pass pages with --page.")
+        return
+
+    default_parser, default_targeted = parsing.PARSER, parsing.TARGETED
+    results = []
+    print(f"{'page':<60} {'old ms':>9} {'new ms':>9} {'old MB':>8} {'new MB':>8}  same")
+    for kind, url, path in pages:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        parse = SCRAPERS[kind][1]
+        old_records, old_time, old_peak = measure(parse, url, html, args.repeat, "html.parser", False)
+        new_records, new_time, new_peak = measure(parse, url, html, args.repeat,
+                                                  default_parser, default_targeted)
+        same = old_records == new_records
+        results.append({
+            "kind": kind,
+            "url": url,
+            "bytes": len(html.encode("utf-8")),
+            "records": len(new_records),
+            "old_seconds": old_time,
+            "new_seconds": new_time,
+            "old_peak_bytes": old_peak,
+            "new_peak_bytes": new_peak,
+            "identical_output": same,
+        })
+        label = url.rsplit("/", 1)[-1][:60]
+        print(f"{label:<60} {old_time * 1000:9.1f} {new_time * 1000:9.1f} "
+              f"{old_peak / 1e6:8.1f} {new_peak / 1e6:8.1f}  {'yes' if same else 'NO'}")
+
+    old_total = sum(r["old_seconds"] for r in results)
+    new_total = sum(r["new_seconds"] for r in results)
+    print(f"Total: {old_total:.2f}s -> {new_total:.2f}s ({old_total / new_total:.1f}x) "
+          f"using {default_parser}")
+
+    if args.pool:
+        pool = pool_comparison(pages, args.workers)
+        if pool is not None:
+            results.append({"kind": "pool", **pool})
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+End-to-end pipeline benchmark, with no live network.
+
+  parse      every scraper's pages, fetched from recorded fixtures through the local
+             stand-in (common/fixture_server.py) and parsed
+  aggregate  the raw JSON files (data/raw, or --scale copies of them) into site records
+  ...        then each post-aggregation stage (pipeline.py), with MapQuest, the
+             Wikipedia imageinfo API and Wikidata replaced by local mocks
+
+Each stage is timed (wall and CPU) and measured for Python allocation peak (tracemalloc),
+net allocated blocks and peak RSS, and records the instrumentation counters
+(common/instrument.py: HTTP requests, cache hits, retries, bytes) it moved. Results are written as JSON (tagged with the git
+commit) so runs can be compared across commits with --compare.
+
+The HTTP, geocode, image and Wikidata caches all live in a fresh temporary directory, so every
+run starts cold. Fixtures are recorded once, with network access, by:
+  python benchmarks/pipeline_benchmark.py --record
+
+  python benchmarks/pipeline_benchmark.py
+  python benchmarks/pipeline_benchmark.py --scales 1,10,100 --no-tracemalloc
+  python benchmarks/pipeline_benchmark.py --compare data/cache/benchmarks/pipeline-<commit>.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows: peak RSS is reported as null
+    resource = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import fetch as fetch_module
+from common import fixture_server
+from common import instrument
+from common.cache import HttpCache
+from common.paths import CACHE_DIR, RAW_DIR, ROOT_DIR
+
+# Post-aggregation stages that make sense to time (the export stages only write files)
+DEFAULT_STAGES = ["tidy", "clean", "enrich", "geocode", "dedupe", "adjust", "images", "duplicate_images", "visit_state"]
+
+RESULTS_DIR = os.path.join(CACHE_DIR, "benchmarks")
+
+
+def scraper_jobs():
+    """(url, parse function taking (url, html)) for every page the scrapers download."""
+    from scrapers import (designated_landmarks, museums, national_historical_landmarks,
+                          national_register_historical_places, skyscrapers)
+    jobs = [(url, national_register_historical_places.parse_wikipedia_page)
+            for url in national_register_historical_places.WIKI_PAGES]
+    jobs += [(url, designated_landmarks.parse_additional_wiki_page)
+             for url in designated_landmarks.ADDITIONAL_WIKI_PAGES]
+    jobs.append((national_historical_landmarks.SOURCE_URL,
+                 lambda url, html: national_historical_landmarks.extract_landmarks(html)))
+    jobs.append((museums.SOURCE_URL, lambda url, html: museums.extract_museum_data(html)))
+    jobs.append((skyscrapers.URL, skyscrapers.scrape_tallest_buildings))
+    return jobs
+
+
+def parse_fixtures(fixtures_root):
+    """Fetches every scraper page through the fixture stand-in and parses it. Returns the records."""
+    server, base_url = fixture_server.start_server(fixtures_root)
+    fetch_module.BASE_OVERRIDE = base_url
+    try:
+        parsers = dict(scraper_jobs())
+        records, failed = [], 0
+        for url, html, error in fetch_module.fetch_pages(list(parsers)):
+            if error:
+                failed += 1
+                continue
+            records.extend(parsers[url](url, html))
+    finally:
+        fetch_module.BASE_OVERRIDE = ""
+        server.shutdown()
+    if failed:
+        print(f"  {failed} of {len(parsers)} pages have no fixture (record them with --record)")
+    return records
+
+
+def scale_raw(raw_dir, out_dir, scale):
+    """
+    Writes `scale` copies of every raw file's records. Copies after the first get their
+    own name, link and image title, and a plain-address location (so they are geocoded,
+    through the mock, to their own points rather than stacking on the original's).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for filename in os.listdir(raw_dir):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(raw_dir, filename), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        scaled = list(records)
+        for k in range(1, scale):
+            for record in records:
+                name = f"{record.get('name', '')} {k}"
+                scaled.append(dict(
+                    record, name=name,
+                    wikipedia_link=f"{record.get('wikipedia_link', '')}_{k}",
+                    image=(record.get("image") or "").replace("File:", f"File:{k}_", 1),
+                    location=f"{name}, New York, NY"
+                ))
+        with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(scaled, f)
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(name, fn, records_in, trace=True):
+    """Runs fn() once and returns (its result, the stage's measurements)."""
+    gc.collect()
+    counters_before = instrument.counters()
+    blocks_before = sys.getallocatedblocks()
+    if trace:
+        tracemalloc.start()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    result = fn()
+    wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+    traced_peak = None
+    if trace:
+        traced_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    stats = {
+        "stage": name,
+        "seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "records_in": records_in,
+        "records_out": len(result) if isinstance(result, list) else None,
+        "tracemalloc_peak_bytes": traced_peak,
+        "allocated_blocks": sys.getallocatedblocks() - blocks_before,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "counters": {name: value - counters_before.get(name, 0)
+                     for name, value in instrument.counters().items()
+                     if value != counters_before.get(name, 0)}
+    }
+    print(f"  {name:<18} {wall:>8.3f}s  cpu {cpu:>8.3f}s  "
+          f"{records_in if records_in is not None else '-':>7} -> {stats['records_out'] if stats['records_out'] is not None else '-':<7} "
+          f"peak {(traced_peak or 0) / 2 ** 20:>7.1f} MB")
+    return result, stats
+
+
+def use_local_services(work_dir, geocoder_url, imageinfo_url, wikidata_url):
+    """
+    Points the enrich, geocode and image stages at the mocks and at caches under work_dir,
+    and visit_state at a log there (it seeds a new one, which must not be the real log).
+    """
+    from checklist import add_visit_state
+    from enrich import wikidata
+    from geocode import pre_geocode
+    from image_url import image_url
+    pre_geocode.API_KEY = pre_geocode.API_KEY or "benchmark"
+    pre_geocode.GEOCODE_CACHE_PATH = os.path.join(work_dir, "geocode.sqlite")
+    image_url.IMAGE_CACHE_PATH = os.path.join(work_dir, "image_urls.sqlite")
+    wikidata.WIKIDATA_CACHE_PATH = os.path.join(work_dir, "wikidata.sqlite")
+    add_visit_state.VISIT_LOG_PATH = os.path.join(work_dir, "visits.jsonl")
+    return {"enrich": wikidata_url, "geocode": geocoder_url, "images": imageinfo_url}
+
+
+def run_scale(scale, stages, fixtures_root, trace):
+    """One full run at one dataset scale. Returns its results dict."""
+    from aggregate.aggregate import aggregate
+    from enrich import mock_wikidata
+    from geocode import mock_geocoder
+    from image_url import mock_imageinfo
+    import pipeline
+
+    work_dir = tempfile.mkdtemp(prefix="nyc-sites-bench-")
+    fetch_module._cache = HttpCache(os.path.join(work_dir, "http"))
+    geocoder, geocoder_url = mock_geocoder.start_server()
+    imageinfo, imageinfo_url = mock_imageinfo.start_server()
+    wikidata, wikidata_url = mock_wikidata.start_server()
+    overrides = use_local_services(work_dir, geocoder_url, imageinfo_url, wikidata_url)
+
+    print(f"Scale {scale}x")
+    results = {"scale": scale, "stages": []}
+    try:
+        if scale == 1 and os.path.isdir(fixtures_root):
+            _, stats = measure("parse", lambda: parse_fixtures(fixtures_root), None, trace)
+            results["stages"].append(stats)
+
+        raw_dir = RAW_DIR
+        if scale > 1:
+            raw_dir = os.path.join(work_dir, "raw")
+            scale_raw(RAW_DIR, raw_dir, scale)
+        sites, stats = measure("aggregate", lambda: aggregate(raw_dir)[0], None, trace)
+        results["stages"].append(stats)
+        results["records"] = len(sites)
+
+        for name in stages:
+            stage = pipeline.get_stage(name)
+            fetch_module.BASE_OVERRIDE = overrides.get(name, "")
+            try:
+                sites, stats = measure(name, lambda: stage(sites), len(sites), trace)
+            finally:
+                fetch_module.BASE_OVERRIDE = ""
+            results["stages"].append(stats)
+    finally:
+        geocoder.shutdown()
+        imageinfo.shutdown()
+        wikidata.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    results["total_seconds"] = round(sum(stage["seconds"] for stage in results["stages"]), 4)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    """Prints each stage's time against a previous results file."""
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    before = {(run["scale"], stage["stage"]): stage["seconds"]
+              for run in previous["runs"] for stage in run["stages"]}
+    print(f"\nAgainst {previous.get('commit') or previous_path}:")
+    for run in current["runs"]:
+        for stage in run["stages"]:
+            old = before.get((run["scale"], stage["stage"]))
+            if old:
+                ratio = stage["seconds"] / old if old else float("inf")
+                flag = "  slower" if ratio > 1.2 else ("  faster" if ratio < 0.8 else "")
+                print(f"  {run['scale']:>4}x {stage['stage']:<18} {old:>8.3f}s -> {stage['seconds']:>8.3f}s "
+                      f"({ratio:.2f}x){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the whole pipeline against local fixtures and mocks.")
+    parser.add_argument("--scales", default="1,10", help="comma-separated dataset multipliers, e.g. 1,10,100")
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES))
+    parser.add_argument("--fixtures", default=fixture_server.FIXTURES_DIR)
+    parser.add_argument("--no-tracemalloc", action="store_true", help="skip allocation tracing (it slows stages down)")
+    parser.add_argument("--output", help=f"results file (default: {RESULTS_DIR}/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="a previous results file to compare against")
+    parser.add_argument("--record", action="store_true", help="record the scrapers' pages as fixtures and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        fixture_server.record([url for url, _ in scraper_jobs()], args.fixtures)
+        return
+
+    # The mocks answer instantly; don't hold them to MapQuest's rate limit, and don't
+    # let a local gazetteer change what gets geocoded
+    os.environ["MAPQUEST_REQUESTS_PER_SECOND"] = "1000"
+    os.environ["GAZETTEER_PATH"] = ""
+
+    commit = git_commit()
+    results = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "tracemalloc": not args.no_tracemalloc,
+        "runs": []
+    }
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    for scale in (int(value) for value in args.scales.split(",")):
+        results["runs"].append(run_scale(scale, stages, args.fixtures, not args.no_tracemalloc))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{(commit or 'unknown')[:10]}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
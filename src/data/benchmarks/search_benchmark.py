@@ -0,0 +1,91 @@
+"""
+Search index size, build/load time and query latency, against a linear scan over
+every site's folded name and location (what a page without an index would do).
+
+Queries are drawn from the site names themselves: whole names, type-ahead prefixes,
+and names with one typo per word.
+
+  python benchmarks/search_benchmark.py
+  python benchmarks/search_benchmark.py --queries 2000
+"""
+import argparse
+import gzip
+import json
+import random
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search.search_index import SearchIndex, build, fold, load_sites
+
+
+def make_queries(sites, count, seed=0):
+    rng = random.Random(seed)
+    names = [site.name for site in sites if site.name]
+    queries = {"exact": [], "prefix": [], "typo": []}
+    for _ in range(count):
+        words = rng.choice(names).split()[:3]
+        queries["exact"].append(" ".join(words))
+        queries["prefix"].append(" ".join(words[:-1] + [words[-1][:3]]))
+        typo = []
+        for word in words:
+            if len(word) > 4:
+                i = rng.randrange(1, len(word) - 1)
+                word = word[:i] + word[i + 1:]
+            typo.append(word)
+        queries["typo"].append(" ".join(typo))
+    return queries
+
+
+def linear_scan(rows, query, limit=10):
+    words = fold(query).split()
+    return [name for name, text in rows if all(word in text for word in words)][:limit]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def time_queries(fn, queries):
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        results = fn(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += bool(results)
+    return latencies, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site search index.")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    sites, future_sites = load_sites()
+    start = time.perf_counter()
+    payload = build(sites, future_sites)
+    build_time = time.perf_counter() - start
+
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    start = time.perf_counter()
+    index = SearchIndex(json.loads(data))
+    load_time = time.perf_counter() - start
+
+    print(f"Docs: {len(payload['docs'])}  terms: {len(payload['terms'])}")
+    print(f"Index size: {len(data) / 1024:.1f} KB raw, {len(gzip.compress(data, 9)) / 1024:.1f} KB gzipped")
+    print(f"Build: {build_time * 1000:.1f} ms  load (parse + trigrams): {load_time * 1000:.1f} ms")
+
+    rows = [(site.name, fold(f"{site.name} {site.location}"))
+            for site in sites + future_sites]
+    print(f"{'queries':<10} {'method':<12} {'p50':>9} {'p99':>9} {'max':>9} {'hits':>7}")
+    for kind, queries in make_queries(sites + future_sites, args.queries).items():
+        for method, fn in (("index", index.search), ("linear scan", lambda q: linear_scan(rows, q))):
+            latencies, hits = time_queries(fn, queries)
+            print(f"{kind:<10} {method:<12} {percentile(latencies, 50):>7.3f}ms {percentile(latencies, 99):>7.3f}ms "
+                  f"{max(latencies):>7.3f}ms {hits / len(queries):>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Load/dump time and size of the pipeline's JSON files: the old pretty-printed stdlib
+output (indent=2 for processed files, indent=4 for raw) against common/serialization.py's
+canonical format on each installed backend (stdlib json, orjson, msgspec).
+
+Loads are from each format's own bytes; "validate" is the schema check load_sites /
+load_raw add on top.
+
+  python benchmarks/serialization_benchmark.py
+  python benchmarks/serialization_benchmark.py --repeat 50
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.paths import FUTURE_SITES_JSON_PATH, RAW_DIR, SITES_JSON_PATH
+
+
+def backends():
+    """name -> (encode, decode) for every backend installed, each writing sorted keys."""
+    found = {"json": (lambda value: json.dumps(value, ensure_ascii=False, separators=(",", ":"),
+                                               sort_keys=True).encode("utf-8"), json.loads)}
+    orjson, msgspec = serialization.orjson, serialization.msgspec
+    if orjson is not None:
+        found["orjson"] = (lambda value: orjson.dumps(value, option=orjson.OPT_SORT_KEYS), orjson.loads)
+    if msgspec is not None:
+        found["msgspec"] = (msgspec.json.Encoder(order="sorted").encode, msgspec.json.decode)
+    return found
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def bench_file(path, schema, indent, repeat):
+    with open(path, "rb") as f:
+        records = json.loads(f.read())
+    rows = []
+
+    def old_dump():
+        return json.dumps(records, indent=indent).encode("utf-8")
+
+    old = old_dump()
+    rows.append((f"stdlib indent={indent}", len(old), median_ms(old_dump, repeat),
+                 median_ms(lambda: json.loads(old), repeat)))
+
+    # Swap the module's backend in and out, as the pipeline benchmark does with BASE_OVERRIDE
+    saved = serialization._encode, serialization._decode
+    try:
+        for name, (encode, decode) in backends().items():
+            serialization._encode, serialization._decode = encode, decode
+            data = serialization.dumps(records)
+            assert decode(data) == records
+            rows.append((f"{name} canonical", len(data), median_ms(lambda: serialization.dumps(records), repeat),
+                         median_ms(lambda: decode(data), repeat)))
+    finally:
+        serialization._encode, serialization._decode = saved
+
+    validate = median_ms(lambda: serialization.validate(records, schema, path), repeat)
+    return len(records), rows, validate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON load/dump of the pipeline's files.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    files = [(SITES_JSON_PATH, serialization.SITE_SCHEMA, 2)]
+    if os.path.exists(FUTURE_SITES_JSON_PATH):
+        files.append((FUTURE_SITES_JSON_PATH, serialization.SITE_SCHEMA, 2))
+    files += [(path, serialization.RAW_SCHEMA, 4) for path in sorted(glob.glob(os.path.join(RAW_DIR, "*.json")))]
+
+    print(f"Default backend: {serialization.BACKEND}; median of {args.repeat} runs")
+    totals = {}
+    for path, schema, indent in files:
+        count, rows, validate = bench_file(path, schema, indent, args.repeat)
+        print(f"\n{os.path.relpath(path, os.path.dirname(RAW_DIR))} ({count} records, validate {validate:.2f} ms)")
+        print(f"  {'format':<20} {'bytes':>10} {'dump':>10} {'load':>10}")
+        for name, size, dump_ms, load_ms in rows:
+            print(f"  {name:<20} {size:>10,} {dump_ms:>8.2f}ms {load_ms:>8.2f}ms")
+            key = name.replace(f"indent={indent}", "pretty")
+            total = totals.setdefault(key, [0, 0.0, 0.0])
+            total[0] += size
+            total[1] += dump_ms
+            total[2] += load_ms
+
+    print("\nAll files")
+    print(f"  {'format':<20} {'bytes':>10} {'dump':>10} {'load':>10}")
+    for name, (size, dump_ms, load_ms) in totals.items():
+        print(f"  {name:<20} {size:>10,} {dump_ms:>8.2f}ms {load_ms:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
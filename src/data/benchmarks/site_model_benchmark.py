@@ -0,0 +1,111 @@
+"""
+Memory and access time of sites.json held as plain dicts (what every stage used to pass
+around), as common/site.py Sites, and as a SiteTable.
+
+Memory is what tracemalloc sees held after decoding the file into dicts, or into Sites
+(the intermediate dicts freed), strings included; a SiteTable's is what it adds on top of
+the Sites it was built from. The loops are the kind of work stages do over every record:
+picking the sites in a bounding box, counting categories.
+
+  python benchmarks/site_model_benchmark.py
+  python benchmarks/site_model_benchmark.py --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.paths import SITES_JSON_PATH
+from common.site import Site, SiteTable
+
+# Midtown Manhattan, south / west / north / east
+BBOX = (40.745, -74.000, 40.765, -73.970)
+
+
+def allocated(build):
+    """(result, bytes tracemalloc sees still allocated once build() returns)."""
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def dict_loops(records):
+    south, west, north, east = BBOX
+    inside = [record for record in records
+              if record.get("latitude") is not None and record.get("longitude") is not None
+              and south <= record["latitude"] <= north and west <= record["longitude"] <= east]
+    return len(inside), Counter(record["category"] for record in records)
+
+
+def site_loops(sites):
+    south, west, north, east = BBOX
+    inside = [site for site in sites
+              if site.coords is not None
+              and south <= site.latitude <= north and west <= site.longitude <= east]
+    return len(inside), Counter(site.category for site in sites)
+
+
+def table_loops(table):
+    return len(table.in_bbox(*BBOX)), table.category_counts()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the site record representations.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(SITES_JSON_PATH, "rb") as f:
+        data = f.read()
+
+    def decode_dicts():
+        return serialization.loads(data)
+
+    def decode_sites():
+        return [Site.from_dict(record) for record in serialization.loads(data)]
+
+    records, dict_bytes = allocated(decode_dicts)
+    sites, site_bytes = allocated(decode_sites)
+    table, table_bytes = allocated(lambda: SiteTable.from_sites(sites))
+    count = len(records)
+
+    # All three must agree before their timings mean anything
+    in_dicts, dict_counts = dict_loops(records)
+    in_sites, site_counts = site_loops(sites)
+    in_table, table_counts = table_loops(table)
+    assert in_dicts == in_sites == in_table
+    assert dict_counts == {category.value: n for category, n in site_counts.items()} \
+        == {category.value: n for category, n in table_counts.items()}
+
+    print(f"{count} records ({in_dicts} in the bbox); median of {args.repeat} runs")
+    print(f"{'form':<10} {'memory':>12} {'per record':>11} {'build':>10} {'bbox + counts':>14}")
+    rows = [
+        ("dict", dict_bytes, decode_dicts, lambda: dict_loops(records)),
+        ("Site", site_bytes, decode_sites, lambda: site_loops(sites)),
+        ("SiteTable", table_bytes, lambda: SiteTable.from_sites(sites), lambda: table_loops(table)),
+    ]
+    for name, size, build, loops in rows:
+        print(f"{name:<10} {size / 1024:>9,.0f} KB {size / count:>9,.0f} B "
+              f"{median_ms(build, args.repeat):>8.2f}ms {median_ms(loops, args.repeat):>12.2f}ms")
+    print("(dict and Site builds include the JSON decode; SiteTable builds start from the Sites)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Answering everyday questions from store/sitedb.py's indexes against loading sites.json
+and scanning it (what every script did before), plus the store's import, full read and
+export. The store is built from the current JSON files in a temporary directory.
+
+  python benchmarks/sitedb_benchmark.py
+  python benchmarks/sitedb_benchmark.py --repeat 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.geohash import haversine_m
+from common.paths import SITES_JSON_PATH
+from common.site import Category, VisitState, read_sites
+from store.sitedb import SiteDB, export_json, import_json
+
+HERE = (40.7484, -73.9857)
+RADIUS_M = 800
+# Lower Manhattan, south / west / north / east
+BBOX = (40.700, -74.020, 40.720, -73.995)
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def store_bytes(path):
+    """The database plus its write-ahead log."""
+    return sum(os.path.getsize(name) for name in (path, path + "-wal") if os.path.exists(name))
+
+
+def scan_unvisited_museums_near():
+    found = [(haversine_m(*HERE, site.latitude, site.longitude), site) for site in read_sites(SITES_JSON_PATH)
+             if site.category is Category.MUSEUMS and site.visited is not VisitState.VISITED and site.coords]
+    return sorted((item for item in found if item[0] <= RADIUS_M), key=lambda item: item[0])
+
+
+def scan_missing_coords():
+    return [site for site in read_sites(SITES_JSON_PATH) if site.coords is None]
+
+
+def scan_bbox():
+    south, west, north, east = BBOX
+    return [site for site in read_sites(SITES_JSON_PATH)
+            if site.coords and south <= site.latitude <= north and west <= site.longitude <= east]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite site store.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SiteDB(os.path.join(tmp, "sites.db"))
+        start = time.perf_counter()
+        import_json(db)
+        import_seconds = time.perf_counter() - start
+
+        queries = [
+            ("unvisited museums near here", scan_unvisited_museums_near,
+             lambda: db.nearby(*HERE, RADIUS_M, category=Category.MUSEUMS.value, visited=False)),
+            ("missing coordinates", scan_missing_coords, lambda: db.query(missing_coords=True)),
+            ("sites in a box", scan_bbox, lambda: db.query(bbox=BBOX)),
+        ]
+        print(f"\n{'query':<30} {'results':>8} {'load + scan':>12} {'store':>10}")
+        for name, scan, indexed in queries:
+            expected, got = scan(), indexed()
+            assert len(expected) == len(got), (name, len(expected), len(got))
+            print(f"{name:<30} {len(got):>8} {median_ms(scan, args.repeat):>10.2f}ms "
+                  f"{median_ms(indexed, args.repeat):>8.2f}ms")
+
+        read_ms = median_ms(db.read_sites, args.repeat)
+        start = time.perf_counter()
+        export_json(db, os.path.join(tmp, "raw"), os.path.join(tmp, "sites.json"), os.path.join(tmp, "future.json"))
+        export_seconds = time.perf_counter() - start
+        print(f"\nimport {import_seconds * 1000:.0f} ms, read all sites {read_ms:.1f} ms, "
+              f"export {export_seconds * 1000:.0f} ms, store {store_bytes(db.path) / 1024:,.0f} KB")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
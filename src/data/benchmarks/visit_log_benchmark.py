@@ -0,0 +1,77 @@
+"""
+Cost of recording visits in checklist/visit_log.py's append-only log against the old
+way (set `visited` and rewrite sites.json), plus replaying, merging and compacting a
+long log. Everything is written to a temporary directory.
+
+  python benchmarks/visit_log_benchmark.py
+  python benchmarks/visit_log_benchmark.py --marks 200 --events 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from checklist.visit_log import VisitLog
+from common.paths import SITES_JSON_PATH
+from common.site import VisitState, read_sites, write_sites
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the visit log.")
+    parser.add_argument("--marks", type=int, default=50, help="single visits to record each way")
+    parser.add_argument("--events", type=int, default=20000, help="events in the long log")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sites = read_sites(SITES_JSON_PATH)
+    rng = random.Random(args.seed)
+    picks = [rng.choice(sites) for _ in range(args.marks)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sites_path = os.path.join(tmp, "sites.json")
+        write_sites(sites, sites_path)
+
+        def rewrite():
+            for site in picks:
+                site.visited = VisitState.VISITED
+                write_sites(sites, sites_path)
+
+        def append():
+            log = VisitLog(os.path.join(tmp, "marks.jsonl"))
+            for site in picks:
+                log.mark(site.id)
+
+        _, rewrite_seconds = timed(rewrite)
+        _, append_seconds = timed(append)
+        print(f"{args.marks} visits: rewrite sites.json {rewrite_seconds / args.marks * 1000:.2f} ms each "
+              f"({os.path.getsize(sites_path) / 1024:,.0f} KB written per visit), "
+              f"append {append_seconds / args.marks * 1000:.3f} ms each")
+
+        # A long history: visits and un-visits over the whole dataset
+        log_path = os.path.join(tmp, "visits.jsonl")
+        log = VisitLog(log_path)
+        for _ in range(args.events):
+            log.record(rng.choice(sites).id, rng.random() < 0.7)
+        size = os.path.getsize(log_path)
+
+        log, replay_seconds = timed(lambda: VisitLog(log_path))
+        _, apply_seconds = timed(lambda: log.apply(sites))
+        (before, after), compact_seconds = timed(log.compact)
+        _, compacted_replay_seconds = timed(lambda: VisitLog(log_path))
+        print(f"{args.events} events ({size / 1024:,.0f} KB): replay {replay_seconds * 1000:.1f} ms, "
+              f"merge into {len(sites)} sites {apply_seconds * 1000:.1f} ms")
+        print(f"compact {before} -> {after} lines ({os.path.getsize(log_path) / 1024:,.0f} KB) "
+              f"in {compact_seconds * 1000:.1f} ms; replay afterwards {compacted_replay_seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
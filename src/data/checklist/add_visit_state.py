@@ -1,16 +1,36 @@
-import json
+import os
+import sys
 
-# Load the sites.json file
-with open("../../../data/processed/sites.json", "r", encoding="utf-8") as f:
-    sites = json.load(f)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from checklist.visit_log import VisitLog
+from common.paths import SITES_JSON_PATH, VISIT_LOG_PATH
+from common.site import read_sites, write_sites
 
-# Add "visited": "Not Visited" if missing
-for site in sites:
-    if "visited" not in site:
-        site["visited"] = "Not Visited"
 
-# Save the updated sites.json
-with open("../../../data/processed/sites.json", "w", encoding="utf-8") as f:
-    json.dump(sites, f, indent=2, ensure_ascii=False)
+def add_visit_state(sites, log_path=None):
+    """
+    Sets every site's visit state from the visit log (checklist/visit_log.py).
+    Without a log, one is first seeded from the sites already marked visited, so their
+    state carries over; the rest are marked not visited.
+    """
+    log_path = log_path or VISIT_LOG_PATH
+    log = VisitLog(log_path)
+    if not os.path.exists(log_path):
+        print(f"Seeded {log_path} with {log.seed(sites)} visited sites")
+    return log.apply(sites)
 
-print("Updated sites.json with default 'Not Visited' status.")
+
+def main():
+    # Load the sites.json file
+    sites = read_sites(SITES_JSON_PATH)
+
+    add_visit_state(sites)
+
+    # Save the updated sites.json
+    write_sites(sites, SITES_JSON_PATH)
+
+    print("Updated sites.json with visit states.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Visit state kept out of sites.json, as an append-only log keyed by site id.
+
+Each line of data/processed/visits.jsonl is one event:
+  {"at":"2026-10-18T14:05:52Z","id":"285e2df3f5086df8","visited":true}
+Marking a site appends one line instead of rewriting the whole dataset; reading replays
+the log, later events winning. Ids are a hash of category, name and link
+(common/records.py), so the state survives re-aggregation. The log is authoritative: the
+visit_state stage (add_visit_state.py) merges it into the records, and a site it has no
+event for is not visited. So that existing "Visited" values are not lost, a log is seeded
+from them when it is first created, by mark / unmark or by the visit_state stage.
+
+compact() rewrites the log with one line per visited site. The visits stage writes
+data/build/visits.json, the ids of the visited records (plus when), so the checklist page
+can refresh its state in a few KB against the sites.json it already loads:
+  {"visited": {"285e2df3f5086df8": "2026-10-18T14:05:52Z", ...}}
+A record's id is its "id" field when it has one (merged sites), otherwise the first 16 hex
+digits of the SHA-1 of category, name and link joined by "\x1f" (common/records.py).
+
+  python checklist/visit_log.py mark "Flatiron Building" --all
+  python checklist/visit_log.py unmark 285e2df3f5086df8
+  python checklist/visit_log.py list
+  python checklist/visit_log.py import      # add the visited values in sites.json again
+  python checklist/visit_log.py compact
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.paths import BUILD_DIR, SITES_JSON_PATH, VISIT_LOG_PATH
+from common.site import VisitState, read_sites
+from export.export import dumps, write_artifact
+
+SNAPSHOT_FILE = "visits.json"
+
+
+def now():
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class VisitLog:
+    """The log replayed into {site id: latest event}; every change is appended to the file."""
+
+    def __init__(self, path=VISIT_LOG_PATH):
+        self.path = path
+        self.events = {}
+        self.lines = 0
+        if os.path.exists(path):
+            self._replay()
+
+    def _replay(self):
+        with open(self.path, "rb") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    event = serialization.loads(line)
+                except ValueError:
+                    # A torn line from an interrupted append; everything else still stands
+                    print(f"Warning: skipping unreadable line {number} of {self.path}")
+                    continue
+                self.events[event["id"]] = event
+                self.lines += 1
+
+    def record(self, site_id, visited, at=None):
+        """Appends one event and returns it."""
+        event = {"id": site_id, "visited": bool(visited), "at": at or now()}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(serialization.dumps(event))
+        self.events[site_id] = event
+        self.lines += 1
+        return event
+
+    def seed(self, sites):
+        """Marks every site that is visited and has no event yet; returns how many were added."""
+        added = 0
+        for site in sites:
+            if site.visited is not VisitState.VISITED:
+                continue
+            for key in site.merged_ids or [site.id]:
+                if key not in self.events:
+                    self.mark(key)
+                    added += 1
+        return added
+
+    def set_visited(self, site, visited, at=None):
+        """
+        Records one event for each record a site stands for (every merged id, since any of
+        them being visited makes the site visited); returns the last event.
+        """
+        at = at or now()
+        for key in site.merged_ids or [site.id]:
+            event = self.record(key, visited, at)
+        return event
+
+    def mark(self, site_id, at=None):
+        return self.record(site_id, True, at)
+
+    def unmark(self, site_id, at=None):
+        return self.record(site_id, False, at)
+
+    def is_visited(self, site_id):
+        event = self.events.get(site_id)
+        return event is not None and event["visited"]
+
+    def visited(self):
+        """{site id: when it was marked} for every visited site."""
+        return {key: event["at"] for key, event in self.events.items() if event["visited"]}
+
+    def apply(self, sites):
+        """
+        Sets every site's visit state from the log. A merged site (clean/dedupe.py) is
+        visited if any of the records it was merged from is.
+        """
+        for site in sites:
+            visited = any(self.is_visited(key) for key in site.merged_ids or [site.id])
+            site.visited = VisitState.VISITED if visited else VisitState.NOT_VISITED
+        return sites
+
+    def compact(self):
+        """Rewrites the log (atomically) with just the latest event of each visited site."""
+        keep = [event for event in self.events.values() if event["visited"]]
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            for event in keep:
+                f.write(serialization.dumps(event))
+        os.replace(temp_path, self.path)
+        before, self.lines = self.lines, len(keep)
+        self.events = {event["id"]: event for event in keep}
+        return before, self.lines
+
+
+def snapshot(log, sites):
+    """
+    {site id: when it was first marked} for the visited sites, keyed by the id of the
+    record in sites.json; a merged site is visited if any of the records it replaced is.
+    """
+    visited = {}
+    for site in sites:
+        marked = [log.events[key]["at"] for key in site.merged_ids or [site.id] if log.is_visited(key)]
+        if marked:
+            visited[site.id] = min(marked)
+    return {"visited": visited}
+
+
+def export_visits(sites):
+    """Pipeline stage: writes data/build/visits.json for the exported records; leaves them unchanged."""
+    payload = snapshot(VisitLog(), sites)
+    sizes = write_artifact(os.path.join(BUILD_DIR, SNAPSHOT_FILE), dumps(payload))
+    print(f"Wrote {len(payload['visited'])} visited sites to {SNAPSHOT_FILE} "
+          f"({sizes['bytes'] / 1024:.1f} KB, {sizes['gzip'] / 1024:.1f} KB gzipped)")
+    return sites
+
+
+def find_sites(sites, query, every=False):
+    """
+    The site whose id is query, or the one with that name (case-insensitive).
+    A name several sites share (the same place under several categories, before dedupe
+    merges them) is an error unless every is set, which returns them all.
+    """
+    for site in sites:
+        if site.id == query:
+            return [site]
+    matches = [site for site in sites if site.name.casefold() == query.casefold()]
+    if not matches:
+        raise LookupError(f"No site with id or name {query!r}")
+    if len(matches) > 1 and not every:
+        listing = "\n".join(f"  {site.id}  {site.name} ({site.category})" for site in matches)
+        raise LookupError(f"{len(matches)} sites are named {query!r}; pass one of their ids, "
+                          f"or --all:\n{listing}")
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record and inspect visited sites.")
+    parser.add_argument("command", choices=["mark", "unmark", "list", "import", "compact"])
+    parser.add_argument("site", nargs="?", help="site id or exact name (mark / unmark)")
+    parser.add_argument("--all", action="store_true", help="mark / unmark every site with that name")
+    parser.add_argument("--sites", default=SITES_JSON_PATH)
+    parser.add_argument("--log", default=VISIT_LOG_PATH)
+    args = parser.parse_args()
+
+    log = VisitLog(args.log)
+
+    if args.command in ("mark", "unmark"):
+        if not args.site:
+            parser.error(f"{args.command} needs a site id or name")
+        all_sites = read_sites(args.sites)
+        try:
+            sites = find_sites(all_sites, args.site, args.all)
+        except LookupError as e:
+            sys.exit(str(e))
+        if not os.path.exists(args.log):
+            print(f"Seeded {args.log} with {log.seed(all_sites)} visited sites from {args.sites}")
+        for site in sites:
+            event = log.set_visited(site, args.command == "mark")
+            print(f"{'Visited' if event['visited'] else 'Not visited'}: {site.name} "
+                  f"({site.category}, {site.id}) at {event['at']}")
+
+    elif args.command == "list":
+        names = {key: site.name for site in read_sites(args.sites) for key in site.merged_ids or [site.id]}
+        visited = log.visited()
+        for key, at in sorted(visited.items(), key=lambda item: item[1]):
+            print(f"{at}  {key}  {names.get(key, '(not in sites.json)')}")
+        print(f"{len(visited)} visited")
+
+    elif args.command == "import":
+        # The visited values stored in sites.json that the log has no event for
+        added = log.seed(read_sites(args.sites))
+        print(f"Imported {added} visited sites into {args.log}")
+
+    elif args.command == "compact":
+        before, after = log.compact()
+        print(f"Compacted {args.log}: {before} -> {after} lines")
+
+
+if __name__ == "__main__":
+    main()
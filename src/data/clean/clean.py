@@ -1,22 +1,41 @@
-import json
+import os
+import sys
 
-# File paths
-delete_file = "../../../data/future_development/delete_v1.txt"
-json_file = "../../../data/processed/sites.json"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import DELETE_LIST_PATH, SITES_JSON_PATH
+from common.site import Category, read_sites, write_sites
 
-# Load the list of names to delete
-with open(delete_file, "r", encoding="utf-8") as f:
-    delete_names = set(line.strip() for line in f if line.strip())  # Remove empty lines
 
-# Load the JSON data
-with open(json_file, "r", encoding="utf-8") as f:
-    sites = json.load(f)
+def load_delete_names(delete_file=DELETE_LIST_PATH):
+    """Loads the list of names to delete, one per line. Returns an empty set if the file is missing."""
+    if not os.path.exists(delete_file):
+        print(f"Warning: {delete_file} not found. Nothing to remove.")
+        return set()
+    with open(delete_file, "r", encoding="utf-8") as f:
+        return set(line.strip() for line in f if line.strip())  # Remove empty lines
 
-# Filter out entries that match the deletion criteria
-filtered_sites = [site for site in sites if not (site["name"] in delete_names and site.get("category") == "landmarks")]
 
-# Save the updated JSON file
-with open(json_file, "w", encoding="utf-8") as f:
-    json.dump(filtered_sites, f, indent=2)
+def clean(sites, delete_names=None):
+    """Filters out 'landmarks' entries whose name is on the delete list."""
+    if delete_names is None:
+        delete_names = load_delete_names()
+    filtered_sites = [site for site in sites
+                      if not (site.name in delete_names and site.category is Category.LANDMARKS)]
+    print(f"Removed {len(sites) - len(filtered_sites)} entries from 'landmarks' category matching delete list")
+    return filtered_sites
 
-print(f"Updated {json_file}: Removed entries from 'landmarks' category matching delete_v1.txt")
+
+def main():
+    # Load the JSON data
+    sites = read_sites(SITES_JSON_PATH)
+
+    filtered_sites = clean(sites)
+
+    # Save the updated JSON file
+    write_sites(filtered_sites, SITES_JSON_PATH)
+
+    print(f"Updated {SITES_JSON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Finds sites listed more than once across the source categories (a building that is a
+designated landmark, a National Historic Landmark and on the National Register, under
+slightly different names) and merges each group into one record.
+
+1) Blocking: only pairs that share something are compared, so the work stays close
+   to linear in the number of sites:
+     - sites within MAX_DISTANCE_M of each other (geohash buckets, common/geohash.py)
+     - sites with the same normalized name key ("Building at 51 Market St" = "51 Market St Building")
+     - sites with the same Wikipedia link
+2) Scoring: name similarity, link identity and distance, weighted into one score.
+   Names whose house numbers differ ("83 Sullivan St House" / "85 Sullivan St House")
+   never match, even when they share an article. Two entries of the same list are
+   separate designations, even under one article ("NoHo Historic District" / "NoHo East
+   Historic District"), so sites of the same category only match when they are the same
+   entry twice (same article, same name key); across categories a pair needs the same
+   article or near-identical names (SAME_NAME).
+3) Merging: matching pairs scoring at least THRESHOLD are grouped (union-find), best
+   first, never joining two groups that would hold different sites of one category
+   (a landmark matched to an NRHP entry that matches another landmark); each group becomes
+   its first record, with "categories" listing every category it appeared under,
+   "merged_ids" the ids folded into it, and empty fields filled from the others.
+
+  python clean/dedupe.py --dry-run
+  python clean/dedupe.py
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.geohash import GeohashIndex, haversine_m
+from common.paths import SITES_JSON_PATH
+from common.site import VisitState, read_sites, write_sites
+from map.lat_lng_adjustments import DisjointSet
+from search.search_index import tokenize
+
+# Sites further apart than this are only compared if their names or links match
+MAX_DISTANCE_M = 300
+
+# Up to this distance, location counts as a full match; it fades out to MAX_DISTANCE_M
+NEAR_DISTANCE_M = 50
+
+WEIGHTS = {"name": 0.55, "link": 0.25, "distance": 0.2}
+THRESHOLD = 0.75
+
+# Name similarity that counts as the same name (word order, "the", abbreviations aside)
+SAME_NAME = 0.9
+
+# Score given for distance when either site has no coordinates
+UNKNOWN_DISTANCE_SCORE = 0.5
+
+
+def name_tokens(name):
+    return frozenset(tokenize(name))
+
+
+def name_key(tokens):
+    """Blocking key: the same words in any order."""
+    return " ".join(sorted(tokens))
+
+
+def name_similarity(a, b):
+    """
+    Average of Dice overlap and containment of the two token sets, so a short name that
+    is all inside a longer one ("1 Wall St" in "1 Wall St Building (Irving Trust ...)")
+    still scores well. 0 when the names carry different numbers.
+    """
+    if not a or not b:
+        return 0.0
+    numbers_a = {token for token in a if token[0].isdigit()}
+    numbers_b = {token for token in b if token[0].isdigit()}
+    if numbers_a and numbers_b and numbers_a != numbers_b:
+        return 0.0
+    shared = len(a & b)
+    dice = 2 * shared / (len(a) + len(b))
+    containment = shared / min(len(a), len(b))
+    return (dice + containment) / 2
+
+
+def distance_score(distance):
+    if distance is None:
+        return UNKNOWN_DISTANCE_SCORE
+    if distance <= NEAR_DISTANCE_M:
+        return 1.0
+    if distance >= MAX_DISTANCE_M:
+        return 0.0
+    return (MAX_DISTANCE_M - distance) / (MAX_DISTANCE_M - NEAR_DISTANCE_M)
+
+
+def score_pair(a, b, tokens_a, tokens_b):
+    """Returns (score, name similarity, same link, distance in meters or None)."""
+    name = name_similarity(tokens_a, tokens_b)
+    same_link = bool(a.wikipedia_link) and a.wikipedia_link == b.wikipedia_link
+    coords_a, coords_b = a.coords, b.coords
+    distance = haversine_m(*coords_a, *coords_b) if coords_a and coords_b else None
+    if name == 0.0:
+        return 0.0, name, same_link, distance
+    score = (WEIGHTS["name"] * name + WEIGHTS["link"] * same_link
+             + WEIGHTS["distance"] * distance_score(distance))
+    return score, name, same_link, distance
+
+
+def categories_of(site):
+    return site.categories or [site.category]
+
+
+def entry_key(site, tokens):
+    """What makes two sites of one category the same entry."""
+    return site.wikipedia_link, name_key(tokens)
+
+
+def is_match(a, b, tokens_a, tokens_b, name, same_link):
+    """Whether a pair may merge at all, whatever it scores (see the module docstring)."""
+    if set(categories_of(a)) & set(categories_of(b)):
+        return bool(a.wikipedia_link) and entry_key(a, tokens_a) == entry_key(b, tokens_b)
+    return same_link or name >= SAME_NAME
+
+
+def candidate_pairs(sites, tokens):
+    """Pairs (i, j), i < j, that share a geohash neighbourhood, a name key or a link."""
+    pairs = set()
+    index = GeohashIndex((i, *site.coords) for i, site in enumerate(sites) if site.coords)
+    for i, site in enumerate(sites):
+        coords = site.coords
+        if coords:
+            for _, j in index.nearby(*coords, MAX_DISTANCE_M):
+                if i < j:
+                    pairs.add((i, j))
+
+    for key_of in (lambda i: name_key(tokens[i]), lambda i: sites[i].wikipedia_link):
+        blocks = {}
+        for i in range(len(sites)):
+            key = key_of(i)
+            if key:
+                blocks.setdefault(key, []).append(i)
+        for members in blocks.values():
+            for x, i in enumerate(members):
+                for j in members[x + 1:]:
+                    pairs.add((i, j))
+    return pairs
+
+
+def find_duplicates(sites, threshold=THRESHOLD):
+    """
+    Returns (groups, stats): groups is a list of index lists (two or more sites each,
+    in file order); stats has the number of sites, candidate pairs and matched pairs.
+    """
+    tokens = [name_tokens(site.name) for site in sites]
+    pairs = candidate_pairs(sites, tokens)
+
+    scored = []
+    for i, j in pairs:
+        score, name, same_link, _ = score_pair(sites[i], sites[j], tokens[i], tokens[j])
+        if score >= threshold and is_match(sites[i], sites[j], tokens[i], tokens[j], name, same_link):
+            scored.append((-score, i, j))
+
+    # Per group root: {category: entry keys of the group's sites in it}
+    clusters = DisjointSet()
+    listed = {}
+    matched = 0
+    for _, i, j in sorted(scored):
+        root_i, root_j = clusters.find(i), clusters.find(j)
+        if root_i == root_j:
+            continue
+        listed_i = listed.get(root_i) or _listed(sites[i], tokens[i])
+        listed_j = listed.get(root_j) or _listed(sites[j], tokens[j])
+        if _conflict(listed_i, listed_j):
+            continue
+        clusters.union(i, j)
+        for category, links in listed_j.items():
+            listed_i[category] = listed_i.get(category, set()) | links
+        listed.pop(root_j, None)
+        listed.pop(root_i, None)
+        listed[clusters.find(i)] = listed_i
+        matched += 1
+
+    members = {}
+    for i in clusters.parent:
+        members.setdefault(clusters.find(i), []).append(i)
+    groups = sorted(sorted(group) for group in members.values() if len(group) > 1)
+    stats = {"sites": len(sites), "candidate_pairs": len(pairs), "matched_pairs": matched}
+    return groups, stats
+
+
+def _listed(site, tokens):
+    return {category: {entry_key(site, tokens)} for category in categories_of(site)}
+
+
+def _conflict(a, b):
+    """Whether two groups hold different entries of one category."""
+    return any(a[category] != b[category] for category in a.keys() & b.keys())
+
+
+def merge_group(records):
+    """One record for a group of duplicates, based on the first."""
+    merged = records[0].copy()
+    for record in records[1:]:
+        for key in ("image", "location", "wikipedia_link"):
+            if not getattr(merged, key) and getattr(record, key):
+                setattr(merged, key, getattr(record, key))
+        if merged.coords is None and record.coords is not None:
+            merged.latitude, merged.longitude = record.coords
+        if record.visited is VisitState.VISITED:
+            merged.visited = VisitState.VISITED
+
+    categories = []
+    for record in records:
+        for category in record.categories or [record.category]:
+            if category not in categories:
+                categories.append(category)
+    merged.categories = categories
+    merged_ids = []
+    for record in records:
+        for key in record.merged_ids or [record.id]:
+            if key not in merged_ids:
+                merged_ids.append(key)
+    merged.merged_ids = merged_ids
+    return merged
+
+
+def dedupe(sites, threshold=THRESHOLD):
+    """Pipeline stage: merges duplicate sites. Returns the shorter list, in file order."""
+    start = time.perf_counter()
+    groups, stats = find_duplicates(sites, threshold)
+    replaced = {}
+    dropped = set()
+    for group in groups:
+        replaced[group[0]] = merge_group([sites[i] for i in group])
+        dropped.update(group[1:])
+    result = [replaced.get(i, site) for i, site in enumerate(sites) if i not in dropped]
+    print(f"Merged {len(dropped) + len(groups)} sites into {len(groups)} "
+          f"({stats['candidate_pairs']} candidate pairs of {len(sites) * (len(sites) - 1) // 2} possible, "
+          f"{time.perf_counter() - start:.2f}s)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge sites listed more than once across categories.")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--dry-run", action="store_true", help="list the groups without writing")
+    args = parser.parse_args()
+
+    sites = read_sites(SITES_JSON_PATH)
+
+    if args.dry_run:
+        groups, stats = find_duplicates(sites, args.threshold)
+        for group in groups:
+            print(" | ".join(f"{sites[i].name} [{sites[i].category}]" for i in group))
+        print(f"{len(groups)} groups; {stats['candidate_pairs']} candidate pairs, "
+              f"{stats['matched_pairs']} matched")
+        return
+
+    sites = dedupe(sites, args.threshold)
+
+    write_sites(sites, SITES_JSON_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,38 @@
-import json
+import os
+import sys
 
-# File path
-sites_file = "../../../data/processed/sites.json"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import SITES_JSON_PATH
+from common.site import read_sites, write_sites
 
-# Load sites.json
-with open(sites_file, "r", encoding="utf-8") as f:
-    sites = json.load(f)
 
-# Create a dictionary mapping names to their image URLs
-image_lookup = {site["name"]: site["image"] for site in sites if site["image"]}
+def fill_duplicate_images(sites):
+    """Gives sites without an image the image of another site with the same name."""
+    # Create a dictionary mapping names to their image URLs
+    image_lookup = {site.name: site.image for site in sites if site.image}
 
-# Update missing images
-updated_count = 0
-for site in sites:
-    if site["image"] == "" and site["name"] in image_lookup:
-        site["image"] = image_lookup[site["name"]]
-        updated_count += 1
+    # Update missing images
+    updated_count = 0
+    for site in sites:
+        if site.image == "" and site.name in image_lookup:
+            site.image = image_lookup[site.name]
+            updated_count += 1
 
-# Save the updated JSON
-with open(sites_file, "w", encoding="utf-8") as f:
-    json.dump(sites, f, indent=2)
+    print(f"Updated {updated_count} missing images")
+    return sites
 
-print(f"Updated {updated_count} missing images in {sites_file}")
+
+def main():
+    # Load sites.json
+    sites = read_sites(SITES_JSON_PATH)
+
+    fill_duplicate_images(sites)
+
+    # Save the updated JSON
+    write_sites(sites, SITES_JSON_PATH)
+
+    print(f"Saved {SITES_JSON_PATH}")
+
+
+if __name__ == "__main__":
+    main()
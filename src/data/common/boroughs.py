@@ -0,0 +1,47 @@
+"""
+The five boroughs under one spelling each, and the borough a Wikipedia list page covers.
+
+The NRHP and designated-landmark scrapers read one list page per borough (Manhattan in
+several parts), so every row they produce already says which borough it was listed in.
+"""
+from urllib.parse import unquote, urlsplit
+
+BOROUGHS = ("Manhattan", "Brooklyn", "Queens", "The Bronx", "Staten Island")
+
+# Other spellings (boundary files, page titles) -> the one in BOROUGHS
+_ALIASES = {name.casefold(): name for name in BOROUGHS}
+_ALIASES.update({"bronx": "The Bronx", "new york county": "Manhattan", "kings county": "Brooklyn",
+                 "queens county": "Queens", "bronx county": "The Bronx", "richmond county": "Staten Island"})
+
+
+def normalize_borough(name):
+    """The BOROUGHS spelling of a borough name, or None if it isn't one."""
+    if not name:
+        return None
+    return _ALIASES.get(name.strip().casefold())
+
+
+def list_page_borough(url):
+    """
+    The borough a per-borough list page covers, from its title:
+      .../wiki/National_Register_of_Historic_Places_listings_in_Queens,_New_York -> "Queens"
+      .../wiki/List_of_New_York_City_Designated_Landmarks_in_the_Bronx -> "The Bronx"
+    Also takes the '#/media/File:...' image links built from those pages.
+    Returns None for other pages.
+    """
+    if not url:
+        return None
+    path = unquote(urlsplit(url).path)
+    if not path.startswith("/wiki/"):
+        return None
+    title = path[len("/wiki/"):].replace("_", " ")
+    if " in " not in title or not title.startswith(("National Register of Historic Places listings",
+                                                    "List of New York City Designated Landmarks")):
+        return None
+    place = title.rsplit(" in ", 1)[1]
+    # "Manhattan below 14th Street", "Queens, New York", "the Bronx"
+    for borough in BOROUGHS:
+        short = borough.removeprefix("The ")
+        if place.casefold().startswith((borough.casefold(), short.casefold())):
+            return borough
+    return None
@@ -0,0 +1,235 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+
+from common import paths
+
+CACHE_DIR = os.path.join(paths.CACHE_DIR, "http")
+
+# Entries younger than this are served without asking the server at all;
+# older ones are revalidated with a conditional GET
+DEFAULT_TTL = int(os.getenv("HTTP_CACHE_TTL", 7 * 24 * 3600))
+
+# Total size of stored (compressed) bodies before least-recently-used entries are evicted
+DEFAULT_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+# Replay mode: never touch the network, serve whatever is cached regardless of age
+CACHE_ONLY = os.getenv("HTTP_CACHE_ONLY", "") not in ("", "0")
+
+# Query parameters that must not end up in cache keys or on disk (API keys)
+SECRET_PARAMS = {"key", "api_key", "apikey"}
+
+# Run an eviction pass after this many new bodies have been written
+EVICT_EVERY = 100
+
+
+class CacheMissError(requests.RequestException):
+    """Raised in cache-only mode when a request has no cached response."""
+
+
+class CachedResponse:
+    """
+    The parts of a requests.Response the pipeline uses (text, content, json()),
+    whether the body came from the network or from disk.
+    """
+
+    def __init__(self, url, status_code, headers, content, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def encoding(self):
+        content_type = self.headers.get("Content-Type", "")
+        for part in content_type.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name.lower() == "charset" and value:
+                return value.strip('"')
+        return "utf-8"
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        pass
+
+
+def cache_key(url, params=None):
+    """
+    Returns the sha256 hex key for a URL and its params (order-insensitive,
+    secrets dropped).
+    """
+    items = sorted((k, str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    raw = url + "?" + urlencode(items) if items else url
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    Persistent response cache.
+
+    Layout under root:
+      entries/ab/<key>.json  request metadata: url, validators, timestamps, body hash
+      blobs/cd/<sha>.gz      gzip-compressed bodies, named by the sha256 of the body,
+                             so identical responses to different requests are stored once
+    """
+
+    def __init__(self, root=CACHE_DIR, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, "entries", key[:2], key + ".json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "blobs", digest[:2], digest + ".gz")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _write_entry(self, entry):
+        data = json.dumps(entry, sort_keys=True).encode("utf-8")
+        self._write_atomic(self._entry_path(entry["key"]), data)
+
+    def lookup(self, url, params=None):
+        """Returns the stored entry dict for the request, or None."""
+        key = cache_key(url, params)
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not os.path.exists(self._blob_path(entry["body"])):
+            return None
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def validators(entry):
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, entry):
+        """Reads an entry's body back as a CachedResponse and marks it recently used."""
+        with open(self._blob_path(entry["body"]), "rb") as f:
+            content = gzip.decompress(f.read())
+        entry["accessed_at"] = time.time()
+        self._write_entry(entry)
+        headers = {"Content-Type": entry.get("content_type", "")}
+        return CachedResponse(entry["url"], 200, headers, content, from_cache=True)
+
+    def revalidated(self, entry, response):
+        """Handles a 304: the stored body is still current, so restart its TTL."""
+        entry["stored_at"] = time.time()
+        entry["etag"] = response.headers.get("ETag", entry.get("etag"))
+        entry["last_modified"] = response.headers.get("Last-Modified", entry.get("last_modified"))
+        return self.load(entry)
+
+    def store(self, url, params, response):
+        """Saves a 200 response and returns it as a CachedResponse."""
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            self._write_atomic(blob_path, gzip.compress(content, compresslevel=6))
+
+        now = time.time()
+        self._write_entry({
+            "key": cache_key(url, params),
+            "url": url,
+            "body": digest,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type", ""),
+            "size": os.path.getsize(blob_path),
+            "stored_at": now,
+            "accessed_at": now,
+        })
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+        headers = {"Content-Type": response.headers.get("Content-Type", "")}
+        return CachedResponse(url, response.status_code, headers, content)
+
+    def _entries(self):
+        entries_dir = os.path.join(self.root, "entries")
+        for dirpath, _, filenames in os.walk(entries_dir):
+            for filename in filenames:
+                if not filename.endswith(".json"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        yield path, json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    continue
+
+    def evict(self):
+        """
+        Drops least-recently-used entries until stored bodies fit in max_bytes,
+        then deletes bodies no entry refers to any more.
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda item: item[1].get("accessed_at", 0))
+            sizes = {}
+            for _, entry in entries:
+                sizes[entry["body"]] = entry.get("size", 0)
+            total = sum(sizes.values())
+
+            refcount = {}
+            for _, entry in entries:
+                refcount[entry["body"]] = refcount.get(entry["body"], 0) + 1
+
+            removed = 0
+            for path, entry in entries:
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                removed += 1
+                refcount[entry["body"]] -= 1
+                if refcount[entry["body"]] == 0:
+                    total -= sizes[entry["body"]]
+
+            # Bodies written in the last minute may belong to an entry that is still being stored
+            live = {digest for digest, count in refcount.items() if count > 0}
+            cutoff = time.time() - 60
+            blobs_dir = os.path.join(self.root, "blobs")
+            for dirpath, _, filenames in os.walk(blobs_dir):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    if filename.endswith(".gz") and filename[:-3] not in live \
+                            and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+            return removed
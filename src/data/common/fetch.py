@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common import instrument
+from common.cache import CACHE_ONLY, CacheMissError, CachedResponse, HttpCache
+
+# Upper bound on pages in flight across all hosts
+MAX_WORKERS = 8
+
+# Upper bound on pages in flight against any single host (Wikipedia asks for politeness)
+PER_HOST_LIMIT = 4
+
+# Retry transient failures with exponential backoff: 0.5s, 1s, 2s, ...
+MAX_RETRIES = 4
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_TIMEOUT = 30
+
+USER_AGENT = "nyc-sites/1.0 (https://github.com/zachpinto/nyc-sites)"
+
+# Point every request at a local stand-in instead of the real host,
+# e.g. FETCH_BASE_OVERRIDE=http://127.0.0.1:8000 (see common/fixture_server.py)
+BASE_OVERRIDE = os.getenv("FETCH_BASE_OVERRIDE", "")
+
+_session = None
+_session_lock = threading.Lock()
+_cache = HttpCache()
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the shared requests.Session, creating it on first use.
+    The session keeps a connection pool per host and retries transient errors.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=MAX_RETRIES,
+                backoff_factor=BACKOFF_FACTOR,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=MAX_WORKERS,
+                pool_maxsize=MAX_WORKERS,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def rewrite_url(url):
+    """
+    Rewrites scheme and host of a URL to BASE_OVERRIDE (if set), keeping the
+    original host as the first path segment so the stand-in can tell sites apart:
+      https://en.wikipedia.org/wiki/X -> http://127.0.0.1:8000/en.wikipedia.org/wiki/X
+    """
+    if not BASE_OVERRIDE:
+        return url
+    parts = urlsplit(url)
+    base = urlsplit(BASE_OVERRIDE)
+    path = f"{base.path.rstrip('/')}/{parts.netloc}{parts.path}"
+    return urlunsplit((base.scheme, base.netloc, path, parts.query, parts.fragment))
+
+
+@contextmanager
+def _host_slot(url):
+    """Blocks until fewer than PER_HOST_LIMIT requests are in flight for the URL's host."""
+    host = urlsplit(url).netloc
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+    with slot:
+        yield
+
+
+def fetch(url, params=None, timeout=DEFAULT_TIMEOUT, use_cache=True):
+    """
+    GETs a URL through the shared session and the on-disk HTTP cache,
+    honoring the per-host limit.
+      - fresh cache entries are returned without a request
+      - stale ones are revalidated with If-None-Match / If-Modified-Since
+      - with HTTP_CACHE_ONLY=1 the network is never used (CacheMissError on a miss)
+    Raises requests.RequestException on failure (after retries).
+    Returns a CachedResponse (.text, .content, .json(), .from_cache).
+    """
+    with instrument.span("http.get", host=urlsplit(url).netloc) as fields:
+        entry = _cache.lookup(url, params) if use_cache else None
+        if entry and (CACHE_ONLY or _cache.is_fresh(entry)):
+            instrument.count("http.cache_hits")
+            fields["cache"] = "hit"
+            return _cache.load(entry)
+        if use_cache and CACHE_ONLY:
+            raise CacheMissError(f"Not cached (cache-only mode): {url}")
+
+        headers = _cache.validators(entry) if entry else {}
+        request_url = rewrite_url(url)
+        queued = time.perf_counter()
+        with _host_slot(request_url):
+            fields["queued_seconds"] = round(time.perf_counter() - queued, 6)
+            response = get_session().get(request_url, params=params, headers=headers, timeout=timeout)
+
+        # urllib3 keeps the retries it made on the raw response
+        retries = getattr(response.raw, "retries", None)
+        retried = len(retries.history) if retries is not None else 0
+        instrument.count("http.requests")
+        instrument.count("http.retries", retried)
+        instrument.count("http.bytes", len(response.content))
+        fields.update(status=response.status_code, bytes=len(response.content), retries=retried)
+
+        if entry and response.status_code == 304:
+            instrument.count("http.revalidated")
+            fields["cache"] = "revalidated"
+            return _cache.revalidated(entry, response)
+        response.raise_for_status()
+        if use_cache:
+            return _cache.store(url, params, response)
+        return CachedResponse(url, response.status_code, response.headers, response.content)
+
+
+def fetch_pages(urls, max_workers=MAX_WORKERS, as_bytes=False):
+    """
+    Downloads several pages in parallel.
+    Yields (url, html, error) tuples in completion order, so callers can
+    parse each page as soon as it arrives. Exactly one of html / error is None.
+    With as_bytes, html is the undecoded body (cheaper to hand to another process).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(fetch, url): url for url in urls}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                response = future.result()
+                yield url, response.content if as_bytes else response.text, None
+            except requests.RequestException as e:
+                yield url, None, e
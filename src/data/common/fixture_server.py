@@ -0,0 +1,149 @@
+"""
+Local HTTP stand-in that serves saved pages instead of the real sites.
+
+Fixtures live under data/fixtures/http/<host>/<path>, e.g.
+  data/fixtures/http/en.wikipedia.org/wiki/List_of_tallest_buildings_in_New_York_City
+
+Usage:
+  python common/fixture_server.py --record URL [URL ...]   # save live pages as fixtures
+  python common/fixture_server.py --port 8000              # serve them
+  FETCH_BASE_OVERRIDE=http://127.0.0.1:8000 python scrapers/skyscrapers.py
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import paths
+from common.fetch import fetch_pages
+
+FIXTURES_DIR = os.path.join(paths.FIXTURES_DIR, "http")
+
+
+def fixture_path(root, host, path, query=""):
+    """
+    Maps a request to its file under root.
+    Requests with a query string get a short hash suffix so API calls can be recorded too.
+    """
+    relative = unquote(path).lstrip("/") or "index.html"
+    if query:
+        relative += "__" + hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+    full = os.path.normpath(os.path.join(root, host, relative))
+    if not full.startswith(os.path.normpath(root) + os.sep):
+        raise ValueError(f"Refusing to map {path} outside the fixture root")
+    return full
+
+
+def make_handler(root, delay=0.0, failures=None):
+    """
+    A handler serving fixtures from root, each response after `delay` seconds.
+    failures maps a request path (/<host>/<path>) to how many 503s to answer before the
+    page, to exercise the fetch layer's retries.
+    """
+    failures = dict(failures or {})
+    lock = threading.Lock()
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        # Requests handled so far, and the most handled at once
+        stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+        def do_GET(self):
+            with lock:
+                self.stats["requests"] += 1
+                self.stats["in_flight"] += 1
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+                fail = failures.get(self.path.split("?", 1)[0], 0) > 0
+                if fail:
+                    failures[self.path.split("?", 1)[0]] -= 1
+            try:
+                time.sleep(delay)
+                if fail:
+                    self.send_error(503, "Simulated failure")
+                    return
+                self._serve()
+            finally:
+                with lock:
+                    self.stats["in_flight"] -= 1
+
+        def _serve(self):
+            # The first path segment is the original host (see fetch.rewrite_url)
+            parts = urlsplit(self.path)
+            host, _, path = parts.path.lstrip("/").partition("/")
+            try:
+                filepath = fixture_path(root, host, "/" + path, parts.query)
+            except ValueError:
+                self.send_error(400)
+                return
+            if not os.path.isfile(filepath):
+                self.send_error(404, f"No fixture for {self.path}")
+                return
+            with open(filepath, "rb") as f:
+                body = f.read()
+            # Validators let the HTTP cache exercise conditional GETs against the stand-in
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_server(root=FIXTURES_DIR, port=0, delay=0.0, failures=None):
+    """
+    Starts the stand-in on a background thread (see make_handler for delay / failures).
+    Returns (server, base_url); server.RequestHandlerClass.stats counts the requests.
+    Call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(root, delay, failures))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def record(urls, root=FIXTURES_DIR):
+    """Downloads each URL once and saves it where the stand-in will look for it."""
+    for url, html, error in fetch_pages(urls):
+        if error:
+            print(f"Failed to record {url}: {error}")
+            continue
+        parts = urlsplit(url)
+        filepath = fixture_path(root, parts.netloc, parts.path, parts.query)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"Recorded {url} -> {filepath}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve or record HTML fixtures.")
+    parser.add_argument("--root", default=FIXTURES_DIR)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--record", nargs="+", metavar="URL")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.root)
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.root))
+    print(f"Serving fixtures from {args.root} on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Geohash cells and a bucketed point index on top of them.
+
+A geohash of precision p splits the world into a grid (5 bits per character, longitude
+and latitude bits interleaved), so points in the same cell share a string prefix and a
+bounding box is covered by a small, directly computable set of cells.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _bits(precision):
+    """(longitude bits, latitude bits) of a geohash with this many characters."""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def cell_size(precision):
+    """(height, width) of one cell in degrees."""
+    lng_bits, lat_bits = _bits(precision)
+    return 180 / 2 ** lat_bits, 360 / 2 ** lng_bits
+
+
+def _cell_index(lat, lng, precision):
+    lng_bits, lat_bits = _bits(precision)
+    lat_index = min(int((lat + 90) / 180 * 2 ** lat_bits), 2 ** lat_bits - 1)
+    lng_index = min(int((lng + 180) / 360 * 2 ** lng_bits), 2 ** lng_bits - 1)
+    return max(lat_index, 0), max(lng_index, 0)
+
+
+def _from_index(lat_index, lng_index, precision):
+    lng_bits, lat_bits = _bits(precision)
+    value = 0
+    # Bits alternate longitude, latitude, longitude, ... from the most significant
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            lng_bits -= 1
+            bit = (lng_index >> lng_bits) & 1
+        else:
+            lat_bits -= 1
+            bit = (lat_index >> lat_bits) & 1
+        value = (value << 1) | bit
+    return "".join(BASE32[(value >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+
+def encode(lat, lng, precision=6):
+    """Geohash of a point, e.g. encode(40.7484, -73.9857, 6) == "dr5ru6"."""
+    return _from_index(*_cell_index(lat, lng, precision), precision)
+
+
+def cells_in_bbox(south, west, north, east, precision):
+    """Every cell of this precision that overlaps the box (no antimeridian wrap)."""
+    south_index, west_index = _cell_index(south, west, precision)
+    north_index, east_index = _cell_index(north, east, precision)
+    return [_from_index(lat_index, lng_index, precision)
+            for lat_index in range(south_index, north_index + 1)
+            for lng_index in range(west_index, east_index + 1)]
+
+
+def count_cells(south, west, north, east, precision):
+    south_index, west_index = _cell_index(south, west, precision)
+    north_index, east_index = _cell_index(north, east, precision)
+    return (north_index - south_index + 1) * (east_index - west_index + 1)
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class GeohashIndex:
+    """
+    Points bucketed by geohash at several precisions. A box query picks the finest
+    precision that covers the box in at most max_cells cells, so a street-level view
+    touches a few small buckets and a whole-city view a few large ones. The box is first
+    clipped to the points' extent, and a box that still needs more cells than there are
+    points (a world-sized box over scattered points) is answered by scanning the points.
+    """
+
+    def __init__(self, points, precisions=(4, 5, 6, 7), max_cells=64):
+        """points: iterable of (key, lat, lng)."""
+        self.precisions = sorted(precisions)
+        self.max_cells = max_cells
+        self.coords = {}
+        self.buckets = {precision: {} for precision in self.precisions}
+        # (south, west, north, east) of all points, None while there are none
+        self.extent = None
+        # Buckets are keyed by the cell's (row, column) rather than its geohash string:
+        # the same cells, without encoding one string per cell on every query
+        for key, lat, lng in points:
+            self.coords[key] = (lat, lng)
+            if self.extent is None:
+                self.extent = (lat, lng, lat, lng)
+            else:
+                self.extent = (min(self.extent[0], lat), min(self.extent[1], lng),
+                               max(self.extent[2], lat), max(self.extent[3], lng))
+            for precision in self.precisions:
+                self.buckets[precision].setdefault(_cell_index(lat, lng, precision), []).append(key)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def in_bbox(self, south, west, north, east):
+        """Keys of the points inside the box, in insertion order within each cell."""
+        if self.extent is None:
+            return []
+        # Only the part of the box that holds points needs walking
+        low_lat, low_lng = max(south, self.extent[0]), max(west, self.extent[1])
+        high_lat, high_lng = min(north, self.extent[2]), min(east, self.extent[3])
+        if low_lat > high_lat or low_lng > high_lng:
+            return []
+
+        precision = None
+        for candidate in reversed(self.precisions):
+            if count_cells(low_lat, low_lng, high_lat, high_lng, candidate) <= self.max_cells:
+                precision = candidate
+                break
+        if precision is None:
+            precision = self.precisions[0]
+            if count_cells(low_lat, low_lng, high_lat, high_lng, precision) > len(self.coords):
+                return [key for key, (lat, lng) in self.coords.items()
+                        if south <= lat <= north and west <= lng <= east]
+
+        buckets = self.buckets[precision]
+        south_index, west_index = _cell_index(low_lat, low_lng, precision)
+        north_index, east_index = _cell_index(high_lat, high_lng, precision)
+        found = []
+        for lat_index in range(south_index, north_index + 1):
+            for lng_index in range(west_index, east_index + 1):
+                for key in buckets.get((lat_index, lng_index), ()):
+                    lat, lng = self.coords[key]
+                    if south <= lat <= north and west <= lng <= east:
+                        found.append(key)
+        return found
+
+    def nearby(self, lat, lng, radius_m):
+        """[(distance in meters, key)] for the points within radius_m, nearest first."""
+        d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+        d_lng = d_lat / max(math.cos(math.radians(lat)), 1e-6)
+        found = []
+        for key in self.in_bbox(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng):
+            distance = haversine_m(lat, lng, *self.coords[key])
+            if distance <= radius_m:
+                found.append((distance, key))
+        found.sort()
+        return found
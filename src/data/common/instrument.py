@@ -0,0 +1,184 @@
+"""
+Lightweight instrumentation for the src/data scripts: timing spans, counters,
+opt-in per-span cProfile dumps, JSON-lines logs and an end-of-run summary.
+
+  with instrument.span("stage.geocode", records_in=len(sites)) as fields:
+      sites = geocode_sites(sites)
+      fields["records_out"] = len(sites)
+  instrument.count("http.bytes", len(content))
+
+Spans nest per thread (each log line names its parent) and are aggregated by name,
+so the summary shows where a run's time went: "http.get" (network, including waits
+for a per-host slot), "parse.soup" (BeautifulSoup), "ratelimit.wait" (sleeping for
+the MapQuest token bucket), "json.load" / "json.dump", and one "stage.<name>" per
+pipeline stage. Span totals are summed over threads, so spans run from a pool can
+add up to more than the wall time.
+
+Configured through the environment:
+  INSTRUMENT_LOG=path       append one JSON object per span to path ("-" for stderr)
+  INSTRUMENT_PROFILE=names  cProfile spans whose names match (comma-separated fnmatch
+                            patterns, e.g. "stage.*"); each is dumped to
+                            data/cache/profiles/<name>-<timestamp>.prof
+  INSTRUMENT_SUMMARY=1      print the summary when the process exits
+                            (pipeline.py prints it at the end of every run)
+"""
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from fnmatch import fnmatchcase
+
+from common.paths import CACHE_DIR
+
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+
+LOG_PATH = os.getenv("INSTRUMENT_LOG", "")
+PROFILE_PATTERNS = [pattern.strip() for pattern in os.getenv("INSTRUMENT_PROFILE", "").split(",") if pattern.strip()]
+SUMMARY_AT_EXIT = os.getenv("INSTRUMENT_SUMMARY", "") not in ("", "0")
+
+_lock = threading.Lock()
+_local = threading.local()
+_spans = {}
+_counters = {}
+_log_file = None
+_reported = False
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+        _local.profiling = False
+    return _local.stack
+
+
+def _write(record):
+    """Appends one JSON object to the log, if INSTRUMENT_LOG is set."""
+    global _log_file
+    if not LOG_PATH:
+        return
+    line = json.dumps(record, separators=(",", ":"), default=str)
+    with _lock:
+        if _log_file is None:
+            if LOG_PATH == "-":
+                _log_file = sys.stderr
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(LOG_PATH)), exist_ok=True)
+                _log_file = open(LOG_PATH, "a", encoding="utf-8", buffering=1)
+        _log_file.write(line + "\n")
+
+
+def profile(*patterns):
+    """Turns on cProfile dumps for spans matching these patterns (as INSTRUMENT_PROFILE does)."""
+    PROFILE_PATTERNS.extend(patterns)
+
+
+def _should_profile(name):
+    return any(fnmatchcase(name, pattern) for pattern in PROFILE_PATTERNS)
+
+
+def _dump_profile(profiler, name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    profiler.dump_stats(path)
+    print(f"Saved profile of {name} to {path} (view with: python -m pstats {path})")
+    return path
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Times the block under `name`. Yields the span's fields dict, so the block can add
+    results (records_out, bytes, ...) that go into its log line. An exception is
+    recorded as the span's "error" and re-raised.
+    cProfile only sees the calling thread, and profiles never nest: a matching span
+    inside one already being profiled is just timed.
+    """
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    stack.append(name)
+    profiler = None
+    if PROFILE_PATTERNS and not _local.profiling and _should_profile(name):
+        profiler = cProfile.Profile()
+        _local.profiling = True
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield fields
+    except BaseException as e:
+        fields["error"] = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            _local.profiling = False
+            fields["profile"] = _dump_profile(profiler, name)
+        stack.pop()
+        with _lock:
+            totals = _spans.setdefault(name, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+        _write({"ts": round(time.time(), 6), "event": "span", "name": name, "seconds": round(seconds, 6),
+                "parent": parent, "thread": threading.current_thread().name, **fields})
+
+
+def count(name, value=1):
+    """Adds value to a counter (records, cache hits, retries, bytes, ...)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def counters():
+    """A snapshot of every counter."""
+    with _lock:
+        return dict(_counters)
+
+
+def spans():
+    """A snapshot of every span name's {count, seconds, max_seconds}."""
+    with _lock:
+        return {name: {"count": n, "seconds": round(total, 6), "max_seconds": round(longest, 6)}
+                for name, (n, total, longest) in _spans.items()}
+
+
+def reset():
+    global _reported
+    with _lock:
+        _spans.clear()
+        _counters.clear()
+        _reported = False
+
+
+def report(file=None):
+    """Prints the span and counter totals so far, and logs them as one "summary" record."""
+    global _reported
+    file = file or sys.stdout
+    span_totals, counter_totals = spans(), counters()
+    _reported = True
+    if not span_totals and not counter_totals:
+        return
+    _write({"ts": round(time.time(), 6), "event": "summary", "spans": span_totals, "counters": counter_totals})
+
+    print(f"\n{'span':<28} {'count':>7} {'total':>10} {'mean':>10} {'max':>10}", file=file)
+    for name, totals in sorted(span_totals.items(), key=lambda item: -item[1]["seconds"]):
+        mean = totals["seconds"] / totals["count"]
+        print(f"{name:<28} {totals['count']:>7} {totals['seconds']:>9.3f}s {mean:>9.4f}s "
+              f"{totals['max_seconds']:>9.3f}s", file=file)
+    if counter_totals:
+        print(f"\n{'counter':<28} {'value':>12}", file=file)
+        for name, value in sorted(counter_totals.items()):
+            shown = f"{value:,.3f}" if isinstance(value, float) else f"{value:,}"
+            print(f"{name:<28} {shown:>12}", file=file)
+
+
+def _at_exit():
+    if SUMMARY_AT_EXIT and not _reported:
+        report()
+
+
+atexit.register(_at_exit)
@@ -0,0 +1,73 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class KeyValueStore:
+    """
+    Small persistent key -> JSON value store on SQLite, safe to share between threads.
+    Every put is committed immediately, so an interrupted run keeps everything stored so far.
+    """
+
+    def __init__(self, path, table="kv"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys that are stored."""
+        keys = list(keys)
+        found = {}
+        # SQLite caps the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            for key, value in rows:
+                found[key] = json.loads(value)
+        return found
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        """Stores {key: value} in one transaction."""
+        rows = [(key, json.dumps(value, ensure_ascii=False)) for key, value in items.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)", rows
+                )
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,133 @@
+"""
+HTML parsing for the scrapers: targeted soups (make_soup) and the parse phase that
+runs a scraper's parse function over many pages on a process pool (parse_pages).
+
+Scraping is split in two: fetching is I/O and runs on threads (common/fetch.py), parsing
+is CPU-bound and runs here, one page per worker process, so a full re-scrape uses every
+core. parse_pages takes the (url, html, error) tuples fetch_pages yields, or the ones
+saved_pages reads from a directory of saved HTML, so the parse phase also runs offline.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import unquote, urlsplit
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from common import instrument
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# When False, every page is parsed into a full tree (the old behaviour);
+# benchmarks flip this to compare against the targeted path
+TARGETED = True
+
+
+def make_soup(html, *only, **only_attrs):
+    """
+    Builds a BeautifulSoup tree, keeping only the elements the caller asks for.
+
+    make_soup(html, "tr", class_="vcard") parses just the <tr class="vcard"> rows
+    (and their contents), so huge Wikipedia list pages never become a full tree.
+    With no filter arguments the whole page is parsed.
+    """
+    parse_only = None
+    if TARGETED and (only or only_attrs):
+        parse_only = SoupStrainer(*only, **only_attrs)
+    with instrument.span("parse.soup", bytes=len(html), targeted=parse_only is not None):
+        return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+# Pages are still being fetched on threads while the workers start, and a forked worker
+# could inherit a lock one of those threads holds; forkserver / spawn start them clean
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def saved_page_path(html_dir, url):
+    """
+    Where a page saved under html_dir is: the fixture layout (html_dir/<host>/<path>,
+    as common/fixture_server.py records it) or flat (html_dir/<title>[.html]).
+    Returns None when neither exists.
+    """
+    parts = urlsplit(url)
+    title = unquote(parts.path).rstrip("/").rsplit("/", 1)[-1]
+    for path in (os.path.join(html_dir, parts.netloc, unquote(parts.path).lstrip("/")),
+                 os.path.join(html_dir, title),
+                 os.path.join(html_dir, title + ".html")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def saved_pages(urls, html_dir):
+    """Yields (url, html bytes, error) for each URL from html_dir, like fetch_pages(as_bytes=True)."""
+    for url in urls:
+        path = saved_page_path(html_dir, url)
+        if path is None:
+            yield url, None, FileNotFoundError(f"no saved page under {html_dir}")
+            continue
+        with open(path, "rb") as f:
+            yield url, f.read(), None
+
+
+def _parse_page(parse, url, html):
+    """Runs in a worker: (records, seconds)."""
+    start = time.perf_counter()
+    records = parse(url, html)
+    return records, time.perf_counter() - start
+
+
+def parse_pages(pages, parse, max_workers=None):
+    """
+    Parses pages on a process pool as they arrive.
+    pages yields (url, html, error) tuples (fetch_pages / saved_pages); parse is a
+    module-level function taking (url, html) and returning a list of record dicts.
+    Yields (url, records, error) in completion order, without waiting for the rest of
+    pages; exactly one of records / error is None. A page that failed to fetch or to
+    parse is passed on with its error.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                             mp_context=multiprocessing.get_context(START_METHOD)) as pool:
+        futures = {}
+        for url, html, error in pages:
+            if error:
+                yield url, None, error
+                continue
+            futures[pool.submit(_parse_page, parse, url, html)] = url
+            yield from _finished(futures, [future for future in futures if future.done()])
+        yield from _finished(futures, as_completed(list(futures)))
+
+
+def _finished(futures, done):
+    for future in done:
+        url = futures.pop(future)
+        try:
+            records, seconds = future.result()
+        except Exception as e:  # raised in the worker by parse, or a worker that died
+            yield url, None, e
+            continue
+        instrument.count("parse.pages")
+        instrument.count("parse.worker_seconds", seconds)
+        yield url, records, None
+
+
+def in_order(results, urls):
+    """
+    Re-orders parse_pages' results to follow urls, yielding each page as soon as every
+    page before it is done, so output can be written while later pages still parse.
+    """
+    position = {url: i for i, url in enumerate(urls)}
+    pending = {}
+    next_index = 0
+    for result in results:
+        pending[position[result[0]]] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+    for index in sorted(pending):
+        yield pending[index]
@@ -0,0 +1,22 @@
+import os
+
+# Repository root, resolved from this file so scripts work from any working directory
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".."))
+
+DATA_DIR = os.path.join(ROOT_DIR, "data")
+RAW_DIR = os.path.join(DATA_DIR, "raw")
+PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+EXTERNAL_DIR = os.path.join(DATA_DIR, "external")
+FIXTURES_DIR = os.path.join(DATA_DIR, "fixtures")
+BUILD_DIR = os.path.join(DATA_DIR, "build")
+THUMBNAILS_DIR = os.path.join(DATA_DIR, "thumbnails")
+
+SITES_JSON_PATH = os.path.join(PROCESSED_DIR, "sites.json")
+FUTURE_SITES_JSON_PATH = os.path.join(PROCESSED_DIR, "future_sites.json")
+# SQLite store of the raw and processed records (store/sitedb.py)
+SITES_DB_PATH = os.path.join(PROCESSED_DIR, "sites.db")
+DELETE_LIST_PATH = os.path.join(DATA_DIR, "future_development", "delete_v1.txt")
+
+# Checklist state, kept out of sites.json (checklist/visit_log.py)
+VISIT_LOG_PATH = os.path.join(PROCESSED_DIR, "visits.jsonl")
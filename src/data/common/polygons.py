@@ -0,0 +1,147 @@
+"""
+Which polygon contains each point, for a whole column of points at once.
+
+Geometries are GeoJSON Polygon / MultiPolygon dicts in (longitude, latitude) order, and
+are assumed not to overlap: a point gets the first polygon that contains it. With shapely
+2 installed they go into an STRtree and all points are matched in one vectorized query
+(the tree prepares the geometries it tests). Without it, a numpy crossing-number test
+runs over horizontal bands: every edge is filed under the bands its latitude span
+touches, points are grouped by band, and each group is tested only against its band's
+edges, one matrix per group.
+"""
+import numpy as np
+
+try:
+    import shapely
+    from shapely.geometry import shape
+except ImportError:  # optional: the numpy index is used without it
+    shapely = None
+
+ENGINES = ("shapely", "numpy")
+
+# Points x edges tested per matrix in the numpy index (bounds its memory)
+MAX_CELLS = 1 << 20
+
+
+def rings(geometry):
+    """The rings (outer and holes) of a Polygon or MultiPolygon, as (n, 2) arrays."""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Not a polygon: {geometry['type']}")
+    for polygon in polygons:
+        for ring in polygon:
+            yield np.asarray(ring, dtype=np.float64)[:, :2]
+
+
+class PolygonIndex:
+    """
+    Point-in-polygon lookups over a fixed list of geometries.
+    engine is "shapely", "numpy", or None for shapely when it is installed.
+    """
+
+    def __init__(self, geometries, engine=None, bands=None):
+        geometries = list(geometries)
+        if engine is None:
+            engine = "shapely" if shapely is not None else "numpy"
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
+        if engine == "shapely" and shapely is None:
+            raise ImportError("The shapely engine needs shapely 2 (pip install shapely)")
+        self.engine = engine
+        self.size = len(geometries)
+        if engine == "shapely":
+            self._tree = shapely.STRtree([shape(geometry) for geometry in geometries])
+        else:
+            self._build_bands(geometries, bands)
+
+    def __len__(self):
+        return self.size
+
+    def _build_bands(self, geometries, bands):
+        starts, ends, owners = [], [], []
+        for owner, geometry in enumerate(geometries):
+            for ring in rings(geometry):
+                # Every vertex to the next, wrapping round; a closed ring's repeated
+                # last vertex makes a zero-length edge, dropped below with the horizontals
+                starts.append(ring)
+                ends.append(np.roll(ring, -1, axis=0))
+                owners.append(np.full(len(ring), owner, dtype=np.int64))
+        if not starts:
+            starts = ends = [np.empty((0, 2))]
+            owners = [np.empty(0, dtype=np.int64)]
+        start, end, owner = np.concatenate(starts), np.concatenate(ends), np.concatenate(owners)
+        keep = start[:, 1] != end[:, 1]
+        start, end, owner = start[keep], end[keep], owner[keep]
+
+        low = np.minimum(start[:, 1], end[:, 1])
+        high = np.maximum(start[:, 1], end[:, 1])
+        count = len(owner)
+        self.bands = bands or max(1, int(np.sqrt(count)) * 4)
+        self.south = float(low.min()) if count else 0.0
+        self.north = float(high.max()) if count else 0.0
+        self.band_height = (self.north - self.south) / self.bands or 1.0
+
+        # One copy of each edge per band it spans, sorted by band and then by polygon
+        first = self._band_of(low)
+        last = self._band_of(high)
+        spans = last - first + 1
+        copies = np.repeat(np.arange(count), spans)
+        offsets = np.repeat(np.cumsum(spans) - spans, spans)
+        band = first[copies] + (np.arange(len(copies)) - offsets)
+        order = np.lexsort((owner[copies], band))
+        copies, band = copies[order], band[order]
+
+        self._low, self._high = low[copies], high[copies]
+        self._x0, self._y0 = start[copies, 0], start[copies, 1]
+        self._slope = ((end[:, 0] - start[:, 0]) / (end[:, 1] - start[:, 1]))[copies]
+        self._owner = owner[copies]
+        self._band_starts = np.searchsorted(band, np.arange(self.bands + 1))
+
+    def _band_of(self, lat):
+        return np.clip(((lat - self.south) / self.band_height).astype(np.int64), 0, self.bands - 1)
+
+    def locate(self, lngs, lats):
+        """Index of the geometry containing each point, -1 where none does (or the point is NaN)."""
+        lngs = np.asarray(lngs, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        found = np.full(len(lats), -1, dtype=np.int64)
+        valid = np.isfinite(lngs) & np.isfinite(lats)
+        if self.engine == "shapely":
+            rows = np.flatnonzero(valid)
+            points, polygons = self._tree.query(shapely.points(lngs[rows], lats[rows]), predicate="within")
+            # Reversed, so the first polygon listed for a point is written last and wins
+            found[rows[points[::-1]]] = polygons[::-1]
+            return found
+
+        rows = np.flatnonzero(valid & (lats >= self.south) & (lats <= self.north))
+        bands = self._band_of(lats[rows])
+        order = np.argsort(bands, kind="stable")
+        rows, bands = rows[order], bands[order]
+        bounds = np.searchsorted(bands, np.arange(self.bands + 1))
+        for b in np.unique(bands):
+            edge_start, edge_end = self._band_starts[b], self._band_starts[b + 1]
+            if edge_start == edge_end:
+                continue
+            members = rows[bounds[b]:bounds[b + 1]]
+            step = max(1, MAX_CELLS // (edge_end - edge_start))
+            for chunk_start in range(0, len(members), step):
+                chunk = members[chunk_start:chunk_start + step]
+                found[chunk] = self._locate_in_band(lngs[chunk], lats[chunk], edge_start, edge_end)
+        return found
+
+    def _locate_in_band(self, lngs, lats, edge_start, edge_end):
+        """Crossing-number test of some points against one band's edges."""
+        edges = slice(edge_start, edge_end)
+        x, y = lngs[:, None], lats[:, None]
+        # Half-open in latitude, so a ray through a vertex crosses exactly one of its edges
+        crossing = (self._low[edges] <= y) & (y < self._high[edges])
+        crossing &= self._x0[edges] + (y - self._y0[edges]) * self._slope[edges] > x
+        owner = self._owner[edges]
+        runs = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+        # An odd number of crossings eastwards means the point is inside that polygon
+        inside = np.logical_xor.reduceat(crossing, runs, axis=1)
+        hit = inside.any(axis=1)
+        return np.where(hit, owner[runs][inside.argmax(axis=1)], -1)
@@ -0,0 +1,15 @@
+import hashlib
+
+
+def site_id(category, name, wikipedia_link):
+    """
+    Stable identifier for a site: the same category, name and Wikipedia link
+    always give the same id, across re-scrapes and re-aggregations.
+    """
+    raw = "\x1f".join((category or "", name or "", wikipedia_link or ""))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def get_site_id(site):
+    """A record's id, computed from its fields if it was written before ids existed."""
+    return site.get("id") or site_id(site.get("category"), site.get("name"), site.get("wikipedia_link"))
@@ -0,0 +1,195 @@
+"""
+Reading and writing the pipeline's JSON files (data/raw/*.json, sites.json,
+future_sites.json) in one canonical format, with the fastest JSON library installed.
+
+The canonical format is compact and deterministic, so the same records always produce
+the same bytes, whichever script wrote them:
+  - UTF-8, nothing escaped that doesn't have to be (no \\u00e9 for "é")
+  - no whitespace inside a record, but one record per line, so diffs stay readable
+  - keys sorted, at every level
+  - a trailing newline
+Files are replaced atomically, so an interrupted run never leaves half a file.
+
+Loading checks the records against a schema (SITE_SCHEMA for processed files,
+RAW_SCHEMA for scraper output) and raises SchemaError naming the file, record and field.
+
+Backends, fastest first: orjson, msgspec, then the stdlib json module.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+from common import instrument
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+_OPTIONAL_NUMBER = (int, float, type(None))
+_OPTIONAL_STR = (str, type(None))
+
+# field -> (allowed types, required)
+RAW_SCHEMA = {
+    "name": (str, True),
+    "location": (str, True),
+    "wikipedia_link": (str, True),
+    "image": (str, True),
+}
+
+SITE_SCHEMA = {
+    "id": (str, False),
+    "name": (str, True),
+    "category": (str, True),
+    "categories": (list, False),
+    "location": (str, False),
+    "latitude": (_OPTIONAL_NUMBER, False),
+    "longitude": (_OPTIONAL_NUMBER, False),
+    "wikipedia_link": (str, False),
+    "image": (str, False),
+    "thumbnail": (_OPTIONAL_STR, False),
+    "visited": (str, False),
+    "merged_ids": (list, False),
+}
+
+# Problems listed in one SchemaError before the rest are summarized
+MAX_REPORTED = 10
+
+
+class SchemaError(ValueError):
+    pass
+
+
+if orjson is not None:
+    def _encode(value):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+    _decode = orjson.loads  # orjson.JSONDecodeError is a ValueError
+elif msgspec is not None:
+    _encode = msgspec.json.Encoder(order="sorted").encode
+
+    def _decode(data):
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+else:
+    def _encode(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+    _decode = json.loads
+
+
+def dumps(value):
+    """Canonical bytes for a value. A list of records is written one record per line."""
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        return b"[\n" + b",\n".join(_encode(item) for item in value) + b"\n]\n"
+    return _encode(value) + b"\n"
+
+
+def loads(data):
+    """Parses JSON bytes or str. Raises ValueError on malformed input, whatever the backend."""
+    return _decode(data)
+
+
+def validate(records, schema=SITE_SCHEMA, source="records"):
+    """Raises SchemaError if records isn't a list of dicts matching schema."""
+    if not isinstance(records, list):
+        raise SchemaError(f"{source}: expected a list of records, got {type(records).__name__}")
+    # Exact type checks: decoded JSON has no subclasses, and a bool is no latitude
+    allowed = {field: set(types) if isinstance(types, tuple) else {types}
+               for field, (types, _) in schema.items()}
+    required = {field for field, (_, is_required) in schema.items() if is_required}
+    problems = []
+    for i, record in enumerate(records):
+        if type(record) is not dict:
+            problems.append(f"record {i}: expected an object, got {type(record).__name__}")
+            continue
+        if not required <= record.keys():
+            for field in sorted(required - record.keys()):
+                problems.append(f"record {i} ({record.get('name', '?')}): missing {field!r}")
+        for field, value in record.items():
+            types = allowed.get(field)
+            if types is not None and type(value) not in types:
+                problems.append(f"record {i} ({record.get('name', '?')}): {field!r} is {type(value).__name__}")
+    raise_problems(source, problems)
+    return records
+
+
+def raise_problems(source, problems):
+    """Raises one SchemaError listing up to MAX_REPORTED problems, if there are any."""
+    if problems:
+        more = f"\n  ... and {len(problems) - MAX_REPORTED} more" if len(problems) > MAX_REPORTED else ""
+        raise SchemaError(f"{source}: {len(problems)} schema problem(s):\n  "
+                          + "\n  ".join(problems[:MAX_REPORTED]) + more)
+
+
+def load(path, schema=None):
+    """
+    Reads a JSON file (any formatting), validating it as records if a schema is given.
+    Raises ValueError (SchemaError for records that don't match) on bad content.
+    """
+    with instrument.span("json.load", path=path, backend=BACKEND) as fields:
+        with open(path, "rb") as f:
+            data = f.read()
+        fields["bytes"] = len(data)
+        value = _decode(data)
+        if schema is not None:
+            validate(value, schema, path)
+    return value
+
+
+def dump(value, path):
+    """Writes a value to path in the canonical format, atomically."""
+    with instrument.span("json.dump", path=path, backend=BACKEND) as fields:
+        data = dumps(value)
+        fields["bytes"] = len(data)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+
+def dump_records(records, path):
+    """
+    Writes records (any iterable of dicts) to path as they come, in the same bytes
+    dump() would write for the list. Returns the number written.
+    """
+    with instrument.span("json.dump", path=path, backend=BACKEND) as fields:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        written = 0
+        size = 0
+        with open(temp_path, "wb") as f:
+            for record in records:
+                line = (b"[\n" if not written else b",\n") + _encode(record)
+                f.write(line)
+                written += 1
+                size += len(line)
+            tail = b"\n]\n" if written else dumps([])
+            f.write(tail)
+        fields["bytes"] = size + len(tail)
+        os.replace(temp_path, path)
+    return written
+
+
+def load_sites(path):
+    """Processed site records (sites.json, future_sites.json)."""
+    return load(path, SITE_SCHEMA)
+
+
+def load_raw(path):
+    """Scraper output records (data/raw/*.json)."""
+    return load(path, RAW_SCHEMA)
@@ -0,0 +1,241 @@
+"""
+The site record every stage works on, and a columnar table of them for bulk work.
+
+A Site is a __slots__ object with typed fields: category is a Category (the marker
+categories index.html's iconMap knows, so an unknown one fails at load time instead
+of showing up as a grey marker), coordinates are floats or None, and the visit state
+is a VisitState. On disk (sites.json) records keep their plain JSON shape:
+Site.from_dict / to_dict convert, read_sites / write_sites do whole files.
+
+SiteTable holds the same records as parallel numpy columns, for operations over
+every site at once (bounding boxes, category masks, the exported columns).
+"""
+from enum import Enum
+
+import numpy as np
+
+from common import serialization
+from common.records import site_id
+
+
+class Category(str, Enum):
+    LANDMARKS = "landmarks"
+    HISTORICAL_PLACES = "historical_places"
+    MUSEUMS = "museums"
+    LIBRARIES = "libraries"
+    PERFORMING_ARTS = "performing_arts"
+    SKYSCRAPERS = "skyscrapers"
+    TOURIST_ATTRACTIONS = "tourist_attractions"
+    ZOOS_AND_GARDENS = "zoos_and_gardens"
+
+    @classmethod
+    def parse(cls, value):
+        """The member for a category string. Raises ValueError naming the valid ones."""
+        # A plain dict lookup: Enum's own value lookup is several times slower, and this
+        # runs for every record read
+        try:
+            return _CATEGORY_BY_VALUE[value]
+        except (KeyError, TypeError):
+            raise ValueError(f"unknown category {value!r} (expected one of: "
+                             f"{', '.join(member.value for member in cls)})") from None
+
+    def __str__(self):
+        return self.value
+
+
+class VisitState(str, Enum):
+    NOT_VISITED = "Not Visited"
+    VISITED = "Visited"
+
+    def __str__(self):
+        return self.value
+
+
+# Members by value, and by themselves (Category is a str subclass, so both hash alike)
+_CATEGORY_BY_VALUE = {member.value: member for member in Category}
+_VISIT_STATE_BY_VALUE = {member.value: member for member in VisitState}
+
+# Optional plain fields, written only when set
+_OPTIONAL = ("latitude", "longitude", "thumbnail", "merged_ids")
+
+
+class Site:
+    __slots__ = ("id", "name", "category", "location", "latitude", "longitude", "wikipedia_link",
+                 "image", "thumbnail", "visited", "categories", "merged_ids", "extra")
+
+    def __init__(self, name, category, location="", latitude=None, longitude=None, wikipedia_link="",
+                 image="", thumbnail=None, visited=None, categories=None, merged_ids=None, id=None,
+                 extra=None):
+        self.name = name
+        self.category = Category.parse(category)
+        self.location = location
+        self.latitude = None if latitude is None else float(latitude)
+        self.longitude = None if longitude is None else float(longitude)
+        self.wikipedia_link = wikipedia_link
+        self.image = image
+        self.thumbnail = thumbnail
+        self.visited = None if visited is None else _visit_state(visited)
+        # Every category a merged record appeared under (clean/dedupe.py)
+        self.categories = None if categories is None else [Category.parse(c) for c in categories]
+        self.merged_ids = merged_ids
+        self.id = id or site_id(self.category.value, name, wikipedia_link)
+        # Fields this model doesn't know, carried through unchanged
+        self.extra = extra or {}
+
+    @property
+    def coords(self):
+        """(latitude, longitude), or None until both are known."""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    @classmethod
+    def from_dict(cls, record):
+        """A Site from a JSON record. Raises ValueError on an unknown category or visit state."""
+        if record.keys() <= _FIELDS:
+            return cls(**record)
+        fields = {}
+        extra = {}
+        for key, value in record.items():
+            if key in _FIELDS:
+                fields[key] = value
+            else:
+                extra[key] = value
+        return cls(extra=extra, **fields)
+
+    def to_dict(self):
+        """The JSON record: plain strings for the enums, unset optional fields left out."""
+        record = {
+            "name": self.name,
+            "image": self.image,
+            "location": self.location,
+            "wikipedia_link": self.wikipedia_link,
+            "category": self.category.value,
+        }
+        # The id is written only where it can't be derived again: merged records keep
+        # their first member's id even after taking over another member's link
+        if self.merged_ids is not None or self.id != site_id(self.category.value, self.name, self.wikipedia_link):
+            record["id"] = self.id
+        for key in _OPTIONAL:
+            value = getattr(self, key)
+            if value is not None:
+                record[key] = value
+        if self.visited is not None:
+            record["visited"] = self.visited.value
+        if self.categories is not None:
+            record["categories"] = [category.value for category in self.categories]
+        record.update(self.extra)
+        return record
+
+    def copy(self, **changes):
+        """A shallow copy with some fields replaced; the id follows the new fields unless given."""
+        fields = {key: getattr(self, key) for key in self.__slots__}
+        if "id" not in changes and {"name", "category", "wikipedia_link"} & changes.keys():
+            fields["id"] = None
+        fields.update(changes)
+        fields["extra"] = dict(fields["extra"])
+        return Site(**fields)
+
+    def __eq__(self, other):
+        if not isinstance(other, Site):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Site({self.name!r}, {self.category.value!r}, id={self.id!r})"
+
+
+# The keys Site.from_dict takes as fields rather than extra
+_FIELDS = frozenset(Site.__slots__) - {"extra"}
+
+
+def _visit_state(value):
+    try:
+        return _VISIT_STATE_BY_VALUE[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"{value!r} is not a valid visit state (expected one of: "
+                         f"{', '.join(member.value for member in VisitState)})") from None
+
+
+def read_sites(path):
+    """Sites from a processed file. Raises SchemaError listing every bad record."""
+    records = serialization.load_sites(path)
+    sites, problems = [], []
+    for i, record in enumerate(records):
+        try:
+            sites.append(Site.from_dict(record))
+        except ValueError as e:
+            problems.append(f"record {i} ({record.get('name', '?')}): {e}")
+    serialization.raise_problems(path, problems)
+    return sites
+
+
+def write_sites(sites, path):
+    serialization.dump([site.to_dict() for site in sites], path)
+
+
+CATEGORIES = list(Category)
+_CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+
+
+class SiteTable:
+    """
+    Sites as parallel columns: ids and names as lists, category codes (index into
+    CATEGORIES) as uint8, coordinates as float64 (NaN when unknown) and the visit
+    state as a bool array.
+    """
+
+    def __init__(self, ids, names, category_codes, latitudes, longitudes, visited):
+        self.ids = ids
+        self.names = names
+        self.category_codes = category_codes
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+        self.visited = visited
+
+    @classmethod
+    def from_sites(cls, sites):
+        count = len(sites)
+        return cls(
+            [site.id for site in sites],
+            [site.name for site in sites],
+            np.fromiter((_CATEGORY_CODES[site.category] for site in sites), dtype=np.uint8, count=count),
+            np.fromiter((np.nan if site.latitude is None else site.latitude for site in sites),
+                        dtype=np.float64, count=count),
+            np.fromiter((np.nan if site.longitude is None else site.longitude for site in sites),
+                        dtype=np.float64, count=count),
+            np.fromiter((site.visited is VisitState.VISITED for site in sites), dtype=bool, count=count),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def categories(self):
+        """The Category of every row."""
+        return [CATEGORIES[code] for code in self.category_codes]
+
+    def has_coords(self):
+        return ~(np.isnan(self.latitudes) | np.isnan(self.longitudes))
+
+    def category_mask(self, *categories):
+        codes = [_CATEGORY_CODES[Category.parse(category)] for category in categories]
+        return np.isin(self.category_codes, codes)
+
+    def in_bbox(self, south, west, north, east):
+        """Row indices of the sites inside the box (NaN coordinates never are)."""
+        return np.flatnonzero((self.latitudes >= south) & (self.latitudes <= north)
+                              & (self.longitudes >= west) & (self.longitudes <= east))
+
+    def bounds(self):
+        """(south, west, north, east) of the sites with coordinates, or None."""
+        mask = self.has_coords()
+        if not mask.any():
+            return None
+        lats, lngs = self.latitudes[mask], self.longitudes[mask]
+        return float(lats.min()), float(lngs.min()), float(lats.max()), float(lngs.max())
+
+    def category_counts(self):
+        counts = np.bincount(self.category_codes, minlength=len(CATEGORIES))
+        return {category: int(count) for category, count in zip(CATEGORIES, counts) if count}
@@ -0,0 +1,177 @@
+"""
+Local stand-in for the two APIs enrich/wikidata.py calls: Wikipedia's pageprops query
+(article title -> Wikidata item) and Wikidata's wbgetentities.
+
+Titles are normalized ("A_b" -> "A b") as the real API does; titles containing
+"missing" are missing pages and ones containing "unlinked" have no item. Every other
+title gets a deterministic item id, and items get deterministic claims: a point inside
+the NYC bounding box (most of them), an image named after the title (most of them),
+a borough or a neighbourhood inside one (P131), and a heritage designation (some).
+Run it and point the stage at it:
+  python enrich/mock_wikidata.py --port 8003
+  FETCH_BASE_OVERRIDE=http://127.0.0.1:8003 python enrich/wikidata.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The APIs' limit on titles / ids per request
+MAX_TITLES = 50
+
+# South-west and north-east corners of the five boroughs
+NYC_BOUNDS = ((40.4774, -74.2591), (40.9176, -73.7004))
+
+BOROUGHS = {
+    "Q11299": "Manhattan",
+    "Q18419": "Brooklyn",
+    "Q18424": "Queens",
+    "Q18426": "The Bronx",
+    "Q18432": "Staten Island",
+}
+# Neighbourhood items, located in a borough
+NEIGHBOURHOODS = {
+    "Q1004": ("Harlem", "Q11299"),
+    "Q1005": ("Greenwich Village", "Q11299"),
+    "Q1006": ("Williamsburg", "Q18419"),
+    "Q1007": ("Flushing", "Q18424"),
+}
+DESIGNATIONS = {
+    "Q2001": "New York City Landmark",
+    "Q2002": "National Historic Landmark",
+    "Q2003": "National Register of Historic Places listed place",
+}
+
+
+def digest(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def fake_qid(title):
+    """Deterministic item id for an article title (well above the fixed ids above)."""
+    return f"Q{100000 + int.from_bytes(digest(title)[:4], 'big') % 90000000}"
+
+
+def statement(value, datatype):
+    return {"mainsnak": {"snaktype": "value", "datavalue": {"value": value, "type": datatype}},
+            "rank": "normal"}
+
+
+def item_ref(qid):
+    return statement({"entity-type": "item", "id": qid}, "wikibase-entityid")
+
+
+def make_entity(qid):
+    """A deterministic item, or a missing one for ids the mock never handed out."""
+    if qid in BOROUGHS:
+        return {"id": qid, "labels": {"en": {"language": "en", "value": BOROUGHS[qid]}}, "claims": {}}
+    if qid in NEIGHBOURHOODS:
+        name, borough = NEIGHBOURHOODS[qid]
+        return {"id": qid, "labels": {"en": {"language": "en", "value": name}},
+                "claims": {"P131": [item_ref(borough)]}}
+    if qid in DESIGNATIONS:
+        return {"id": qid, "labels": {"en": {"language": "en", "value": DESIGNATIONS[qid]}}, "claims": {}}
+    if not qid.startswith("Q") or not qid[1:].isdigit() or int(qid[1:]) < 100000:
+        return {"id": qid, "missing": ""}
+
+    seed = digest(qid)
+    claims = {}
+    if seed[0] % 8:
+        (south, west), (north, east) = NYC_BOUNDS
+        lat = south + (north - south) * int.from_bytes(seed[1:5], "big") / 2 ** 32
+        lng = west + (east - west) * int.from_bytes(seed[5:9], "big") / 2 ** 32
+        claims["P625"] = [statement({"latitude": round(lat, 6), "longitude": round(lng, 6),
+                                     "precision": 1e-06, "globe": "http://www.wikidata.org/entity/Q2"},
+                                    "globecoordinate")]
+    if seed[9] % 6:
+        claims["P18"] = [statement(f"{qid} photo.jpg", "string")]
+    places = list(BOROUGHS) + list(NEIGHBOURHOODS)
+    claims["P131"] = [item_ref(places[seed[10] % len(places)])]
+    if seed[11] % 3 == 0:
+        claims["P1435"] = [item_ref(list(DESIGNATIONS)[seed[12] % len(DESIGNATIONS)])]
+    return {"type": "item", "id": qid, "labels": {"en": {"language": "en", "value": qid}}, "claims": claims}
+
+
+def make_pageprops(titles):
+    normalized = []
+    pages = {}
+    for i, title in enumerate(titles):
+        resolved = title.replace("_", " ")
+        if resolved != title:
+            normalized.append({"from": title, "to": resolved})
+        if "missing" in resolved.lower():
+            pages[str(-1 - i)] = {"ns": 0, "title": resolved, "missing": ""}
+        elif "unlinked" in resolved.lower():
+            pages[str(1000 + i)] = {"pageid": 1000 + i, "ns": 0, "title": resolved}
+        else:
+            pages[str(1000 + i)] = {"pageid": 1000 + i, "ns": 0, "title": resolved,
+                                    "pageprops": {"wikibase_item": fake_qid(resolved)}}
+    query = {"pages": pages}
+    if normalized:
+        query["normalized"] = normalized
+    return {"batchcomplete": "", "query": query}
+
+
+def make_entities(ids):
+    return {"entities": {qid: make_entity(qid) for qid in ids}, "success": 1}
+
+
+class MockWikidataHandler(BaseHTTPRequestHandler):
+    # Requests handled so far, per API, so callers can check how many round-trips they made
+    calls = {"pageprops": 0, "wbgetentities": 0}
+    calls_lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        action = query.get("action", [""])[0]
+        if action == "query" and query.get("prop") == ["pageprops"]:
+            keys, endpoint, make = query.get("titles", [""])[0].split("|"), "pageprops", make_pageprops
+        elif action == "wbgetentities":
+            keys, endpoint, make = query.get("ids", [""])[0].split("|"), "wbgetentities", make_entities
+        else:
+            self.send_error(400)
+            return
+        if not keys[0]:
+            self.send_error(400)
+            return
+        if len(keys) > MAX_TITLES:
+            self.send_error(400, "Too many values")
+            return
+        with self.calls_lock:
+            self.calls[endpoint] += 1
+
+        body = json.dumps(make(keys)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0):
+    """
+    Starts the mock on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockWikidataHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake Wikipedia pageprops and Wikidata wbgetentities APIs.")
+    parser.add_argument("--port", type=int, default=8003)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockWikidataHandler)
+    print(f"Mock Wikidata API on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""
+Fills coordinates, images, borough and heritage designations from Wikidata in bulk,
+before the slower geocode (MapQuest) and images (per-file imageinfo) stages run.
+
+Almost every record links a Wikipedia article. The article titles are mapped to Wikidata
+items 50 at a time (pageprops), and the items are read 50 at a time with wbgetentities:
+  P625  coordinate location  -> latitude / longitude, where the record has none
+  P18   image                -> a direct upload.wikimedia.org URL, where the record has
+                                no image or links the same file through a page
+  P131  located in           -> extra "borough" (one hop further up for neighbourhoods)
+  P1435 heritage designation -> extra "heritage", a list of English labels
+plus extra "wikidata", the item id. One more round of wbgetentities reads the places and
+designations those claims point at. Titles and items are cached in
+data/cache/wikidata.sqlite, so a second run makes no requests for the same records.
+
+  python enrich/wikidata.py
+  python enrich/mock_wikidata.py --port 8003
+  FETCH_BASE_OVERRIDE=http://127.0.0.1:8003 python enrich/wikidata.py
+"""
+import hashlib
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import instrument
+from common.fetch import fetch
+from common.kvstore import KeyValueStore
+from common.paths import CACHE_DIR, SITES_JSON_PATH
+from common.site import read_sites, write_sites
+from image_url.image_url import extract_file_part
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+
+# Both APIs accept up to 50 titles / ids per request
+BATCH_SIZE = 50
+
+# Requests in flight at once
+MAX_WORKERS = 4
+
+# Persistent article title -> item id (or null), and item id -> the claims used here
+WIKIDATA_CACHE_PATH = os.path.join(CACHE_DIR, "wikidata.sqlite")
+
+# Wikidata items of the five boroughs
+BOROUGHS = {
+    "Q11299": "Manhattan",
+    "Q18419": "Brooklyn",
+    "Q18424": "Queens",
+    "Q18426": "The Bronx",
+    "Q18432": "Staten Island",
+}
+
+COORDINATES, IMAGE, LOCATED_IN, HERITAGE = "P625", "P18", "P131", "P1435"
+
+# Characters MediaWiki leaves unescaped in upload URLs
+UPLOAD_URL_SAFE = ";@$!*(),/~:"
+
+
+def title_from_link(link):
+    """
+    The article title of an English Wikipedia link, with spaces for underscores:
+      https://en.wikipedia.org/wiki/Flatiron_Building -> "Flatiron Building"
+      https://en.wikipedia.org/w/index.php?title=X&action=edit&redlink=1 -> "X"
+    Returns None for anything else.
+    """
+    if not link:
+        return None
+    parts = urlsplit(link)
+    if parts.netloc != "en.wikipedia.org":
+        return None
+    if parts.path.startswith("/wiki/"):
+        title = unquote(parts.path[len("/wiki/"):])
+    else:
+        title = parse_qs(parts.query).get("title", [""])[0]
+    title = title.replace("_", " ").strip()
+    return title or None
+
+
+def commons_url(file_name):
+    """Direct upload URL of a Commons file: .../commons/<md5[0]>/<md5[:2]>/<name>."""
+    name = file_name.replace(" ", "_")
+    name = name[:1].upper() + name[1:]
+    digest = hashlib.md5(name.encode("utf-8")).hexdigest()
+    return f"https://upload.wikimedia.org/wikipedia/commons/{digest[0]}/{digest[:2]}/{quote(name, safe=UPLOAD_URL_SAFE)}"
+
+
+def same_file(a, b):
+    """Whether two file names (with or without 'File:') name the same Commons file."""
+    def normalize(name):
+        name = name.split(":", 1)[1] if name.lower().startswith("file:") else name
+        name = name.replace("_", " ").strip()
+        return name[:1].upper() + name[1:]
+    return normalize(a) == normalize(b)
+
+
+def query_qids(titles):
+    """
+    Looks up to BATCH_SIZE article titles with one pageprops query. As with imageinfo,
+    the answer is keyed by normalized / redirected titles, which are followed back.
+    Raises requests.RequestException on failure.
+    Returns {title: item id or None} for every requested title.
+    """
+    params = {
+        "action": "query",
+        "prop": "pageprops",
+        "ppprop": "wikibase_item",
+        "redirects": 1,
+        "format": "json",
+        "titles": "|".join(titles)
+    }
+    with instrument.span("wikidata.titles.batch", size=len(titles)):
+        data = fetch(WIKIPEDIA_API_URL, params=params, timeout=10).json()
+    query = data.get("query", {})
+
+    normalized = {item["from"]: item["to"] for item in query.get("normalized", [])}
+    redirects = {item["from"]: item["to"] for item in query.get("redirects", [])}
+    qids = {page.get("title"): page.get("pageprops", {}).get("wikibase_item")
+            for page in query.get("pages", {}).values()}
+
+    results = {}
+    for title in titles:
+        resolved = normalized.get(title, title)
+        resolved = redirects.get(resolved, resolved)
+        results[title] = qids.get(resolved)
+    return results
+
+
+def claim_values(entity, prop):
+    """The values of an item's statements for prop, best rank first, deprecated ones skipped."""
+    statements = [claim for claim in entity.get("claims", {}).get(prop, [])
+                  if claim.get("rank") != "deprecated"]
+    statements.sort(key=lambda claim: claim.get("rank") != "preferred")
+    values = []
+    for claim in statements:
+        snak = claim.get("mainsnak", {})
+        if snak.get("snaktype", "value") == "value" and "datavalue" in snak:
+            values.append(snak["datavalue"]["value"])
+    return values
+
+
+def summarize(entity):
+    """The parts of an item this stage uses, small enough to cache."""
+    coordinates = claim_values(entity, COORDINATES)
+    images = claim_values(entity, IMAGE)
+    label = entity.get("labels", {}).get("en", {}).get("value")
+    return {
+        "label": label,
+        "coords": [coordinates[0]["latitude"], coordinates[0]["longitude"]] if coordinates else None,
+        "image": images[0] if images else None,
+        "located_in": [value["id"] for value in claim_values(entity, LOCATED_IN)],
+        "heritage": list(dict.fromkeys(value["id"] for value in claim_values(entity, HERITAGE))),
+    }
+
+
+def query_entities(ids):
+    """
+    Reads up to BATCH_SIZE items with one wbgetentities call.
+    Raises requests.RequestException on failure.
+    Returns {id: summary, or None for a missing item} for every requested id.
+    """
+    params = {
+        "action": "wbgetentities",
+        "ids": "|".join(ids),
+        "props": "labels|claims",
+        "languages": "en",
+        "format": "json"
+    }
+    with instrument.span("wikidata.entities.batch", size=len(ids)):
+        data = fetch(WIKIDATA_API_URL, params=params, timeout=10).json()
+    entities = data.get("entities", {})
+
+    results = {}
+    for key in ids:
+        entity = entities.get(key)
+        if entity is None or "missing" in entity:
+            results[key] = None
+        else:
+            results[key] = summarize(entity)
+    return results
+
+
+def resolve(keys, cache, lookup, kind, workers=MAX_WORKERS):
+    """
+    Resolves many titles or ids with lookup(batch) the way image_url.resolve_titles does:
+    duplicates collapsed, cached keys skipped, the rest sent BATCH_SIZE per request
+    several at once, each batch cached as it returns (misses as None). Failed batches
+    are retried next run. Returns {key: value}.
+    """
+    unique = list(dict.fromkeys(keys))
+    resolved = cache.get_many(unique)
+    pending = [key for key in unique if key not in resolved]
+    print(f"{len(unique)} unique {kind}: {len(resolved)} cached, {len(pending)} to look up")
+    instrument.count(f"wikidata.{kind}.cache_hits", len(resolved))
+    instrument.count(f"wikidata.{kind}.lookups", len(pending))
+
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(lookup, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                found = future.result()
+            except Exception as e:
+                print(f"Error looking up {len(futures[future])} {kind}: {e}")
+                continue
+            cache.put_many(found)
+            resolved.update(found)
+    return resolved
+
+
+def find_borough(item, entities):
+    """The borough an item is in, looking through one level of neighbourhood."""
+    for place in item["located_in"]:
+        if place in BOROUGHS:
+            return BOROUGHS[place]
+    for place in item["located_in"]:
+        parent = entities.get(place)
+        for grandparent in parent["located_in"] if parent else []:
+            if grandparent in BOROUGHS:
+                return BOROUGHS[grandparent]
+    return None
+
+
+def enrich_sites(sites):
+    """
+    Pipeline stage: fills what Wikidata knows about each record's article. Coordinates and
+    images already set are kept (a page-linked image is only replaced by the direct URL
+    of the same file), so the stage never overrides scraped or hand-fixed values.
+    """
+    # 1) Article titles -> items
+    titles = {}
+    for site in sites:
+        title = title_from_link(site.wikipedia_link)
+        if title:
+            titles[site.id] = title
+    qid_cache = KeyValueStore(WIKIDATA_CACHE_PATH, table="titles")
+    qids = resolve(titles.values(), qid_cache, query_qids, "titles")
+    qid_cache.close()
+
+    # 2) Items -> claims; then the places and designations they point at
+    entity_cache = KeyValueStore(WIKIDATA_CACHE_PATH, table="entities")
+    items = [qid for qid in qids.values() if qid]
+    entities = resolve(items, entity_cache, query_entities, "items")
+    related = []
+    for qid in items:
+        item = entities.get(qid)
+        if item:
+            related.extend(place for place in item["located_in"] if place not in BOROUGHS)
+            related.extend(item["heritage"])
+    entities.update(resolve(related, entity_cache, query_entities, "related items"))
+    entity_cache.close()
+
+    # 3) Fill the records
+    counts = {"coordinates": 0, "images": 0, "boroughs": 0, "heritage": 0}
+    for site in sites:
+        qid = qids.get(titles.get(site.id))
+        item = entities.get(qid) if qid else None
+        if not item:
+            continue
+        site.extra["wikidata"] = qid
+
+        if item["coords"] and site.coords is None:
+            site.latitude, site.longitude = item["coords"]
+            counts["coordinates"] += 1
+
+        if item["image"]:
+            file_part = extract_file_part(site.image) if site.image else None
+            if not site.image or (file_part and same_file(file_part, item["image"])):
+                site.image = commons_url(item["image"])
+                counts["images"] += 1
+
+        borough = find_borough(item, entities)
+        if borough and not site.extra.get("borough"):
+            site.extra["borough"] = borough
+            counts["boroughs"] += 1
+
+        heritage = [entities[key]["label"] for key in item["heritage"]
+                    if entities.get(key) and entities[key]["label"]]
+        if heritage:
+            site.extra["heritage"] = heritage
+            counts["heritage"] += 1
+
+    print(f"Wikidata filled coordinates for {counts['coordinates']}, images for {counts['images']}, "
+          f"boroughs for {counts['boroughs']} and designations for {counts['heritage']} of {len(sites)} sites")
+    return sites
+
+
+def main():
+    sites = read_sites(SITES_JSON_PATH)
+
+    enrich_sites(sites)
+
+    # Write updated data back
+    write_sites(sites, SITES_JSON_PATH)
+
+
+if __name__ == "__main__":
+    main()
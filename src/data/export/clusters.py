@@ -0,0 +1,242 @@
+"""
+Precomputes a marker cluster pyramid so the map only fetches and draws what is visible.
+
+For each category, sites are clustered hierarchically from the most detailed zoom up
+(supercluster-style): at every zoom, the items of the zoom below that lie within
+RADIUS_PX screen pixels of each other are merged into one cluster at their weighted
+centre. Each zoom's items are then cut into standard 256 px web map tiles.
+
+Written to data/build/:
+  clusters/index.json                          zoom range, tile size, and the non-empty tiles per category and zoom
+  clusters/<category>/<z>/<x>/<y>.json         {"clusters": [[lat, lng, count, expansion_zoom], ...],
+                                                "sites": [[id, lat, lng, name], ...]}
+  popups/<id>.json                             name, image (and thumbnail), location, link, category and visit state of one site,
+                                               fetched when its marker is clicked
+
+Zooms above MAX_ZOOM use the MAX_ZOOM tiles, where every site is its own marker.
+Both directories are built from scratch next to the old ones and swapped in, so tiles
+and popups of earlier builds (removed or merged sites, zooms no longer built) go away.
+
+  python export/clusters.py
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import BUILD_DIR, SITES_JSON_PATH
+from common.site import VisitState, read_sites
+from map.lat_lng_adjustments import SpatialGrid
+
+# Zoom range of the pyramid; the map opens at 12
+MIN_ZOOM = 10
+MAX_ZOOM = 17
+
+# Items closer than this on screen are merged into one cluster
+RADIUS_PX = 40
+
+TILE_SIZE = 256
+
+CLUSTERS_DIR = "clusters"
+POPUPS_DIR = "popups"
+
+
+def project(lat, lng):
+    """Web Mercator position in [0, 1) world units."""
+    x = lng / 360 + 0.5
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - 0.25 * math.log((1 + sin_lat) / (1 - sin_lat)) / math.pi
+    return x, min(max(y, 0.0), 1.0)
+
+
+def unproject(x, y):
+    lng = (x - 0.5) * 360
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lat, lng
+
+
+class Item:
+    """A site or a cluster at one zoom: position in world units and how many sites it holds."""
+    __slots__ = ("x", "y", "count", "site", "expansion_zoom")
+
+    def __init__(self, x, y, count, site=None, expansion_zoom=None):
+        self.x = x
+        self.y = y
+        self.count = count
+        self.site = site
+        self.expansion_zoom = expansion_zoom
+
+
+def cluster_level(items, zoom, radius_px=RADIUS_PX):
+    """
+    Merges the items of zoom + 1 that are within radius_px of each other at `zoom`.
+    Items are visited in order; each unclaimed item takes all unclaimed neighbours.
+    Returns the items for `zoom`.
+    """
+    scale = TILE_SIZE * 2 ** zoom
+    points = {i: (item.x * scale, item.y * scale) for i, item in enumerate(items)}
+    grid = SpatialGrid(radius_px)
+    for i, (x, y) in points.items():
+        grid.insert(i, x, y)
+
+    claimed = set()
+    merged = []
+    for i, item in enumerate(items):
+        if i in claimed:
+            continue
+        claimed.add(i)
+        neighbours = [j for j in grid.neighbours(i, points) if j not in claimed]
+        if not neighbours:
+            merged.append(item)
+            continue
+        claimed.update(neighbours)
+        group = [item] + [items[j] for j in neighbours]
+        count = sum(member.count for member in group)
+        x = sum(member.x * member.count for member in group) / count
+        y = sum(member.y * member.count for member in group) / count
+        # Zooming in one level is where this cluster first splits up
+        merged.append(Item(x, y, count, expansion_zoom=zoom + 1))
+    return merged
+
+
+def build_pyramid(sites, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius_px=RADIUS_PX):
+    """
+    Returns {zoom: [Item, ...]} for one set of sites. At max_zoom every site with
+    coordinates is its own item; each lower zoom clusters the one above it.
+    """
+    items = []
+    for site in sites:
+        if site.coords is None:
+            continue
+        x, y = project(site.latitude, site.longitude)
+        items.append(Item(x, y, 1, site=site))
+
+    levels = {max_zoom: items}
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        items = cluster_level(items, zoom, radius_px)
+        levels[zoom] = items
+    return levels
+
+
+def tile_items(items, zoom):
+    """Groups one zoom's items by the tile they fall in. Returns {(x, y): tile dict}."""
+    tiles = {}
+    scale = 2 ** zoom
+    for item in items:
+        key = (min(int(item.x * scale), scale - 1), min(int(item.y * scale), scale - 1))
+        tile = tiles.setdefault(key, {"clusters": [], "sites": []})
+        lat, lng = unproject(item.x, item.y)
+        if item.site is not None and item.count == 1:
+            site = item.site
+            tile["sites"].append([site.id, site.latitude, site.longitude, site.name])
+        else:
+            tile["clusters"].append([round(lat, 6), round(lng, 6), item.count, item.expansion_zoom])
+    return tiles
+
+
+def popup(site):
+    """
+    What a marker's popup shows, written as one small file per site. "thumbnail" (the
+    local copy from image_url/thumbnails.py) is what the popup draws when present.
+    """
+    payload = {
+        "name": site.name,
+        "image": site.image,
+        "location": site.location,
+        "wikipedia_link": site.wikipedia_link,
+        "category": site.category.value,
+        "visited": (site.visited or VisitState.NOT_VISITED).value
+    }
+    if site.thumbnail:
+        payload["thumbnail"] = site.thumbnail
+    return payload
+
+
+def write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+
+
+def swap_in(staging, target):
+    """Replaces the directory target with staging, then deletes the old one."""
+    old = f"{target}.old"
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.exists(target):
+        os.replace(target, old)
+    os.replace(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def build(sites, build_dir=BUILD_DIR, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius_px=RADIUS_PX):
+    """
+    Writes the per-category tile pyramids and the per-site popups, replacing the
+    ones of the previous build. Returns the index dict.
+    """
+    clusters_dir = os.path.join(build_dir, f"{CLUSTERS_DIR}.new")
+    popups_dir = os.path.join(build_dir, f"{POPUPS_DIR}.new")
+    for staging in (clusters_dir, popups_dir):
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+    index = {"min_zoom": min_zoom, "max_zoom": max_zoom, "tile_size": TILE_SIZE,
+             "radius_px": radius_px, "categories": {}}
+    by_category = {}
+    for site in sites:
+        by_category.setdefault(site.category.value, []).append(site)
+
+    for category, members in sorted(by_category.items()):
+        levels = build_pyramid(members, min_zoom, max_zoom, radius_px)
+        tiles_by_zoom = {}
+        for zoom, items in sorted(levels.items()):
+            tiles = tile_items(items, zoom)
+            for (x, y), tile in tiles.items():
+                write_json(os.path.join(clusters_dir, category, str(zoom), str(x), f"{y}.json"), tile)
+            tiles_by_zoom[str(zoom)] = sorted(f"{x}/{y}" for x, y in tiles)
+        index["categories"][category] = {"count": len(members), "tiles": tiles_by_zoom}
+
+    for site in sites:
+        write_json(os.path.join(popups_dir, f"{site.id}.json"), popup(site))
+
+    with open(os.path.join(clusters_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    swap_in(clusters_dir, os.path.join(build_dir, CLUSTERS_DIR))
+    swap_in(popups_dir, os.path.join(build_dir, POPUPS_DIR))
+    return index
+
+
+def summarize(index):
+    for category, info in index["categories"].items():
+        tiles = sum(len(names) for names in info["tiles"].values())
+        print(f"{category:<22} {info['count']:>5} sites, {tiles:>4} tiles over zooms "
+              f"{index['min_zoom']}-{index['max_zoom']}")
+
+
+def export_clusters(sites):
+    """Pipeline stage: writes the cluster pyramid and popups; leaves the records unchanged."""
+    index = build(sites)
+    summarize(index)
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-zoom marker cluster tiles.")
+    parser.add_argument("--input", default=SITES_JSON_PATH)
+    parser.add_argument("--output-dir", default=BUILD_DIR)
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--radius", type=float, default=RADIUS_PX, help="cluster radius in screen pixels")
+    args = parser.parse_args()
+
+    sites = read_sites(args.input)
+
+    index = build(sites, args.output_dir, args.min_zoom, args.max_zoom, args.radius)
+    summarize(index)
+    print(f"Wrote cluster tiles and {len(sites)} popups to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Builds the compact artifact the map pages load instead of the pretty-printed sites.json.
+
+Every file is columnar, minified JSON:
+  {"count": N, "precision": 6, "categories": [...], "prefixes": ["", "https://...", ...],
+   "columns": {"name": [...], "category": [category index, ...],
+               "lat": [int, ...], "lng": [int, ...],        # degrees * 10**precision, null if unknown
+               "image_prefix": [prefix index, ...], "image": [rest of URL, ...],
+               "link_prefix": [prefix index, ...], "link": [rest of URL, ...],
+               "location": [...], "visited": [0 or 1, ...],
+               "id": [id or null, ...], "categories": [[category index, ...] or null, ...],
+               "thumbnail": [path or null, ...]}}
+Sites tagged with a borough / neighborhood (enrich/wikidata.py, areas/tag_areas.py) add
+  "areas": {"borough": [name, ...], "neighborhood": [name, ...]}
+and a "borough" / "neighborhood" column of indexes into those lists (null if untagged).
+
+Written to data/build/:
+  sites.min.json          every site
+  sites/<category>.json   one shard per category, so a page can load only the layers switched on
+                          (a merged site is in the shard of each of its categories)
+  sites/boroughs/<borough>.json   one shard per borough, when sites are tagged with one
+  index.json              shard list with counts, sizes and content hashes (for cache busting)
+Site ids are only written where they are not the hash of category, name and link
+(common/records.py), i.e. for merged sites: the random-looking hex would otherwise be a
+sixth of the compressed payload. Likewise "categories" is null for a site with one
+category (the "category" column) and only lists them for merged sites.
+Each file also gets a precompressed .gz (and .br, when the brotli package is installed) sibling.
+
+  python export/export.py
+  python export/export.py --report
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings are written without it
+    brotli = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import BUILD_DIR, SITES_JSON_PATH
+from common.records import get_site_id, site_id
+from common.site import CATEGORIES, SiteTable, read_sites
+
+# Coordinates are stored as integers in units of 10**-PRECISION degrees; 6 matches
+# the rounding of lat_lng_adjustments.py, so spread markers stay spread
+PRECISION = 6
+
+# Site.extra fields exported as indexes into a shared name list
+AREA_FIELDS = ("borough", "neighborhood")
+
+# A URL prefix goes into the dictionary once this many URLs share it
+MIN_PREFIX_COUNT = 2
+
+ALL_SITES_FILE = "sites.min.json"
+SHARDS_DIR = "sites"
+BOROUGH_SHARDS_DIR = os.path.join(SHARDS_DIR, "boroughs")
+INDEX_FILE = "index.json"
+
+
+def url_prefix(url):
+    """
+    The dictionary candidate for a URL: scheme, host and up to two path segments,
+    never including the last segment (the part that differs between sites).
+      https://upload.wikimedia.org/wikipedia/commons/0/0d/A.jpg -> https://upload.wikimedia.org/wikipedia/commons/
+      https://en.wikipedia.org/wiki/Flatiron_Building             -> https://en.wikipedia.org/wiki/
+    """
+    parts = url.split("/")
+    if len(parts) < 4:
+        return ""
+    return "/".join(parts[:min(5, len(parts) - 1)]) + "/"
+
+
+def build_prefixes(urls):
+    """Prefix table, most used first. Index 0 is always "" (no prefix)."""
+    counts = Counter(url_prefix(url) for url in urls if url)
+    counts.pop("", None)
+    common = [prefix for prefix, count in counts.most_common() if count >= MIN_PREFIX_COUNT]
+    return [""] + common
+
+
+def split_url(url, prefix_index):
+    prefix = url_prefix(url) if url else ""
+    index = prefix_index.get(prefix, 0)
+    return (index, url[len(prefix):]) if index else (0, url or "")
+
+
+def to_fixed(values):
+    """A float column as integers in units of 10**-PRECISION degrees, None for NaN."""
+    fixed = np.rint(values * 10 ** PRECISION)
+    return [None if np.isnan(value) else int(value) for value in fixed]
+
+
+def area_tables(sites):
+    """{field: sorted names} for each of AREA_FIELDS that some site has."""
+    tables = {}
+    for field in AREA_FIELDS:
+        names = sorted({site.extra[field] for site in sites if site.extra.get(field)})
+        if names:
+            tables[field] = names
+    return tables
+
+
+def encode(sites, categories=None, prefixes=None, areas=None):
+    """
+    Encodes a list of Sites as one columnar payload.
+    categories / prefixes / areas can be passed in so every shard shares the same tables.
+    """
+    if areas is None:
+        areas = area_tables(sites)
+    if categories is None:
+        categories = sorted({category.value for site in sites for category in site.categories or [site.category]})
+    if prefixes is None:
+        prefixes = build_prefixes([url for site in sites for url in (site.image, site.wikipedia_link)])
+    prefix_index = {prefix: i for i, prefix in enumerate(prefixes)}
+
+    # Numeric columns come straight from the SiteTable's arrays
+    table = SiteTable.from_sites(sites)
+    # SiteTable codes index CATEGORIES; the payload's index its own category list
+    category_index = np.array([categories.index(category.value) if category.value in categories else -1
+                               for category in CATEGORIES], dtype=np.int64)
+    columns = {
+        "name": table.names,
+        "category": category_index[table.category_codes].tolist(),
+        "lat": to_fixed(table.latitudes),
+        "lng": to_fixed(table.longitudes),
+        "image_prefix": [], "image": [], "link_prefix": [], "link": [],
+        "location": [site.location for site in sites],
+        "visited": table.visited.astype(np.int8).tolist(),
+        "id": [None if site.id == site_id(site.category.value, site.name, site.wikipedia_link) else site.id
+               for site in sites],
+        "categories": [[categories.index(category.value) for category in site.categories]
+                       if site.categories and site.categories != [site.category] else None for site in sites],
+        "thumbnail": [site.thumbnail for site in sites],
+    }
+    for site in sites:
+        image_prefix, image = split_url(site.image, prefix_index)
+        columns["image_prefix"].append(image_prefix)
+        columns["image"].append(image)
+        link_prefix, link = split_url(site.wikipedia_link, prefix_index)
+        columns["link_prefix"].append(link_prefix)
+        columns["link"].append(link)
+    for field, names in areas.items():
+        name_index = {name: i for i, name in enumerate(names)}
+        columns[field] = [name_index.get(site.extra.get(field)) for site in sites]
+
+    payload = {
+        "count": len(sites),
+        "precision": PRECISION,
+        "categories": categories,
+        "prefixes": prefixes,
+    }
+    if areas:
+        payload["areas"] = areas
+    payload["columns"] = columns
+    return payload
+
+
+def decode(payload):
+    """Turns a columnar payload back into site dicts (what the pages reconstruct per marker)."""
+    columns = payload["columns"]
+    categories, prefixes = payload["categories"], payload["prefixes"]
+    areas = payload.get("areas", {})
+    scale = 10 ** payload["precision"]
+    sites = []
+    for i in range(payload["count"]):
+        lat, lng = columns["lat"][i], columns["lng"][i]
+        site = {
+            "name": columns["name"][i],
+            "image": prefixes[columns["image_prefix"][i]] + columns["image"][i],
+            "location": columns["location"][i],
+            "wikipedia_link": prefixes[columns["link_prefix"][i]] + columns["link"][i],
+            "category": categories[columns["category"][i]],
+            "visited": "Visited" if columns["visited"][i] else "Not Visited"
+        }
+        if columns["categories"][i] is not None:
+            site["categories"] = [categories[index] for index in columns["categories"][i]]
+        if columns["thumbnail"][i] is not None:
+            site["thumbnail"] = columns["thumbnail"][i]
+        if lat is not None and lng is not None:
+            site["latitude"] = lat / scale
+            site["longitude"] = lng / scale
+        for field, names in areas.items():
+            if columns[field][i] is not None:
+                site[field] = names[columns[field][i]]
+        site["id"] = columns["id"][i] or get_site_id(site)
+        sites.append(site)
+    return sites
+
+
+def dumps(payload):
+    """Minified, deterministic JSON bytes."""
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def write_artifact(path, data):
+    """
+    Writes data plus its precompressed siblings (path.gz, and path.br with brotli).
+    mtime=0 keeps the .gz byte-identical across builds of the same data.
+    Returns {"bytes", "gzip", "brotli"} sizes (brotli None when unavailable).
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(path + ".gz", "wb") as f:
+        f.write(compressed)
+    sizes = {"bytes": len(data), "gzip": len(compressed), "brotli": None}
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        with open(path + ".br", "wb") as f:
+            f.write(compressed)
+        sizes["brotli"] = len(compressed)
+    return sizes
+
+
+def build(sites, build_dir=BUILD_DIR):
+    """
+    Writes the full payload, one shard per category (and per borough) and the index.
+    Returns the index dict.
+    """
+    full = encode(sites)
+    categories, prefixes, areas = full["categories"], full["prefixes"], full.get("areas", {})
+
+    def entry(filename, data, count):
+        sizes = write_artifact(os.path.join(build_dir, filename), data)
+        return {"file": filename.replace(os.sep, "/"), "count": count,
+                "hash": hashlib.sha256(data).hexdigest()[:12], **sizes}
+
+    index = {"all": entry(ALL_SITES_FILE, dumps(full), len(sites)), "categories": {}}
+    for category in categories:
+        members = [site for site in sites
+                   if category in {listed.value for listed in site.categories or [site.category]}]
+        payload = encode(members, categories, prefixes, areas)
+        filename = os.path.join(SHARDS_DIR, f"{category}.json")
+        index["categories"][category] = entry(filename, dumps(payload), len(members))
+    if "borough" in areas:
+        index["boroughs"] = {}
+        for borough in areas["borough"]:
+            members = [site for site in sites if site.extra.get("borough") == borough]
+            payload = encode(members, categories, prefixes, areas)
+            filename = os.path.join(BOROUGH_SHARDS_DIR, f"{borough.lower().replace(' ', '-')}.json")
+            index["boroughs"][borough] = entry(filename, dumps(payload), len(members))
+
+    with open(os.path.join(build_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    return index
+
+
+def export_sites(sites):
+    """Pipeline stage: writes the build artifact for the current records."""
+    index = build(sites)
+    shards = len(index["categories"]) + len(index.get("boroughs", {}))
+    print(f"Exported {len(sites)} sites ({shards} shards) to {BUILD_DIR}")
+    return sites
+
+
+def _best_parse_time(data, repeat=5, then=None):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = json.loads(data)
+        if then is not None:
+            then(payload)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _compressed_sizes(data):
+    br = len(brotli.compress(data, quality=11)) if brotli is not None else None
+    return len(data), len(gzip.compress(data, compresslevel=9, mtime=0)), br
+
+
+def report(source_path, index, build_dir=BUILD_DIR):
+    """Prints sizes and parse times of the source sites.json against the build."""
+    def kb(size):
+        return "-" if size is None else f"{size / 1024:,.1f} KB"
+
+    with open(source_path, "rb") as f:
+        source = f.read()
+    with open(os.path.join(build_dir, ALL_SITES_FILE), "rb") as f:
+        built = f.read()
+
+    print(f"{'file':<40} {'raw':>12} {'gzip':>12} {'brotli':>12} {'parse':>10}")
+    raw, gz, br = _compressed_sizes(source)
+    print(f"{os.path.basename(source_path):<40} {kb(raw):>12} {kb(gz):>12} {kb(br):>12} "
+          f"{_best_parse_time(source) * 1000:>8.2f}ms")
+    print(f"{ALL_SITES_FILE:<40} {kb(index['all']['bytes']):>12} {kb(index['all']['gzip']):>12} "
+          f"{kb(index['all']['brotli']):>12} {_best_parse_time(built) * 1000:>8.2f}ms")
+    print(f"{ALL_SITES_FILE + ' + decode':<40} {'':>12} {'':>12} {'':>12} "
+          f"{_best_parse_time(built, then=decode) * 1000:>8.2f}ms")
+    for info in [*index["categories"].values(), *index.get("boroughs", {}).values()]:
+        print(f"{info['file']:<40} {kb(info['bytes']):>12} {kb(info['gzip']):>12} {kb(info['brotli']):>12}")
+    if brotli is None:
+        print("(brotli not installed: no .br files written)")
+    print(f"Total transfer (gzip): {kb(gz)} -> {kb(index['all']['gzip'])} "
+          f"({gz / index['all']['gzip']:.1f}x smaller)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the compact, sharded site data for the map pages.")
+    parser.add_argument("--input", default=SITES_JSON_PATH)
+    parser.add_argument("--output-dir", default=BUILD_DIR)
+    parser.add_argument("--report", action="store_true", help="compare sizes and parse times with --input")
+    args = parser.parse_args()
+
+    sites = read_sites(args.input)
+
+    index = build(sites, args.output_dir)
+    print(f"Exported {len(sites)} sites ({len(index['categories'])} shards) to {args.output_dir}")
+
+    if args.report:
+        report(args.input, index, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
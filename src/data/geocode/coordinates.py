@@ -0,0 +1,118 @@
+import re
+
+import numpy as np
+
+# Whitespace that never crosses a line, so the patterns can run over a whole
+# newline-joined column at once without a match spilling into the next row
+_S = r"[^\S\n]"
+
+# 40°44′30″N 73°59′01″W  (also accepts ' and " and missing seconds/minutes)
+_DMS_HALF = (
+    rf"(\d{{1,3}}){_S}*°{_S}*(?:(\d{{1,2}}){_S}*[′']{_S}*)?"
+    rf"(?:(\d{{1,2}}(?:\.\d+)?){_S}*[″\"]{_S}*)?"
+)
+DMS_PATTERN = re.compile(
+    _DMS_HALF + r"([NS])" + rf"[^\S\n,]*,?{_S}*" + _DMS_HALF + r"([EW])"
+)
+
+# 40.7414°N 73.9836°W  or  40.7414, -73.9836
+DECIMAL_PATTERN = re.compile(
+    rf"(-?\d{{1,3}}\.\d+){_S}*°?{_S}*([NS])?(?:{_S}*[,;]{_S}*|{_S}+)(-?\d{{1,3}}\.\d+){_S}*°?{_S}*([EW])?"
+)
+
+
+def _dms_to_decimal(degrees, minutes, seconds, hemisphere):
+    value = float(degrees) + float(minutes or 0) / 60 + float(seconds or 0) / 3600
+    return -value if hemisphere in ("S", "W") else value
+
+
+def parse_coordinates(text):
+    """
+    Finds a coordinate pair in free text such as
+      "40°44′30″N 73°59′01″W", "75 Murray St., 40°42′53″N 74°00′40″W" or "40.7414°N 73.9836°W".
+    Returns (lat, lng) rounded to 5 places, or None if the text holds no valid pair.
+    """
+    if not text:
+        return None
+
+    match = DMS_PATTERN.search(text)
+    if match:
+        lat = _dms_to_decimal(*match.group(1, 2, 3, 4))
+        lng = _dms_to_decimal(*match.group(5, 6, 7, 8))
+    else:
+        match = DECIMAL_PATTERN.search(text)
+        if not match:
+            return None
+        lat, lat_hemisphere, lng, lng_hemisphere = match.groups()
+        lat = -abs(float(lat)) if lat_hemisphere == "S" else float(lat)
+        lng = -abs(float(lng)) if lng_hemisphere == "W" else float(lng)
+
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return round(lat, 5), round(lng, 5)
+
+
+def _first_matches(pattern, texts, rows):
+    """
+    Runs one regex pass over the given rows joined by newlines.
+    Returns (row indices, group tuples) for the first match in each row that has one.
+    """
+    joined = "\n".join(texts[i] for i in rows)
+    # Offset at which each row starts in the joined text
+    lengths = np.fromiter((len(texts[i]) + 1 for i in rows), dtype=np.int64, count=len(rows))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+    positions, groups = [], []
+    for match in pattern.finditer(joined):
+        positions.append(match.start())
+        groups.append(match.groups(""))
+    if not positions:
+        return np.empty(0, dtype=np.int64), []
+
+    owner = np.searchsorted(starts, np.asarray(positions), side="right") - 1
+    # Keep only the first match per row
+    owner, first = np.unique(owner, return_index=True)
+    return np.asarray(rows)[owner], [groups[i] for i in first]
+
+
+def _to_float(column):
+    """Converts a sequence of numeric strings ("" meaning 0) to a float array."""
+    return np.array([value or 0 for value in column], dtype=np.float64)
+
+
+def parse_coordinate_column(texts):
+    """
+    Parses coordinates out of a whole column of location strings at once.
+    DMS forms are tried first, then decimal forms for the rows still unparsed;
+    the degree/minute/second arithmetic and range checks run as NumPy array math.
+    Returns (lat, lng, unparsed):
+      lat, lng  float arrays parallel to texts (NaN where nothing was parsed), rounded to 5 places
+      unparsed  indices of the rows with no valid coordinate pair
+    """
+    texts = [text or "" for text in texts]
+    n = len(texts)
+    lat = np.full(n, np.nan)
+    lng = np.full(n, np.nan)
+
+    rows, groups = _first_matches(DMS_PATTERN, texts, range(n))
+    if groups:
+        d1, m1, s1, h1, d2, m2, s2, h2 = zip(*groups)
+        lat_values = _to_float(d1) + _to_float(m1) / 60 + _to_float(s1) / 3600
+        lng_values = _to_float(d2) + _to_float(m2) / 60 + _to_float(s2) / 3600
+        lat[rows] = np.where(np.array(h1) == "S", -lat_values, lat_values)
+        lng[rows] = np.where(np.array(h2) == "W", -lng_values, lng_values)
+
+    remaining = np.flatnonzero(np.isnan(lat))
+    rows, groups = _first_matches(DECIMAL_PATTERN, texts, remaining.tolist())
+    if groups:
+        lat_text, h1, lng_text, h2 = zip(*groups)
+        lat_values, lng_values = _to_float(lat_text), _to_float(lng_text)
+        lat[rows] = np.where(np.array(h1) == "S", -np.abs(lat_values), lat_values)
+        lng[rows] = np.where(np.array(h2) == "W", -np.abs(lng_values), lng_values)
+
+    invalid = (np.abs(lat) > 90) | (np.abs(lng) > 180)
+    lat[invalid] = np.nan
+    lng[invalid] = np.nan
+
+    unparsed = np.flatnonzero(np.isnan(lat))
+    return np.round(lat, 5), np.round(lng, 5), unparsed
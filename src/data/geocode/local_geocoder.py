@@ -0,0 +1,170 @@
+import csv
+import difflib
+import os
+import re
+import sys
+import unicodedata
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import EXTERNAL_DIR
+from geocode.coordinates import parse_coordinates
+
+# Local gazetteer: any CSV with a latitude/longitude column pair and one or more name/address
+# columns, e.g. a NYC Address Points or PLUTO export
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(EXTERNAL_DIR, "gazetteer.csv"))
+
+# Columns tried (case-insensitively) for the place name/address and the coordinates
+KEY_COLUMNS = ("name", "address", "landmark", "lm_name")
+LAT_COLUMNS = ("latitude", "lat")
+LNG_COLUMNS = ("longitude", "lng", "lon")
+
+# Minimum difflib ratio for a fuzzy match to count
+FUZZY_CUTOFF = 0.9
+
+# "..., New York, NY 10007" style suffixes the scrapers and tidy_locations append (on
+# casefolded text). Place names only count after a comma, so "Bank of Manhattan" and
+# "Museum of the City of New York" keep theirs; a bare "ny" or zip needs whitespace before
+# it, so words ending in "ny" ("Tiffany") are left alone.
+CITY_SUFFIX = re.compile(
+    r"(?:\s*,\s*(?:new york(?: city)?|nyc|manhattan|brooklyn|(?:the )?bronx|queens|staten island|ny)\b"
+    r"|\s+ny\b"
+    r"|[\s,]+\d{5}(?:-\d{4})?)+"
+    r"\s*,?\s*$"
+)
+
+ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "av": "ave", "place": "pl", "road": "rd",
+    "boulevard": "blvd", "parkway": "pkwy", "drive": "dr", "square": "sq",
+    "terrace": "ter", "lane": "ln", "court": "ct", "highway": "hwy",
+    "east": "e", "west": "w", "north": "n", "south": "s",
+    "mount": "mt", "and": "&",
+    "first": "1st", "second": "2nd", "third": "3rd", "fourth": "4th", "fifth": "5th",
+    "sixth": "6th", "seventh": "7th", "eighth": "8th", "ninth": "9th", "tenth": "10th",
+    "eleventh": "11th", "twelfth": "12th",
+}
+
+# "St" is "saint" where a name follows it at the start of a phrase ("St. Mark's Place",
+# "Church of St. Paul"), and "street" everywhere else ("W 4th St"); "saint" is never
+# abbreviated, so the two don't share a token
+SAINT_BEFORE = {"of", "the", "&", "and"}
+DIRECTIONS = {"e", "w", "n", "s"}
+
+
+def abbreviate(words):
+    """Street words abbreviated and a leading "st" spelled out as "saint"."""
+    result = []
+    for i, word in enumerate(words):
+        if word == "st" and i + 1 < len(words) and (i == 0 or words[i - 1] in SAINT_BEFORE):
+            word = "saint"
+        result.append(ABBREVIATIONS.get(word, word))
+    return result
+
+
+def strip_city_suffix(text):
+    """text without its trailing city/state/zip; never the empty string for non-empty text."""
+    stripped = CITY_SUFFIX.sub("", text)
+    return stripped if stripped.strip() else text
+
+
+def normalize_key(text):
+    """
+    Lookup key for a place name or address: accents folded, case and punctuation dropped,
+    street words abbreviated, and the trailing city/state/zip removed, so
+    "75 Murray Street, New York, NY 10007" and "75 murray st." share a key.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = strip_city_suffix(text.strip())
+    text = re.sub(r"[^\w\s&]", " ", text)
+    return " ".join(abbreviate(text.split()))
+
+
+def block_key(key):
+    """
+    The token a key is blocked on for fuzzy lookups: its first street-name word, skipping
+    house numbers ("75", "37 04") and directions, which thousands of addresses share.
+    """
+    words = key.split()
+    return next((word for word in words if not word.isdigit() and word not in DIRECTIONS), words[0])
+
+
+class Gazetteer:
+    """
+    In-memory index of known places.
+    Exact lookups are a dict hit on the normalized key; fuzzy lookups only compare
+    against keys sharing the same block_key (the street name or first word of a name),
+    so each miss costs a handful of comparisons rather than a scan of the whole file.
+    """
+
+    def __init__(self):
+        self.points = {}
+        self.blocks = {}
+
+    def add(self, name, lat, lng):
+        key = normalize_key(name)
+        if not key or key in self.points:
+            return
+        self.points[key] = (lat, lng)
+        self.blocks.setdefault(block_key(key), []).append(key)
+
+    def __len__(self):
+        return len(self.points)
+
+    def lookup(self, name):
+        """Returns (lat, lng) for an exact or close match, or None."""
+        key = normalize_key(name)
+        if not key:
+            return None
+        if key in self.points:
+            return self.points[key]
+        candidates = self.blocks.get(block_key(key), [])
+        close = difflib.get_close_matches(key, candidates, n=1, cutoff=FUZZY_CUTOFF)
+        return self.points[close[0]] if close else None
+
+
+def _find_column(fieldnames, options):
+    lowered = {name.lower(): name for name in fieldnames}
+    return next((lowered[option] for option in options if option in lowered), None)
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+    """
+    Builds a Gazetteer from a CSV file. Every non-empty key column of a row is indexed.
+    Returns None if the file does not exist.
+    """
+    if not os.path.exists(path):
+        return None
+
+    gazetteer = Gazetteer()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        lat_column = _find_column(reader.fieldnames, LAT_COLUMNS)
+        lng_column = _find_column(reader.fieldnames, LNG_COLUMNS)
+        key_columns = [c for c in (_find_column(reader.fieldnames, [k]) for k in KEY_COLUMNS) if c]
+        if not (lat_column and lng_column and key_columns):
+            raise ValueError(f"{path} needs latitude, longitude and name/address columns")
+
+        for row in reader:
+            try:
+                lat, lng = float(row[lat_column]), float(row[lng_column])
+            except (TypeError, ValueError):
+                continue
+            for column in key_columns:
+                if row[column]:
+                    gazetteer.add(row[column], lat, lng)
+    return gazetteer
+
+
+def local_geocode(location, gazetteer=None):
+    """
+    Resolves a location string without the network:
+      1) coordinates written into the string (geo-dms / geo-dec spans from the scrapers)
+      2) the gazetteer, by normalized key, then fuzzily
+    Returns (lat, lng) or None.
+    """
+    coords = parse_coordinates(location)
+    if coords:
+        return coords
+    if gazetteer is not None:
+        return gazetteer.lookup(location)
+    return None
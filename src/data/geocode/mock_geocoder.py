@@ -0,0 +1,93 @@
+"""
+Local stand-in for the MapQuest geocoding API (single and batch endpoints).
+
+Every address gets a deterministic point inside the NYC bounding box derived from
+its hash; addresses containing "nowhere" get no result. Run it and point the
+pipeline at it:
+  python geocode/mock_geocoder.py --port 8001
+  MAPQUEST_API_KEY=test FETCH_BASE_OVERRIDE=http://127.0.0.1:8001 python geocode/pre_geocode.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# South-west and north-east corners of the five boroughs
+NYC_BOUNDS = ((40.4774, -74.2591), (40.9176, -73.7004))
+
+
+def fake_lat_lng(address):
+    """Deterministic (lat, lng) for an address, or None for unknown places."""
+    if "nowhere" in address.lower():
+        return None
+    digest = hashlib.sha1(address.encode("utf-8")).digest()
+    (south, west), (north, east) = NYC_BOUNDS
+    lat = south + (north - south) * int.from_bytes(digest[:4], "big") / 2 ** 32
+    lng = west + (east - west) * int.from_bytes(digest[4:8], "big") / 2 ** 32
+    return round(lat, 5), round(lng, 5)
+
+
+def make_result(address):
+    lat_lng = fake_lat_lng(address)
+    locations = [{"latLng": {"lat": lat_lng[0], "lng": lat_lng[1]}}] if lat_lng else []
+    return {"providedLocation": {"location": address}, "locations": locations}
+
+
+class MockGeocoderHandler(BaseHTTPRequestHandler):
+    # Requests handled so far, per endpoint, so callers can check how many round-trips they made
+    calls = {"address": 0, "batch": 0}
+    calls_lock = threading.Lock()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if not query.get("key"):
+            self.send_error(403, "Missing key")
+            return
+
+        endpoint = parts.path.rstrip("/").rsplit("/", 1)[-1]
+        locations = query.get("location", [])
+        if endpoint not in self.calls or not locations:
+            self.send_error(400)
+            return
+        if endpoint == "batch" and len(locations) > 100:
+            self.send_error(400, "Too many locations")
+            return
+        with self.calls_lock:
+            self.calls[endpoint] += 1
+
+        body = json.dumps({"results": [make_result(location) for location in locations]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0):
+    """
+    Starts the mock on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockGeocoderHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake MapQuest geocoding API.")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockGeocoderHandler)
+    print(f"Mock geocoder on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
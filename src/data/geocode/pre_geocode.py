@@ -1,85 +1,191 @@
-import json
-import time
 import os
-import requests
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import instrument
+from common.fetch import fetch
+from common.kvstore import KeyValueStore
+from common.paths import CACHE_DIR, SITES_JSON_PATH
+from common.site import read_sites, write_sites
+from common.ratelimit import TokenBucket
+from geocode.coordinates import parse_coordinate_column
+from geocode.local_geocoder import load_gazetteer
+
 # Load environment variables from .env file
 load_dotenv()
 
-# Get the MapQuest API key from the environment
+# Get the MapQuest API key from the environment (checked when MapQuest is actually needed)
 API_KEY = os.getenv("MAPQUEST_API_KEY")
-if not API_KEY:
-    raise ValueError("MAPQUEST_API_KEY not found in environment variables.")
 
-SITES_JSON_PATH = "../../../data/processed/sites.json"
+# Persistent geocode cache: normalized address -> [lat, lng], or {"missed_at": unix time}
+# when MapQuest found nothing
+GEOCODE_CACHE_PATH = os.path.join(CACHE_DIR, "geocode.sqlite")
+
+# A "found nothing" answer is asked again after this long (MapQuest's data changes)
+NO_RESULT_TTL = 30 * 24 * 3600
 
-# Base URL for MapQuest Geocoding API
-BASE_URL = "http://www.mapquestapi.com/geocoding/v1/address"
+# MapQuest Geocoding API batch endpoint
+BATCH_URL = "http://www.mapquestapi.com/geocoding/v1/batch"
 
+# MapQuest accepts up to 100 locations per batch call
+BATCH_SIZE = 100
 
-def geocode_address(address):
+# Batch calls in flight at once, and the sustained calls/second we allow ourselves
+MAX_WORKERS = 4
+REQUESTS_PER_SECOND = float(os.getenv("MAPQUEST_REQUESTS_PER_SECOND", 2))
+
+
+def normalize_address(address):
     """
-    Given an address string, use MapQuest's API to return (lat, lng) tuple.
-    Returns None if no result.
+    Cache key for an address: case, punctuation and spacing differences
+    ("75 Murray St." vs "75 murray st") map to the same key.
+    """
+    address = address.casefold()
+    address = re.sub(r"[^\w\s°′″'\"-]", " ", address)
+    return " ".join(address.split())
+
+
+def _lat_lng(result):
+    """Extracts (lat, lng) from one MapQuest result entry, or None."""
+    locations = result.get("locations", [])
+    if not locations:
+        return None
+    lat_lng = locations[0]["latLng"]
+    return (lat_lng["lat"], lat_lng["lng"])
+
+
+def geocode_batch(addresses):
+    """
+    Geocodes up to BATCH_SIZE addresses with one MapQuest batch call.
+    Results come back in request order.
+    Raises requests.RequestException on failure.
+    Returns a list of (lat, lng) tuples or None, parallel to addresses.
     """
     params = {
         "key": API_KEY,
-        "location": address,
-        "maxResults": 1  # We only need the top result
+        "location": list(addresses),  # repeated location= parameters
+        "maxResults": 1,  # We only need the top result
+        "thumbMaps": "false"
     }
-    try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        # Extract coordinates from the first location in the results
-        locations = data.get("results", [])[0].get("locations", [])
-        if not locations:
-            print(f"No locations found for '{address}'")
-            return None
-        lat = locations[0]["latLng"]["lat"]
-        lng = locations[0]["latLng"]["lng"]
-        return (lat, lng)
-    except Exception as e:
-        print(f"Error geocoding '{address}': {e}")
-        return None
+    data = fetch(BATCH_URL, params=params).json()
+    results = data.get("results", [])
+    if len(results) != len(addresses):
+        raise ValueError(f"MapQuest returned {len(results)} results for {len(addresses)} locations")
+    return [_lat_lng(result) for result in results]
 
 
-def main():
-    # Load the JSON file
-    with open(SITES_JSON_PATH, "r", encoding="utf-8") as file:
-        sites = json.load(file)
-
-    updated_sites = []
+def _cached(value, now):
+    """Whether a cache entry can be used: a point, or a miss younger than NO_RESULT_TTL."""
+    if isinstance(value, list):
+        return True
+    return isinstance(value, dict) and now - value.get("missed_at", 0) < NO_RESULT_TTL
 
-    for site in sites:
-        # If coordinates already exist, skip geocoding
-        if "latitude" in site and "longitude" in site:
-            updated_sites.append(site)
-            continue
 
-        address = site.get("location", "")
-        if not address:
-            updated_sites.append(site)
+def geocode_all(addresses, cache, workers=MAX_WORKERS, rate=REQUESTS_PER_SECOND):
+    """
+    Geocodes every address not already in the cache, BATCH_SIZE at a time,
+    with `workers` batches in flight and a token bucket capping calls per second.
+    Each batch is written to the cache as soon as it returns, so an interrupted
+    run picks up where it stopped. Failed batches are left out and retried next run;
+    addresses MapQuest found nothing for are retried once NO_RESULT_TTL has passed.
+    Returns {normalized address: (lat, lng) or None} for all addresses.
+    """
+    if not API_KEY:
+        raise ValueError("MAPQUEST_API_KEY not found in environment variables.")
+
+    by_key = {}
+    for address in addresses:
+        by_key.setdefault(normalize_address(address), address)
+
+    now = time.time()
+    known = {key: value for key, value in cache.get_many(by_key).items() if _cached(value, now)}
+    pending = [key for key in by_key if key not in known]
+    print(f"{len(known)} addresses cached, {len(pending)} to geocode")
+    instrument.count("geocode.cache_hits", len(known))
+    instrument.count("geocode.lookups", len(pending))
+
+    bucket = TokenBucket(rate)
+
+    def run_batch(keys):
+        bucket.acquire()
+        with instrument.span("geocode.batch", size=len(keys)):
+            return keys, geocode_batch([by_key[key] for key in keys])
+
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_batch, batch) for batch in batches]
+        for future in as_completed(futures):
+            try:
+                keys, coords = future.result()
+            except Exception as e:
+                print(f"Error geocoding batch: {e}")
+                continue
+            found = dict(zip(keys, coords))
+            cache.put_many({key: list(value) if value else {"missed_at": time.time()}
+                            for key, value in found.items()})
+            known.update(found)
+            print(f"Geocoded batch of {len(keys)} ({sum(c is not None for c in coords)} found)")
+
+    return {key: (tuple(value) if isinstance(value, (list, tuple)) else None) for key, value in known.items()}
+
+
+def geocode_sites(sites):
+    """
+    Fills latitude/longitude for every site that lacks them:
+    locally first (coordinate text, gazetteer), then through MapQuest.
+    """
+    # Only sites without coordinates (and with something to geocode) need geocoding
+    todo = [site for site in sites if site.coords is None and site.location]
+
+    # 1) Local stage: coordinates already in the string (parsed in one pass over the
+    #    column), then gazetteer hits for the rest
+    lats, lngs, unparsed = parse_coordinate_column([site.location for site in todo])
+    unparsed_rows = set(unparsed.tolist())
+    gazetteer = load_gazetteer()
+    if gazetteer is None:
+        print("No local gazetteer found; only parsing coordinates locally")
+    unresolved = []
+    for i, site in enumerate(todo):
+        if i not in unparsed_rows:
+            site.latitude, site.longitude = float(lats[i]), float(lngs[i])
             continue
-
-        # Use the MapQuest API to geocode the address
-        result = geocode_address(address)
+        result = gazetteer.lookup(site.location) if gazetteer is not None else None
+        if result:
+            site.latitude, site.longitude = result
+        else:
+            unresolved.append(site)
+    print(f"Resolved {len(todo) - len(unresolved)} of {len(todo)} locations locally")
+    todo = unresolved
+    if not todo:
+        return sites
+
+    # 2) Remote stage: MapQuest, for whatever is left
+    cache = KeyValueStore(GEOCODE_CACHE_PATH, table="geocode")
+    results = geocode_all([site.location for site in todo], cache)
+    cache.close()
+
+    for site in todo:
+        address = site.location
+        result = results.get(normalize_address(address))
         if result:
-            lat, lng = result
-            site["latitude"] = lat
-            site["longitude"] = lng
-            print(f"Geocoded '{address}' => ({lat}, {lng})")
+            site.latitude, site.longitude = result
         else:
             print(f"Failed to geocode '{address}'")
+    return sites
+
+
+def main():
+    # Load the JSON file
+    sites = read_sites(SITES_JSON_PATH)
 
-        updated_sites.append(site)
-        # Respect MapQuest's rate limit; delay at least 1 second per request
-        time.sleep(1)
+    geocode_sites(sites)
 
     # Save updated data back to sites.json
-    with open(SITES_JSON_PATH, "w", encoding="utf-8") as file:
-        json.dump(updated_sites, file, indent=2)
+    write_sites(sites, SITES_JSON_PATH)
 
     print("Pre-geocoding complete!")
 
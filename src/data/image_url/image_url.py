@@ -1,76 +1,151 @@
+import os
 import re
-import json
-import requests
-from urllib.parse import quote
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import unquote
 
-def get_direct_image_url(file_name):
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import instrument
+from common.fetch import fetch
+from common.kvstore import KeyValueStore
+from common.paths import CACHE_DIR, SITES_JSON_PATH
+from common.site import read_sites, write_sites
+
+API_URL = "https://en.wikipedia.org/w/api.php"
+
+# The API accepts up to 50 titles per query
+BATCH_SIZE = 50
+
+# Queries in flight at once
+MAX_WORKERS = 4
+
+# Persistent 'File:...' title -> direct upload URL (or null if the file has no image)
+IMAGE_CACHE_PATH = os.path.join(CACHE_DIR, "image_urls.sqlite")
+
+def query_imageinfo(titles):
     """
-    Given a 'File:...' string, call the Wikipedia/Wikimedia API
-    to get the direct upload URL. Returns the upload link, or None if not found.
+    Looks up to BATCH_SIZE 'File:...' titles with one imageinfo query.
+    The API answers under normalized/redirected titles ("File:A_b.jpg" -> "File:A b.jpg"),
+    so those mappings are followed back to the titles that were asked for.
+    Raises requests.RequestException on failure.
+    Returns {title: direct upload URL or None} for every requested title.
     """
-    base_api = "https://en.wikipedia.org/w/api.php"
     params = {
         "action": "query",
         "prop": "imageinfo",
         "iiprop": "url",
+        "redirects": 1,
         "format": "json",
-        "titles": file_name
+        "titles": "|".join(titles)
     }
+    with instrument.span("imageinfo.batch", size=len(titles)):
+        data = fetch(API_URL, params=params, timeout=10).json()
+    query = data.get("query", {})
+
+    normalized = {item["from"]: item["to"] for item in query.get("normalized", [])}
+    redirects = {item["from"]: item["to"] for item in query.get("redirects", [])}
+
+    # The 'pages' dict has some pageid key, e.g. '-1' or '12345'
+    urls = {}
+    for page_data in query.get("pages", {}).values():
+        imageinfo = page_data.get("imageinfo")
+        if imageinfo and isinstance(imageinfo, list):
+            # Usually there's just one 'imageinfo' with "url"
+            urls[page_data.get("title")] = imageinfo[0].get("url")
+
+    results = {}
+    for title in titles:
+        resolved = normalized.get(title, title)
+        resolved = redirects.get(resolved, resolved)
+        results[title] = urls.get(resolved)
+    return results
+
+def resolve_titles(titles, cache, workers=MAX_WORKERS):
+    """
+    Resolves many 'File:...' titles: duplicates are collapsed, titles already in the
+    cache are skipped, and the rest go out BATCH_SIZE per request, several requests at
+    once over the shared session. Each batch is cached as soon as it returns
+    (titles with no image are cached as None too); failed batches are retried next run.
+    Returns {title: direct upload URL or None}.
+    """
+    unique = list(dict.fromkeys(titles))
+    resolved = cache.get_many(unique)
+    pending = [title for title in unique if title not in resolved]
+    print(f"{len(unique)} unique images: {len(resolved)} cached, {len(pending)} to look up")
+    instrument.count("images.cache_hits", len(resolved))
+    instrument.count("images.lookups", len(pending))
+
+    batches = [pending[i:i + BATCH_SIZE] for i in range(0, len(pending), BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(query_imageinfo, batch): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                found = future.result()
+            except Exception as e:
+                print(f"Error fetching direct URLs for {len(futures[future])} images: {e}")
+                continue
+            cache.put_many(found)
+            resolved.update(found)
+    return resolved
+
+def get_direct_image_url(file_name):
+    """
+    Given a 'File:...' string, call the Wikipedia/Wikimedia API
+    to get the direct upload URL. Returns the upload link, or None if not found.
+    """
     try:
-        resp = requests.get(base_api, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-
-        # The 'pages' dict has some pageid key, e.g. '-1' or '12345'
-        pages = data.get("query", {}).get("pages", {})
-        for page_id, page_data in pages.items():
-            imageinfo = page_data.get("imageinfo")
-            if imageinfo and isinstance(imageinfo, list):
-                # Usually there's just one 'imageinfo' with "url"
-                return imageinfo[0].get("url")
+        return query_imageinfo([file_name]).get(file_name)
     except Exception as e:
         print(f"Error fetching direct URL for {file_name}: {e}")
-
     return None
 
 def extract_file_part(image_url):
     """
     Given a URL like:
       https://en.wikipedia.org/wiki/Something#/media/File:48-wall-street.jpg
+      https://en.wikipedia.org/wiki/File:48-wall-street.jpg
     Return the File:... portion ("File:48-wall-street.jpg") if present, else None.
     """
-    # Regex to capture /media/File:some_filename
-    match = re.search(r"#/media/(File:[^?#]+)", image_url)
+    # Regex to capture /media/File:some_filename or /wiki/File:some_filename
+    match = re.search(r"(?:#/media/|/wiki/)(File:[^?#]+)", image_url)
     if match:
-        return match.group(1).strip()
+        return unquote(match.group(1).strip())
     return None
 
-def main():
-    json_path = "../../../data/processed/sites.json"  # Adjust path if needed
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def resolve_image_urls(sites):
+    """Replaces '#/media/File:...' page links with direct upload URLs."""
+    # 1) Extract 'File:...' from the existing image URLs
+    file_parts = {}
+    for site in sites:
+        if site.image:
+            file_part = extract_file_part(site.image)
+            if file_part:
+                file_parts[site.id] = file_part
 
-    count_updated = 0
-    for entry in data:
-        image_url = entry.get("image", "")
-        if not image_url:
-            continue
-
-        # 1) Extract 'File:...' from the existing image URL
-        file_part = extract_file_part(image_url)
-        if file_part:
-            # 2) Use the API to get the direct upload URL
-            direct_link = get_direct_image_url(file_part)
-            if direct_link:
-                print(f"Updating: {image_url}  ->  {direct_link}")
-                entry["image"] = direct_link
-                count_updated += 1
+    # 2) Use the API to get the direct upload URLs, in batches
+    cache = KeyValueStore(IMAGE_CACHE_PATH, table="imageinfo")
+    direct_links = resolve_titles(file_parts.values(), cache)
+    cache.close()
 
-    # Write updated data back
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    count_updated = 0
+    for site in sites:
+        file_part = file_parts.get(site.id)
+        direct_link = direct_links.get(file_part) if file_part else None
+        if direct_link:
+            print(f"Updating: {site.image}  ->  {direct_link}")
+            site.image = direct_link
+            count_updated += 1
 
     print(f"Done. Updated {count_updated} image URL(s).")
+    return sites
+
+def main():
+    sites = read_sites(SITES_JSON_PATH)
+
+    resolve_image_urls(sites)
+
+    # Write updated data back
+    write_sites(sites, SITES_JSON_PATH)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,96 @@
+"""
+Local stand-in for the Wikipedia imageinfo API used by image_url.py.
+
+Titles are answered the way the real API does: "File:A_b.jpg" is reported as normalized
+to "File:A b.jpg", and each file gets a deterministic upload.wikimedia.org URL derived
+from its name. Titles containing "missing" come back as missing pages. Run it and point
+the pipeline at it:
+  python image_url/mock_imageinfo.py --port 8002
+  FETCH_BASE_OVERRIDE=http://127.0.0.1:8002 python image_url/image_url.py
+"""
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+# The API's limit on titles per query
+MAX_TITLES = 50
+
+
+def upload_url(title):
+    """Where the real API would put a file: .../commons/<md5[0]>/<md5[:2]>/<name>."""
+    name = title.split(":", 1)[1].replace(" ", "_")
+    digest = hashlib.md5(name.encode("utf-8")).hexdigest()
+    return f"https://upload.wikimedia.org/wikipedia/commons/{digest[0]}/{digest[:2]}/{quote(name)}"
+
+
+def make_query(titles):
+    normalized = []
+    pages = {}
+    for i, title in enumerate(titles):
+        resolved = title.replace("_", " ")
+        if resolved != title:
+            normalized.append({"from": title, "to": resolved})
+        if "missing" in resolved.lower():
+            pages[str(-1 - i)] = {"ns": 6, "title": resolved, "missing": ""}
+        else:
+            pages[str(1000 + i)] = {"ns": 6, "title": resolved,
+                                    "imageinfo": [{"url": upload_url(resolved)}]}
+    query = {"pages": pages}
+    if normalized:
+        query["normalized"] = normalized
+    return {"batchcomplete": "", "query": query}
+
+
+class MockImageinfoHandler(BaseHTTPRequestHandler):
+    # Queries handled so far, so callers can check how many round-trips they made
+    calls = {"query": 0}
+    calls_lock = threading.Lock()
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        titles = query.get("titles", [""])[0].split("|")
+        if query.get("action") != ["query"] or not titles[0]:
+            self.send_error(400)
+            return
+        if len(titles) > MAX_TITLES:
+            self.send_error(400, "Too many titles")
+            return
+        with self.calls_lock:
+            self.calls["query"] += 1
+
+        body = json.dumps(make_query(titles)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port=0):
+    """
+    Starts the mock on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockImageinfoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Wikipedia imageinfo API.")
+    parser.add_argument("--port", type=int, default=8002)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), MockImageinfoHandler)
+    print(f"Mock imageinfo API on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
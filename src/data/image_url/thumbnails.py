@@ -0,0 +1,206 @@
+"""
+Downloads every site image once and makes small thumbnails for the popups, which
+would otherwise hotlink multi-megabyte Wikimedia originals into a 300x300 box.
+
+1) Each unique image URL is downloaded once (in parallel, over the shared session)
+   into a content-addressed store, data/cache/images/ab/<sha256>.
+2) Thumbnails (short side THUMBNAIL_SIZE px, WebP, or JPEG if Pillow lacks WebP) are
+   made in a process pool into data/thumbnails/<size>px-q<quality>/ab/<sha256>.webp, so
+   a different --size or quality never reuses thumbnails made with another.
+3) Each record gets a "thumbnail" path relative to the repository root, next to its
+   original "image" URL.
+
+URLs already downloaded and thumbnails that already exist are skipped, so later runs
+only touch new images. With HTTP_CACHE_ONLY=1 (common/cache.py) nothing is downloaded:
+only originals already in the store are used and the rest are reported as skipped.
+Thumbnails need Pillow (pip install pillow); without it the
+originals are still downloaded and records are left unchanged.
+
+  python image_url/thumbnails.py
+  python image_url/thumbnails.py --image-dir /path/to/fixture/images   # no network
+"""
+import argparse
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from urllib.parse import unquote, urlsplit
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional: thumbnails are skipped without it
+    Image = None
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.cache import CACHE_ONLY
+from common.fetch import MAX_WORKERS, fetch
+from common.kvstore import KeyValueStore
+from common.paths import CACHE_DIR, ROOT_DIR, SITES_JSON_PATH, THUMBNAILS_DIR
+from common.site import read_sites, write_sites
+
+# Popups draw images in a 300x300 object-fit: cover box
+THUMBNAIL_SIZE = 300
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# Originals, by content hash, and the URL -> content hash map
+ORIGINALS_DIR = os.path.join(CACHE_DIR, "images")
+IMAGE_INDEX_PATH = os.path.join(CACHE_DIR, "images.sqlite")
+
+
+def sharded_path(root, digest, extension=""):
+    return os.path.join(root, digest[:2], digest + extension)
+
+
+def store_original(content):
+    """Writes image bytes to the content-addressed store (once). Returns their sha256."""
+    digest = hashlib.sha256(content).hexdigest()
+    path = sharded_path(ORIGINALS_DIR, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return digest
+
+
+def read_local(url, image_dir):
+    """Stand-in for downloading: the file in image_dir named like the URL's last path segment."""
+    name = unquote(os.path.basename(urlsplit(url).path))
+    with open(os.path.join(image_dir, name), "rb") as f:
+        return f.read()
+
+
+def download_images(urls, index, image_dir=None, workers=MAX_WORKERS):
+    """
+    Makes sure every URL's bytes are in the store, downloading the ones not seen before.
+    Returns {url: sha256} for every URL that is stored (failures are reported and left out).
+    """
+    unique = list(dict.fromkeys(url for url in urls if url))
+    known = {url: digest for url, digest in index.get_many(unique).items()
+             if os.path.exists(sharded_path(ORIGINALS_DIR, digest))}
+    pending = [url for url in unique if url not in known]
+    print(f"{len(unique)} unique images: {len(known)} already stored, {len(pending)} to download")
+    if pending and CACHE_ONLY and not image_dir:
+        print(f"HTTP_CACHE_ONLY is set: skipping the {len(pending)} images not stored yet")
+        return known
+
+    def download(url):
+        content = read_local(url, image_dir) if image_dir else fetch(url, use_cache=False).content
+        return store_original(content)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(download, url): url for url in pending}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                digest = future.result()
+            except Exception as e:
+                print(f"Error downloading {url}: {e}")
+                continue
+            index.put(url, digest)
+            known[url] = digest
+    return known
+
+
+def thumbnail_format():
+    return "webp" if features.check("webp") else "jpeg"
+
+
+def thumbnails_dir(size, image_format):
+    """Where thumbnails of one size and encoding go."""
+    quality = WEBP_QUALITY if image_format == "webp" else JPEG_QUALITY
+    return os.path.join(THUMBNAILS_DIR, f"{size}px-q{quality}")
+
+
+def make_thumbnail(source, destination, size=THUMBNAIL_SIZE, image_format="webp"):
+    """
+    Scales an image so its short side is `size` px (never up), writing it atomically.
+    Runs in a worker process. Returns destination.
+    """
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        scale = size / min(image.size)
+        if scale < 1:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.Resampling.LANCZOS)
+        if image.mode not in ("RGB", "RGBA") or image_format == "jpeg":
+            image = image.convert("RGB")
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        tmp_path = f"{destination}.{os.getpid()}.tmp"
+        if image_format == "webp":
+            image.save(tmp_path, "WEBP", quality=WEBP_QUALITY, method=6)
+        else:
+            image.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp_path, destination)
+    return destination
+
+
+def make_thumbnails_for(digests, size=THUMBNAIL_SIZE, workers=None):
+    """
+    Thumbnails every stored original that does not have one yet, in a process pool.
+    Returns {sha256: thumbnail path} for every digest with a thumbnail.
+    """
+    image_format = thumbnail_format()
+    extension = ".webp" if image_format == "webp" else ".jpg"
+    root = thumbnails_dir(size, image_format)
+    done, todo = {}, {}
+    for digest in set(digests):
+        destination = sharded_path(root, digest, extension)
+        if os.path.exists(destination):
+            done[digest] = destination
+        else:
+            todo[digest] = destination
+    print(f"{len(done)} thumbnails up to date, {len(todo)} to make ({image_format})")
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(make_thumbnail, sharded_path(ORIGINALS_DIR, digest), destination, size, image_format): digest
+            for digest, destination in todo.items()
+        }
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                done[digest] = future.result()
+            except Exception as e:
+                print(f"Error making thumbnail for {digest}: {e}")
+    return done
+
+
+def add_thumbnails(sites, image_dir=None, size=THUMBNAIL_SIZE):
+    """Pipeline stage: sets each site's thumbnail to its local thumbnail's path."""
+    index = KeyValueStore(IMAGE_INDEX_PATH, table="images")
+    stored = download_images([site.image for site in sites], index, image_dir)
+    index.close()
+
+    if Image is None:
+        print("Pillow is not installed; originals downloaded, no thumbnails made")
+        return sites
+
+    thumbnails = make_thumbnails_for(stored.values(), size)
+    count_updated = 0
+    for site in sites:
+        digest = stored.get(site.image)
+        if digest in thumbnails:
+            site.thumbnail = os.path.relpath(thumbnails[digest], ROOT_DIR).replace(os.sep, "/")
+            count_updated += 1
+    print(f"Set thumbnails for {count_updated} of {len(sites)} sites")
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download site images once and make popup thumbnails.")
+    parser.add_argument("--image-dir", help="read images from this directory (by file name) instead of downloading")
+    parser.add_argument("--size", type=int, default=THUMBNAIL_SIZE, help="short side of the thumbnails, in px")
+    args = parser.parse_args()
+
+    sites = read_sites(SITES_JSON_PATH)
+
+    add_thumbnails(sites, args.image_dir, args.size)
+
+    write_sites(sites, SITES_JSON_PATH)
+
+
+if __name__ == "__main__":
+    main()
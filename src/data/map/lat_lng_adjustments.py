@@ -1,35 +1,215 @@
-import json
+import argparse
+import math
+import os
+import sys
 from collections import defaultdict
 
-# File path
-sites_file = "../../../data/processed/sites.json"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import SITES_JSON_PATH
+from common.site import read_sites, write_sites
 
-# Load JSON data
-with open(sites_file, "r", encoding="utf-8") as f:
-    sites = json.load(f)
+# Markers closer than this (in meters) are considered overlapping
+DEFAULT_RADIUS_M = 4.0
 
-# Step 1: Find duplicate coordinates
-coord_groups = defaultdict(list)
+# Give up re-spreading after this many passes (never reached in practice)
+MAX_ITERATIONS = 50
 
-for site in sites:
-    key = (site["latitude"], site["longitude"])
-    coord_groups[key].append(site)
+EARTH_RADIUS_M = 6371008.8
 
-# Step 2: Adjust coordinates for duplicates
-adjustment_step = 0.00005  # Small shift per entry
-updated_count = 0
+# Web Mercator ground resolution at the equator for zoom 0, in meters per pixel
+METERS_PER_PIXEL_Z0 = 156543.03392
 
-for (lat, lng), group in coord_groups.items():
-    if len(group) > 1:
-        print(f"Adjusting {len(group)} entries at ({lat}, {lng})")
 
-        # Apply small shifts to all but the first entry
-        for i, site in enumerate(group[1:], start=1):
-            site["longitude"] = round(lng + ((i * adjustment_step) if i % 2 == 0 else -(i * adjustment_step)), 6)
+def pixels_to_meters(pixels, zoom, latitude=40.73):
+    """Ground distance covered by `pixels` screen pixels at a Leaflet zoom level."""
+    return pixels * METERS_PER_PIXEL_Z0 * math.cos(math.radians(latitude)) / 2 ** zoom
+
+
+class Projection:
+    """Equirectangular projection around the data's mean latitude; plenty accurate at city scale."""
+
+    def __init__(self, latitudes):
+        self.lat0 = sum(latitudes) / len(latitudes) if latitudes else 0.0
+        self.m_per_deg_lat = math.radians(1) * EARTH_RADIUS_M
+        self.m_per_deg_lng = self.m_per_deg_lat * math.cos(math.radians(self.lat0))
+
+    def to_xy(self, lat, lng):
+        return lng * self.m_per_deg_lng, lat * self.m_per_deg_lat
+
+    def to_lat_lng(self, x, y):
+        return y / self.m_per_deg_lat, x / self.m_per_deg_lng
+
+
+class SpatialGrid:
+    """
+    Uniform grid hash with cells one radius wide: any two points within `radius`
+    of each other sit in the same or adjacent cells, so a neighbour query looks at
+    nine cells instead of every point.
+    """
+
+    def __init__(self, radius):
+        self.radius = radius
+        self.cells = defaultdict(set)
+        self.cell_of = {}
+
+    def _cell(self, x, y):
+        return int(math.floor(x / self.radius)), int(math.floor(y / self.radius))
+
+    def insert(self, i, x, y):
+        cell = self._cell(x, y)
+        self.cells[cell].add(i)
+        self.cell_of[i] = cell
+
+    def move(self, i, x, y):
+        self.cells[self.cell_of[i]].discard(i)
+        self.insert(i, x, y)
+
+    def neighbours(self, i, points):
+        """Indices of points strictly within radius of point i (excluding i)."""
+        x, y = points[i]
+        cx, cy = self.cell_of[i]
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in self.cells.get((cx + dx, cy + dy), ()):
+                    if j != i and math.hypot(points[j][0] - x, points[j][1] - y) < self.radius:
+                        found.append(j)
+        return found
+
+
+class DisjointSet:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, i):
+        self.parent.setdefault(i, i)
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # The lower index (earlier in the file) stays the root, and so the anchor
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def ring_offsets(count, spacing):
+    """
+    Offsets for `count` markers on concentric rings around an anchor at (0, 0).
+    Ring k has radius k * spacing and holds as many markers as fit with at least
+    `spacing` between neighbours (6 on the first ring, 12 on the second, ...).
+    """
+    offsets = []
+    ring = 1
+    while len(offsets) < count:
+        radius = ring * spacing
+        capacity = int(math.pi / math.asin(min(1.0, spacing / (2 * radius))))
+        take = min(capacity, count - len(offsets))
+        for k in range(take):
+            angle = 2 * math.pi * k / take + (ring % 2) * math.pi / take
+            offsets.append((radius * math.cos(angle), radius * math.sin(angle)))
+        ring += 1
+    return offsets
+
+
+def resolve_overlaps(sites, radius_m=DEFAULT_RADIUS_M):
+    """
+    Spreads markers so that no two are closer than radius_m.
+
+    1) Project every site to meters and hash it into a SpatialGrid.
+    2) Find every colliding pair via the grid and union them into clusters.
+    3) Keep each cluster's first site in place and lay the rest out on rings around it.
+    4) Re-check only the markers that moved; any new collision merges the clusters
+       involved and they are laid out again, until nothing overlaps.
+
+    Sites without coordinates are left alone. Returns the number of sites moved.
+    """
+    indexed = [i for i, site in enumerate(sites) if site.coords is not None]
+    if not indexed:
+        return 0
+
+    projection = Projection([sites[i].latitude for i in indexed])
+    # Spread wider than the radius so rounding the output to 6 decimals (~0.1 m)
+    # never leaves a pair just inside it
+    spacing = radius_m + 0.5
+    points = {}
+    grid = SpatialGrid(radius_m)
+    for i in indexed:
+        points[i] = projection.to_xy(sites[i].latitude, sites[i].longitude)
+        grid.insert(i, *points[i])
+    original = dict(points)
+
+    clusters = DisjointSet()
+    to_check = indexed
+    for iteration in range(MAX_ITERATIONS):
+        dirty = set()
+        for i in to_check:
+            for j in grid.neighbours(i, points):
+                if clusters.find(i) != clusters.find(j):
+                    clusters.union(i, j)
+                dirty.add(clusters.find(i))
+        if not dirty:
+            break
+
+        members = defaultdict(list)
+        for i in clusters.parent:
+            root = clusters.find(i)
+            if root in dirty:
+                members[root].append(i)
+
+        moved = []
+        for anchor, group in members.items():
+            others = sorted(i for i in group if i != anchor)
+            ax, ay = original[anchor]
+            for i, (dx, dy) in zip(others, ring_offsets(len(others), spacing)):
+                points[i] = (ax + dx, ay + dy)
+                grid.move(i, *points[i])
+                moved.append(i)
+        to_check = moved
+        print(f"Pass {iteration + 1}: spread {len(members)} clusters ({len(moved)} markers)")
+    else:
+        print(f"Warning: markers still overlap after {MAX_ITERATIONS} passes")
+
+    updated_count = 0
+    for i in indexed:
+        if points[i] != original[i]:
+            lat, lng = projection.to_lat_lng(*points[i])
+            sites[i].latitude = round(lat, 6)
+            sites[i].longitude = round(lng, 6)
             updated_count += 1
+    return updated_count
+
+
+def adjust_locations(sites, radius_m=DEFAULT_RADIUS_M):
+    """Pipeline stage: spreads overlapping markers apart in place."""
+    updated_count = resolve_overlaps(sites, radius_m)
+    print(f"Adjusted {updated_count} overlapping coordinates.")
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spread overlapping map markers apart.")
+    parser.add_argument("--radius", type=float, default=DEFAULT_RADIUS_M,
+                        help="minimum distance between markers, in meters")
+    parser.add_argument("--pixels", type=float,
+                        help="minimum distance in screen pixels at --zoom (overrides --radius)")
+    parser.add_argument("--zoom", type=int, default=18)
+    args = parser.parse_args()
+
+    radius_m = pixels_to_meters(args.pixels, args.zoom) if args.pixels else args.radius
+
+    # Load JSON data
+    sites = read_sites(SITES_JSON_PATH)
+
+    updated_count = resolve_overlaps(sites, radius_m)
+
+    # Save updated JSON
+    write_sites(sites, SITES_JSON_PATH)
+
+    print(f"🎉 Adjusted {updated_count} overlapping coordinates.")
 
-# Step 3: Save updated JSON
-with open(sites_file, "w", encoding="utf-8") as f:
-    json.dump(sites, f, indent=2)
 
-print(f"🎉 Adjusted {updated_count} overlapping coordinates.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Runs the post-aggregation processing steps over sites.json in one process:
+the file is parsed once, every selected stage runs over the same in-memory
+list of records, and the result is written once.
+
+  python pipeline.py                          # all stages, in order
+  python pipeline.py --stages tidy,geocode    # just these (still in pipeline order)
+  python pipeline.py --skip images --output /tmp/sites.json
+  python pipeline.py --delta                  # only records aggregate.py --incremental added/changed
+  python pipeline.py --list
+  python pipeline.py --stages dedupe --profile dedupe   # cProfile dump of the stage
+  python pipeline.py --db                     # read and write the SQLite store (store/sitedb.py)
+
+Every run ends with a summary of where the time went (common/instrument.py);
+INSTRUMENT_LOG=run.jsonl also writes each stage, request and parse as a JSON line.
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from common import instrument
+from common import serialization
+from common.paths import PROCESSED_DIR, SITES_DB_PATH, SITES_JSON_PATH
+from common.site import read_sites, write_sites
+
+# Stage name -> (module, function). Each function takes the list of Sites (common/site.py) and
+# returns the (possibly filtered) list. Modules are imported only when their stage
+# runs, so e.g. the MapQuest key is only needed when geocoding.
+STAGES = {
+    "tidy": ("aggregate.tidy_locations", "tidy_locations"),
+    "clean": ("clean.clean", "clean"),
+    # Wikidata first: whatever it fills, geocode and images no longer have to look up
+    "enrich": ("enrich.wikidata", "enrich_sites"),
+    "geocode": ("geocode.pre_geocode", "geocode_sites"),
+    # On the final coordinates, before adjust spreads overlapping markers
+    "areas": ("areas.tag_areas", "tag_areas"),
+    # Before adjust, so duplicates are merged rather than spread apart
+    "dedupe": ("clean.dedupe", "dedupe"),
+    "adjust": ("map.lat_lng_adjustments", "adjust_locations"),
+    "images": ("image_url.image_url", "resolve_image_urls"),
+    "duplicate_images": ("clean.duplicate_images", "fill_duplicate_images"),
+    "thumbnails": ("image_url.thumbnails", "add_thumbnails"),
+    "visit_state": ("checklist.add_visit_state", "add_visit_state"),
+    # Write data/build/ from the final records; leave them unchanged
+    "export": ("export.export", "export_sites"),
+    "clusters": ("export.clusters", "export_clusters"),
+    "search": ("search.search_index", "export_search"),
+    "visits": ("checklist.visit_log", "export_visits"),
+}
+
+# Stages that only look at one record at a time, so with --delta they can run on just
+# the new/changed records. The others (overlap spreading, image sharing by name) need
+# the whole dataset and always run over everything, as does visit_state: visits are
+# logged independently of what aggregation changed.
+PER_RECORD_STAGES = {"tidy", "clean", "enrich", "geocode", "areas", "images", "thumbnails"}
+
+# Written by aggregate.py
+MANIFEST_PATH = os.path.join(PROCESSED_DIR, "changes.json")
+
+
+def split_names(value):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else None
+
+
+def get_stage(name):
+    module_name, function_name = STAGES[name]
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def select_stages(only=None, skip=None):
+    """Stage names to run, always in pipeline order."""
+    unknown = set(only or []) | set(skip or [])
+    unknown -= set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    return [name for name in STAGES
+            if (not only or name in only) and name not in (skip or [])]
+
+
+def load_delta_ids(manifest_path=MANIFEST_PATH):
+    """Ids of the records the last aggregation added or changed."""
+    manifest = serialization.load(manifest_path)
+    return set(manifest.get("added", [])) | set(manifest.get("changed", []))
+
+
+def _run_on_subset(stage, sites, ids):
+    """Runs a per-record stage on the records in ids only and splices the results back in order."""
+    subset = [site for site in sites if site.id in ids]
+    results = {site.id: site for site in stage(subset)}
+    spliced = []
+    for site in sites:
+        key = site.id
+        if key not in ids:
+            spliced.append(site)
+        elif key in results:
+            spliced.append(results[key])
+    return spliced
+
+
+def run(sites, stage_names, delta_ids=None):
+    """
+    Applies the named stages to the records in order. Returns the final list.
+    With delta_ids, per-record stages only see those records.
+    """
+    for name in stage_names:
+        stage = get_stage(name)
+        start = time.perf_counter()
+        count_in = len(sites)
+        with instrument.span(f"stage.{name}", records_in=count_in) as fields:
+            if delta_ids is not None and name in PER_RECORD_STAGES:
+                sites = _run_on_subset(stage, sites, delta_ids)
+            else:
+                sites = stage(sites)
+            fields["records_out"] = len(sites)
+        print(f"[{name}] {count_in} -> {len(sites)} records in {time.perf_counter() - start:.2f}s")
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run processing stages over sites.json.")
+    parser.add_argument("--stages", help=f"comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--skip", help="comma-separated stages to leave out")
+    parser.add_argument("--input", default=SITES_JSON_PATH)
+    parser.add_argument("--output", help="defaults to --input")
+    parser.add_argument("--delta", action="store_true",
+                        help="run per-record stages only on records listed in changes.json")
+    parser.add_argument("--list", action="store_true", help="print the stages and exit")
+    parser.add_argument("--profile", help="comma-separated stages to cProfile (dumped to data/cache/profiles/)")
+    parser.add_argument("--db", nargs="?", const=SITES_DB_PATH,
+                        help="read and write the records through the SQLite store instead of --input "
+                             "(sites.json is still written, for the pages)")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (module_name, function_name) in STAGES.items():
+            print(f"{name:<18} {module_name}.{function_name}")
+        return
+
+    stage_names = select_stages(split_names(args.stages), split_names(args.skip))
+    if args.profile:
+        instrument.profile(*(f"stage.{name}" for name in select_stages(split_names(args.profile))))
+
+    db = None
+    if args.db:
+        from store.sitedb import SiteDB  # only --db needs it; stage modules stay lazily imported too
+        db = SiteDB(args.db)
+        sites = db.read_sites()
+        if not sites:
+            sys.exit(f"{args.db} has no sites; load them with: python store/sitedb.py import")
+    else:
+        sites = read_sites(args.input)
+
+    delta_ids = None
+    if args.delta:
+        delta_ids = load_delta_ids()
+        print(f"Delta mode: {len(delta_ids)} new/changed records")
+
+    sites = run(sites, stage_names, delta_ids)
+
+    output = args.output or args.input
+    if db is not None:
+        # One transaction: batched upserts, and the rows the stages dropped deleted
+        written, deleted = db.write_sites(sites)
+        print(f"Stored {written} records in {args.db} ({deleted} removed)")
+        # The pages and the other scripts still read sites.json: export it from the store
+        sites = db.read_sites()
+        db.close()
+    write_sites(sites, output)
+
+    print(f"Ran {', '.join(stage_names)}; saved {len(sites)} records to {output}")
+    instrument.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
+import argparse
 import os
-import json
-import requests
-from bs4 import BeautifulSoup
+import re
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.boroughs import list_page_borough
+from common.fetch import fetch, fetch_pages
+from common.parsing import in_order, make_soup, parse_pages, saved_pages
+from common.paths import RAW_DIR
 
 ADDITIONAL_WIKI_PAGES = [
     "https://en.wikipedia.org/wiki/List_of_New_York_City_Designated_Landmarks_in_Manhattan_below_14th_Street",
@@ -15,26 +22,33 @@ ADDITIONAL_WIKI_PAGES = [
     "https://en.wikipedia.org/wiki/List_of_New_York_City_Designated_Landmarks_in_Staten_Island"
 ]
 
-OUTPUT_JSON_PATH = os.path.join("../..", "..", "data", "raw", "designated_landmarks.json")
+OUTPUT_JSON_PATH = os.path.join(RAW_DIR, "designated_landmarks.json")
+
+WIKITABLE = re.compile(r"\bwikitable\b")
 
 
-def parse_additional_wiki_page(url):
+def parse_additional_wiki_page(url, html=None):
     """
-    Scrapes a Wikipedia page that lists items across multiple <td> columns in each row.
-    - We'll find all <tr> in the page.
+    Scrapes a Wikipedia page that lists items across multiple <td> columns in each row
+    (html is fetched if not given).
+    - We'll find all <tr> in the page's wikitables (navbox rows are not listings).
     - For each row, we look at <td> blocks from left to right until we find:
        1) A name anchor (non-file) => <a href="/wiki/...">
        2) Then in subsequent <td> blocks, an image anchor => <a href="/wiki/File:...">
     """
-    print(f"Scraping: {url}")
-    resp = requests.get(url)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
+    if html is None:
+        print(f"Scraping: {url}")
+        html = fetch(url).text
+    # Only the wikitables matter; skip building the rest of the page (navboxes included).
+    # The strainer sees the raw class string ("wikitable sortable"), hence the pattern.
+    soup = make_soup(html, "table", class_=WIKITABLE)
 
     # We'll parse the base page to build #/media links
     base_page = url.split("/wiki/")[-1].split("#", 1)[0]
+    # Every page lists one borough (Manhattan in parts)
+    borough = list_page_borough(url)
 
-    all_rows = soup.find_all("tr")
+    all_rows = [row for table in soup.find_all("table", class_="wikitable") for row in table.find_all("tr")]
     records = []
 
     for row in all_rows:
@@ -84,7 +98,8 @@ def parse_additional_wiki_page(url):
             "name": name,
             "image": image_url,
             "location": location,
-            "wikipedia_link": wikipedia_link
+            "wikipedia_link": wikipedia_link,
+            "listed_borough": borough
         }
         records.append(record)
 
@@ -92,29 +107,39 @@ def parse_additional_wiki_page(url):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape the New York City Designated Landmarks lists.")
+    parser.add_argument("--html-dir", help="parse pages saved under this directory instead of downloading them")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per core)")
+    args = parser.parse_args()
+
     try:
-        with open(OUTPUT_JSON_PATH, "r", encoding="utf-8") as f:
-            existing_data = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
+        existing_data = serialization.load_raw(OUTPUT_JSON_PATH)
+    except (FileNotFoundError, ValueError):
         existing_data = []
 
-    all_records = existing_data[:]
-
-    for url in ADDITIONAL_WIKI_PAGES:
-        try:
-            new_records = parse_additional_wiki_page(url)
-            all_records.extend(new_records)
-        except requests.RequestException as e:
-            print(f"Failed to scrape {url}: {e}")
-
-    print(f"Scraped {len(all_records) - len(existing_data)} new records.")
-    print(f"Total records: {len(all_records)}")
-
-    # Save
-    os.makedirs(os.path.dirname(OUTPUT_JSON_PATH), exist_ok=True)
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(all_records, f, indent=4)
-
+    # Fetch phase: download all pages in parallel (or read saved ones)
+    if args.html_dir:
+        pages = saved_pages(ADDITIONAL_WIKI_PAGES, args.html_dir)
+    else:
+        pages = fetch_pages(ADDITIONAL_WIKI_PAGES, as_bytes=True)
+
+    # Parse phase: every page goes to a worker process as soon as it arrives
+    def records():
+        yield from existing_data
+        # Keep the output in ADDITIONAL_WIKI_PAGES order regardless of download order
+        for url, page_records, error in in_order(parse_pages(pages, parse_additional_wiki_page, args.workers),
+                                                 ADDITIONAL_WIKI_PAGES):
+            if error:
+                print(f"Failed to scrape {url}: {error}")
+                continue
+            print(f"Scraped: {url} ({len(page_records)} records)")
+            yield from page_records
+
+    # Stream the records into the JSON file as they're parsed
+    total = serialization.dump_records(records(), OUTPUT_JSON_PATH)
+
+    print(f"Scraped {total - len(existing_data)} new records.")
+    print(f"Total records: {total}")
     print(f"Data saved to {OUTPUT_JSON_PATH}")
 
 
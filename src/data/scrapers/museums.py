@@ -1,12 +1,17 @@
 import os
-import json
+import sys
 import requests
-from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.fetch import fetch
+from common.parsing import make_soup
+from common.paths import RAW_DIR
 
 SOURCE_URL = "https://museumhack.com/museums-in-nyc/"
 
 # Output JSON file path (relative to this script)
-OUTPUT_JSON_PATH = os.path.join("../..", "..", "data", "raw", "museums.json")
+OUTPUT_JSON_PATH = os.path.join(RAW_DIR, "museums.json")
 
 # Placeholder image URL since this source doesn't include proper images
 PLACEHOLDER_IMAGE_URL = ""
@@ -21,9 +26,8 @@ def extract_museum_data(html_content):
       - location
       - wikipedia_link (empty string for now)
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Find all blocks with the museum info (identified by class "mh-block")
+    # Find all blocks with the museum info (identified by class "mh-block"); parse only those
+    soup = make_soup(html_content, "div", class_="mh-block")
     blocks = soup.find_all("div", class_="mh-block")
     museums = []
 
@@ -75,9 +79,7 @@ def extract_museum_data(html_content):
 
 def main():
     try:
-        response = requests.get(SOURCE_URL)
-        response.raise_for_status()
-        html_content = response.text
+        html_content = fetch(SOURCE_URL).text
     except requests.RequestException as e:
         print(f"Error fetching data from {SOURCE_URL}: {e}")
         return
@@ -87,8 +89,7 @@ def main():
 
     # Ensure the output directory exists.
     os.makedirs(os.path.dirname(OUTPUT_JSON_PATH), exist_ok=True)
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(museums, f, indent=4)
+    serialization.dump(museums, OUTPUT_JSON_PATH)
     print(f"Data saved to {OUTPUT_JSON_PATH}")
 
 
@@ -1,7 +1,12 @@
 import os
-import json
+import sys
 import requests
-from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.fetch import fetch
+from common.parsing import make_soup
+from common.paths import RAW_DIR
 
 # The page to scrape
 SOURCE_URL = (
@@ -11,7 +16,7 @@ SOURCE_URL = (
 )
 
 # Where to save the scraped JSON data
-OUTPUT_JSON_PATH = os.path.join("../..", "..", "data", "raw", "national_historic_landmarks.json")
+OUTPUT_JSON_PATH = os.path.join(RAW_DIR, "national_historic_landmarks.json")
 
 
 def extract_landmarks(html_content):
@@ -25,9 +30,8 @@ def extract_landmarks(html_content):
       - location (string, e.g. "40°44′30″N 73°59′01″W")
       - wikipedia_link (string)
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-
-    # Each landmark is in a <tr class="vcard"> row
+    # Each landmark is in a <tr class="vcard"> row; parse only those
+    soup = make_soup(html_content, "tr", class_="vcard")
     rows = soup.find_all("tr", class_="vcard")
 
     results = []
@@ -95,9 +99,7 @@ def extract_landmarks(html_content):
 
 def main():
     try:
-        response = requests.get(SOURCE_URL)
-        response.raise_for_status()
-        html_content = response.text
+        html_content = fetch(SOURCE_URL).text
     except requests.RequestException as e:
         print(f"Error fetching data from {SOURCE_URL}: {e}")
         return
@@ -109,8 +111,7 @@ def main():
     os.makedirs(os.path.dirname(OUTPUT_JSON_PATH), exist_ok=True)
 
     # Write out the JSON
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(landmarks, f, indent=4)
+    serialization.dump(landmarks, OUTPUT_JSON_PATH)
 
     print(f"Data saved to {OUTPUT_JSON_PATH}")
 
@@ -1,7 +1,13 @@
+import argparse
 import os
-import json
-import requests
-from bs4 import BeautifulSoup
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.boroughs import list_page_borough
+from common.fetch import fetch, fetch_pages
+from common.parsing import in_order, make_soup, parse_pages, saved_pages
+from common.paths import RAW_DIR
 
 # List of Wikipedia pages that share the same row format:
 WIKI_PAGES = [
@@ -17,23 +23,24 @@ WIKI_PAGES = [
 ]
 
 # Output file: we will APPEND or REWRITE to this JSON
-OUTPUT_JSON_PATH = os.path.join("../..", "..", "data", "raw", "national_register_historical_places.json")
+OUTPUT_JSON_PATH = os.path.join(RAW_DIR, "national_register_historical_places.json")
 
 
-def parse_wikipedia_page(url):
+def parse_wikipedia_page(url, html=None):
     """
     Given the URL to a Wikipedia page with <tr class='vcard'> rows,
-    extract a list of items:
+    extract a list of items (html is fetched if not given):
       - name
       - image (constructed link)
       - location
       - wikipedia_link (constructed from name)
+      - listed_borough (the borough the page lists)
     Returns a list of dicts.
     """
-    print(f"Scraping: {url}")
-    response = requests.get(url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    if html is None:
+        print(f"Scraping: {url}")
+        html = fetch(url).text
+    soup = make_soup(html, "tr", class_="vcard")
 
     # We'll parse out the base page name to construct the #/media link
     base_page = url.split("/wiki/")[-1]
@@ -41,6 +48,9 @@ def parse_wikipedia_page(url):
     if "#" in base_page:
         base_page = base_page.split("#", 1)[0]
 
+    # Every page lists one borough (Manhattan in parts)
+    borough = list_page_borough(url)
+
     # Each entry is in <tr class="vcard">
     rows = soup.find_all("tr", class_="vcard")
 
@@ -107,7 +117,8 @@ def parse_wikipedia_page(url):
             "name": name,
             "image": image_url,
             "location": location,
-            "wikipedia_link": wikipedia_link
+            "wikipedia_link": wikipedia_link,
+            "listed_borough": borough
         }
         records.append(record)
 
@@ -115,25 +126,32 @@ def parse_wikipedia_page(url):
 
 
 def main():
-    all_records = []
-
-    # Iterate over all the Wikipedia pages
-    for url in WIKI_PAGES:
-        try:
-            page_records = parse_wikipedia_page(url)
-            all_records.extend(page_records)
-        except requests.RequestException as e:
-            print(f"Failed to scrape {url} - {e}")
-
-    print(f"Total records scraped across all pages: {len(all_records)}")
-
-    # Ensure the output directory exists
-    os.makedirs(os.path.dirname(OUTPUT_JSON_PATH), exist_ok=True)
-
-    # Save combined results as JSON
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(all_records, f, indent=4)
-
+    parser = argparse.ArgumentParser(description="Scrape the National Register of Historic Places listings.")
+    parser.add_argument("--html-dir", help="parse pages saved under this directory instead of downloading them")
+    parser.add_argument("--workers", type=int, help="parser processes (default: one per core)")
+    args = parser.parse_args()
+
+    # Fetch phase: download all the Wikipedia pages in parallel (or read saved ones)
+    if args.html_dir:
+        pages = saved_pages(WIKI_PAGES, args.html_dir)
+    else:
+        pages = fetch_pages(WIKI_PAGES, as_bytes=True)
+
+    # Parse phase: every page goes to a worker process as soon as it arrives
+    def records():
+        # Keep the output in WIKI_PAGES order regardless of download order
+        for url, page_records, error in in_order(parse_pages(pages, parse_wikipedia_page, args.workers),
+                                                 WIKI_PAGES):
+            if error:
+                print(f"Failed to scrape {url} - {error}")
+                continue
+            print(f"Scraped: {url} ({len(page_records)} records)")
+            yield from page_records
+
+    # Stream the combined results into the JSON file as they're parsed
+    total = serialization.dump_records(records(), OUTPUT_JSON_PATH)
+
+    print(f"Total records scraped across all pages: {total}")
     print(f"Data saved to {OUTPUT_JSON_PATH}")
 
 
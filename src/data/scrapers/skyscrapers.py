@@ -1,24 +1,29 @@
 import os
-import json
-import requests
-from bs4 import BeautifulSoup
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common import serialization
+from common.fetch import fetch
+from common.parsing import make_soup
+from common.paths import RAW_DIR
 
 URL = "https://en.wikipedia.org/wiki/List_of_tallest_buildings_in_New_York_City#"
-OUTPUT_JSON_PATH = os.path.join("../..", "..", "data", "raw", "skyscrapers.json")
+OUTPUT_JSON_PATH = os.path.join(RAW_DIR, "skyscrapers.json")
 
-def scrape_tallest_buildings(url):
+def scrape_tallest_buildings(url, html=None):
     """
-    Scrapes the table of tallest buildings from the given Wikipedia URL.
+    Scrapes the table of tallest buildings from the given Wikipedia URL
+    (html is fetched if not given).
     Returns a list of dicts with:
       - name
       - image (wiki /wiki/File:... link)
       - location (the building's address + " New York, NY")
       - wikipedia_link (the building's own wiki page)
     """
-    print(f"Scraping: {url}")
-    response = requests.get(url)
-    response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
+    if html is None:
+        print(f"Scraping: {url}")
+        html = fetch(url).text
+    soup = make_soup(html, "table", class_="wikitable sortable")
 
     tables = soup.find_all("table", class_="wikitable sortable")
 
@@ -82,8 +87,7 @@ def main():
     print(f"Found {len(buildings)} building entries.")
 
     # Save to JSON
-    with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(buildings, f, indent=4)
+    serialization.dump(buildings, OUTPUT_JSON_PATH)
     print(f"Data saved to {OUTPUT_JSON_PATH}")
 
 if __name__ == "__main__":
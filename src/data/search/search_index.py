@@ -0,0 +1,283 @@
+"""
+Search over site names and locations, for sites.json and future_sites.json.
+
+The build writes one static file, data/build/search_index.json (+ .gz), small enough for
+a page to load lazily when the search box is first used:
+  {"docs": [[id, name, category, future], ...],        # what a result row shows
+   "terms": [...],                                      # every normalized token, sorted
+   "name": [[doc delta, ...], ...],                     # postings parallel to terms,
+   "location": [[doc delta, ...], ...]}                 # delta-encoded doc indices
+
+Tokens are accent-folded, case-folded and abbreviated the way the geocoder's keys are
+("Fifth Avenue" and "5th ave" give the same tokens). Because the term list is sorted,
+prefix lookups are a binary search for the range of terms starting with the prefix (the
+flattened form of a prefix trie). Fuzzy matching uses character trigrams of the terms,
+rebuilt when the index is loaded rather than shipped.
+
+  python search/search_index.py
+  python search/search_index.py --query "5th ave cathedral"
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import sys
+import unicodedata
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import BUILD_DIR, FUTURE_SITES_JSON_PATH, SITES_JSON_PATH
+from common.site import read_sites
+from export.export import write_artifact
+from geocode.local_geocoder import ABBREVIATIONS, abbreviate, strip_city_suffix
+
+SEARCH_INDEX_PATH = os.path.join(BUILD_DIR, "search_index.json")
+
+# Too common to narrow anything down
+STOPWORDS = {"the", "of", "a", "an", "at", "in", "on", "&", "and"}
+
+# "5th" and "fifth" both become "5th"; bare numbers stay as they are (house numbers)
+ORDINAL = re.compile(r"^(\d+)(st|nd|rd|th)$")
+
+# A name match counts more than a location match; exact more than prefix more than fuzzy
+FIELD_WEIGHTS = {"name": 2.0, "location": 1.0}
+EXACT, PREFIX, FUZZY = 1.0, 0.8, 0.6
+
+# Minimum trigram (Dice) similarity for a fuzzy term match, and how many terms to try
+FUZZY_THRESHOLD = 0.5
+FUZZY_CANDIDATES = 5
+
+
+def fold(text):
+    """Accents removed and case folded: "Café" -> "cafe"."""
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+
+
+def normalize_token(word):
+    match = ORDINAL.match(word)
+    if match:
+        # Fix the suffix, so the common "21th" / "2th" typos still match "21st" / "2nd"
+        number = int(match.group(1))
+        suffix = "th" if 10 <= number % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+        return f"{number}{suffix}"
+    return word
+
+
+def _words(text, is_location):
+    text = fold(text or "")
+    if is_location:
+        text = strip_city_suffix(text.strip())
+    return re.findall(r"\w+", text)
+
+
+def tokenize(text, is_location=False):
+    """Normalized tokens of a name or location, stopwords dropped."""
+    tokens = (normalize_token(word) for word in abbreviate(_words(text, is_location)))
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def index_terms(text, is_location=False):
+    """
+    The terms a name or location is indexed under: its tokens, plus the long form of
+    abbreviated words ("street" next to "st"), so typing "stre" still finds it.
+    """
+    terms = set(tokenize(text, is_location))
+    terms.update(word for word in _words(text, is_location) if word in ABBREVIATIONS)
+    terms.difference_update(STOPWORDS)
+    return terms
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build(sites, future_sites=()):
+    """Builds the index payload from current and future Sites."""
+    docs = []
+    postings = {"name": {}, "location": {}}
+    for future, records in ((0, sites), (1, future_sites)):
+        for site in records:
+            doc = len(docs)
+            docs.append([site.id, site.name, site.category.value, future])
+            for term in index_terms(site.name):
+                postings["name"].setdefault(term, []).append(doc)
+            for term in index_terms(site.location, is_location=True):
+                postings["location"].setdefault(term, []).append(doc)
+
+    terms = sorted(set(postings["name"]) | set(postings["location"]))
+
+    def delta_encode(docs_list):
+        previous, deltas = 0, []
+        for doc in docs_list:
+            deltas.append(doc - previous)
+            previous = doc
+        return deltas
+
+    return {
+        "docs": docs,
+        "terms": terms,
+        "name": [delta_encode(postings["name"].get(term, [])) for term in terms],
+        "location": [delta_encode(postings["location"].get(term, [])) for term in terms]
+    }
+
+
+class SearchIndex:
+    """Query side of the index: load a payload once, then call search() as often as needed."""
+
+    def __init__(self, payload):
+        self.docs = payload["docs"]
+        self.terms = payload["terms"]
+        self.postings = {}
+        for field in FIELD_WEIGHTS:
+            decoded = []
+            for deltas in payload[field]:
+                doc, docs = 0, []
+                for delta in deltas:
+                    doc += delta
+                    docs.append(doc)
+                decoded.append(docs)
+            self.postings[field] = decoded
+        self.grams = {}
+        self.gram_counts = []
+        for term_index, term in enumerate(self.terms):
+            term_grams = trigrams(term)
+            self.gram_counts.append(len(term_grams))
+            for gram in term_grams:
+                self.grams.setdefault(gram, []).append(term_index)
+
+    @classmethod
+    def load(cls, path=SEARCH_INDEX_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def prefix_range(self, prefix):
+        """Indices of the terms starting with prefix."""
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff")
+        return range(start, end)
+
+    def fuzzy_terms(self, token):
+        """Up to FUZZY_CANDIDATES (term index, similarity) pairs sharing enough trigrams."""
+        grams = trigrams(token)
+        shared = {}
+        for gram in grams:
+            for term_index in self.grams.get(gram, ()):
+                shared[term_index] = shared.get(term_index, 0) + 1
+        scored = []
+        for term_index, count in shared.items():
+            similarity = 2 * count / (len(grams) + self.gram_counts[term_index])
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((similarity, term_index))
+        scored.sort(reverse=True)
+        return [(term_index, similarity) for similarity, term_index in scored[:FUZZY_CANDIDATES]]
+
+    def match_token(self, token, as_prefix):
+        """
+        {term index: quality} for one query token: the exact term, then (for the token
+        being typed) every term it prefixes, and only if neither exists, fuzzy matches.
+        """
+        matches = {}
+        position = bisect.bisect_left(self.terms, token)
+        if position < len(self.terms) and self.terms[position] == token:
+            matches[position] = EXACT
+        if as_prefix:
+            for term_index in self.prefix_range(token):
+                matches.setdefault(term_index, PREFIX)
+        if not matches:
+            for term_index, similarity in self.fuzzy_terms(token):
+                matches[term_index] = FUZZY * similarity
+        return matches
+
+    def search(self, query, limit=10, category=None, include_future=True):
+        """
+        Sites matching every token of the query (the last one as a prefix, for type-ahead),
+        best first. Returns a list of dicts with:
+          id, name, category, future (True for future_sites.json entries), score
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        scores = None
+        for position, token in enumerate(tokens):
+            token_scores = {}
+            for term_index, quality in self.match_token(token, position == len(tokens) - 1).items():
+                for field, weight in FIELD_WEIGHTS.items():
+                    for doc in self.postings[field][term_index]:
+                        score = weight * quality
+                        if score > token_scores.get(doc, 0):
+                            token_scores[doc] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {doc: scores[doc] + score for doc, score in token_scores.items() if doc in scores}
+            if not scores:
+                return []
+
+        results = []
+        for doc, score in scores.items():
+            site_id, name, doc_category, future = self.docs[doc]
+            if category and doc_category != category:
+                continue
+            if future and not include_future:
+                continue
+            results.append({"id": site_id, "name": name, "category": doc_category,
+                            "future": bool(future), "score": round(score, 3)})
+        results.sort(key=lambda result: (-result["score"], result["name"]))
+        return results[:limit]
+
+
+def load_sites(sites_path=SITES_JSON_PATH, future_sites_path=FUTURE_SITES_JSON_PATH):
+    sites = read_sites(sites_path)
+    future_sites = []
+    if future_sites_path and os.path.exists(future_sites_path):
+        future_sites = read_sites(future_sites_path)
+    return sites, future_sites
+
+
+def write_index(payload, path=SEARCH_INDEX_PATH):
+    """Writes the minified index and its precompressed siblings. Returns the sizes."""
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return write_artifact(path, data)
+
+
+def export_search(sites):
+    """Pipeline stage: indexes the current records plus future_sites.json; leaves the records unchanged."""
+    future_sites = []
+    if os.path.exists(FUTURE_SITES_JSON_PATH):
+        future_sites = read_sites(FUTURE_SITES_JSON_PATH)
+    payload = build(sites, future_sites)
+    sizes = write_index(payload)
+    print(f"Indexed {len(payload['docs'])} sites, {len(payload['terms'])} terms "
+          f"({sizes['bytes'] / 1024:.1f} KB, {sizes['gzip'] / 1024:.1f} KB gzipped)")
+    return sites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build (or query) the site search index.")
+    parser.add_argument("--input", default=SITES_JSON_PATH)
+    parser.add_argument("--future", default=FUTURE_SITES_JSON_PATH)
+    parser.add_argument("--output", default=SEARCH_INDEX_PATH)
+    parser.add_argument("--query", help="search the index at --output instead of building it")
+    parser.add_argument("--category")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.query:
+        index = SearchIndex.load(args.output)
+        for result in index.search(args.query, args.limit, args.category):
+            future = " (future)" if result["future"] else ""
+            print(f"{result['score']:>6}  {result['name']}  [{result['category']}]{future}")
+        return
+
+    sites, future_sites = load_sites(args.input, args.future)
+    payload = build(sites, future_sites)
+    sizes = write_index(payload, args.output)
+    print(f"Indexed {len(payload['docs'])} sites, {len(payload['terms'])} terms into {args.output} "
+          f"({sizes['bytes'] / 1024:.1f} KB, {sizes['gzip'] / 1024:.1f} KB gzipped)")
+
+
+if __name__ == "__main__":
+    main()
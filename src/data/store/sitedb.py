@@ -0,0 +1,340 @@
+"""
+SQLite store for the site records, so queries like "unvisited museums near here" or
+"sites missing coordinates" read a few indexed rows instead of loading and scanning
+every JSON file.
+
+It holds the processed records (the "sites" and "future_sites" datasets, one row per
+Site) and the raw scraper output (one row per raw record, with the id of the site it
+becomes). Indexed:
+  - category, visit state and source raw file: B-tree indexes per dataset, plus a
+    partial index of the rows still missing coordinates
+  - coordinates: an R-tree over the rows with coordinates (kept in step by triggers),
+    plus a geohash column (common/geohash.py) for cell lookups and grouping. The R-tree
+    holds 32-bit floats, so it only narrows a box query down; the stored REAL
+    coordinates decide
+Writes are batched upserts in one transaction: a failed run leaves the store as it was.
+Export is deterministic: rows come back in the order they were last written, through
+common/site.py / common/serialization.py, so import then export gives the same bytes.
+
+  python store/sitedb.py import               # data/raw, sites.json, future_sites.json -> sites.db
+  python store/sitedb.py export               # sites.db -> the same JSON files
+  python store/sitedb.py query --category museums --unvisited --near 40.7484,-73.9857 --radius 800
+  python store/sitedb.py query --missing-coords
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from aggregate.aggregate import FILE_CATEGORY_MAP
+from common import geohash
+from common import instrument
+from common import serialization
+from common.paths import FUTURE_SITES_JSON_PATH, RAW_DIR, SITES_DB_PATH, SITES_JSON_PATH
+from common.records import site_id
+from common.site import Site, VisitState, read_sites, write_sites
+
+SITES = "sites"
+FUTURE_SITES = "future_sites"
+
+# Rows per executemany call inside a write's transaction
+BATCH_SIZE = 500
+
+# Precision of the stored geohash: ~150 m cells
+GEOHASH_PRECISION = 7
+
+_COLUMNS = ("dataset", "id", "position", "name", "category", "location", "latitude", "longitude",
+            "geohash", "wikipedia_link", "image", "thumbnail", "visited", "categories", "merged_ids",
+            "extra")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sites (
+    dataset TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    location TEXT NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    geohash TEXT,
+    wikipedia_link TEXT NOT NULL,
+    image TEXT NOT NULL,
+    thumbnail TEXT,
+    visited TEXT,
+    categories TEXT,
+    merged_ids TEXT,
+    extra TEXT,
+    source TEXT,
+    PRIMARY KEY (dataset, id)
+);
+CREATE INDEX IF NOT EXISTS sites_position ON sites (dataset, position);
+CREATE INDEX IF NOT EXISTS sites_category ON sites (dataset, category);
+CREATE INDEX IF NOT EXISTS sites_visited ON sites (dataset, visited);
+CREATE INDEX IF NOT EXISTS sites_source ON sites (dataset, source);
+CREATE INDEX IF NOT EXISTS sites_geohash ON sites (dataset, geohash);
+CREATE INDEX IF NOT EXISTS sites_missing_coords ON sites (dataset, position)
+    WHERE latitude IS NULL OR longitude IS NULL;
+
+CREATE TABLE IF NOT EXISTS raw_records (
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    site_id TEXT NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (source, position)
+);
+CREATE INDEX IF NOT EXISTS raw_records_site_id ON raw_records (site_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS sites_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng);
+
+CREATE TRIGGER IF NOT EXISTS sites_rtree_insert AFTER INSERT ON sites
+WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+    INSERT INTO sites_rtree VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+END;
+CREATE TRIGGER IF NOT EXISTS sites_rtree_update AFTER UPDATE OF latitude, longitude ON sites BEGIN
+    DELETE FROM sites_rtree WHERE id = old.rowid;
+    INSERT INTO sites_rtree SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude
+    WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+CREATE TRIGGER IF NOT EXISTS sites_rtree_delete AFTER DELETE ON sites BEGIN
+    DELETE FROM sites_rtree WHERE id = old.rowid;
+END;
+"""
+
+_UPSERT = (
+    f"INSERT INTO sites ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+    f"ON CONFLICT (dataset, id) DO UPDATE SET "
+    + ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[2:])
+)
+
+# Which raw file each site came from: the first raw record that becomes it
+_FILL_SOURCE = """
+UPDATE sites SET source = (
+    SELECT source FROM raw_records WHERE raw_records.site_id = sites.id ORDER BY source, position LIMIT 1
+) WHERE dataset = ?
+"""
+
+
+def _json_or_none(value):
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+def _row(dataset, position, site):
+    coords = site.coords
+    return (
+        dataset, site.id, position, site.name, site.category.value, site.location,
+        site.latitude, site.longitude,
+        geohash.encode(*coords, GEOHASH_PRECISION) if coords else None,
+        site.wikipedia_link, site.image, site.thumbnail,
+        site.visited.value if site.visited is not None else None,
+        _json_or_none([category.value for category in site.categories] if site.categories is not None else None),
+        _json_or_none(site.merged_ids),
+        _json_or_none(site.extra or None),
+    )
+
+
+_SELECT = ("SELECT id, name, category, location, latitude, longitude, wikipedia_link, image, thumbnail, "
+           "visited, categories, merged_ids, extra FROM sites")
+
+
+def _site(row):
+    (key, name, category, location, latitude, longitude, wikipedia_link, image, thumbnail,
+     visited, categories, merged_ids, extra) = row
+    return Site(
+        name, category, location=location, latitude=latitude, longitude=longitude,
+        wikipedia_link=wikipedia_link, image=image, thumbnail=thumbnail, visited=visited,
+        categories=json.loads(categories) if categories is not None else None,
+        merged_ids=json.loads(merged_ids) if merged_ids is not None else None,
+        id=key, extra=json.loads(extra) if extra is not None else None,
+    )
+
+
+class SiteDB:
+    def __init__(self, path=SITES_DB_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    # --- processed records ---
+
+    def write_sites(self, sites, dataset=SITES, batch_size=BATCH_SIZE):
+        """
+        Makes the dataset hold exactly these Sites, in this order: upserts them in batches
+        and deletes the rows no longer in the list, all in one transaction.
+        Returns (rows written, rows deleted).
+        """
+        with instrument.span("db.write", dataset=dataset, records=len(sites)) as fields:
+            with self._conn:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (id TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM keep")
+                for start in range(0, len(sites), batch_size):
+                    batch = sites[start:start + batch_size]
+                    self._conn.executemany(_UPSERT, [_row(dataset, start + i, site) for i, site in enumerate(batch)])
+                    self._conn.executemany("INSERT OR IGNORE INTO keep VALUES (?)", [(site.id,) for site in batch])
+                deleted = self._conn.execute(
+                    "DELETE FROM sites WHERE dataset = ? AND id NOT IN (SELECT id FROM keep)", (dataset,)
+                ).rowcount
+                self._conn.execute(_FILL_SOURCE, (dataset,))
+            fields["deleted"] = deleted
+        return len(sites), deleted
+
+    def read_sites(self, dataset=SITES):
+        """Every Site of the dataset, in the order last written."""
+        with instrument.span("db.read", dataset=dataset) as fields:
+            rows = self._conn.execute(f"{_SELECT} WHERE dataset = ? ORDER BY position", (dataset,)).fetchall()
+            fields["records"] = len(rows)
+        return [_site(row) for row in rows]
+
+    def count(self, dataset=SITES):
+        return self._conn.execute("SELECT COUNT(*) FROM sites WHERE dataset = ?", (dataset,)).fetchone()[0]
+
+    def query(self, dataset=SITES, category=None, visited=None, source=None, bbox=None,
+              missing_coords=False, limit=None):
+        """
+        Sites matching every filter given, in dataset order.
+          category        a category (or several)
+          visited         True / False (a site without a visit state counts as not visited)
+          source          raw file name, e.g. "museums.json"
+          bbox            (south, west, north, east), answered from the R-tree
+          missing_coords  only the sites still without coordinates
+        """
+        clauses, params = ["dataset = ?"], [dataset]
+        if category is not None:
+            categories = [category] if isinstance(category, str) else list(category)
+            clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+            params += [str(value) for value in categories]
+        if visited is not None:
+            clauses.append("visited = ?" if visited else "(visited IS NULL OR visited != ?)")
+            params.append(VisitState.VISITED.value)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        if missing_coords:
+            clauses.append("(latitude IS NULL OR longitude IS NULL)")
+        if bbox is not None:
+            south, west, north, east = bbox
+            clauses.append("rowid IN (SELECT id FROM sites_rtree WHERE max_lat >= ? AND min_lat <= ? "
+                           "AND max_lng >= ? AND min_lng <= ?) "
+                           "AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+            params += [south, north, west, east, south, north, west, east]
+        sql = f"{_SELECT} WHERE {' AND '.join(clauses)} ORDER BY position"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with instrument.span("db.query") as fields:
+            rows = self._conn.execute(sql, params).fetchall()
+            fields["records"] = len(rows)
+        return [_site(row) for row in rows]
+
+    def nearby(self, lat, lng, radius_m, limit=None, **filters):
+        """[(distance in meters, Site)] within radius_m, nearest first; filters as for query()."""
+        d_lat = math.degrees(radius_m / geohash.EARTH_RADIUS_M)
+        d_lng = d_lat / max(math.cos(math.radians(lat)), 1e-6)
+        candidates = self.query(bbox=(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng), **filters)
+        found = [(geohash.haversine_m(lat, lng, site.latitude, site.longitude), site) for site in candidates]
+        found = sorted((item for item in found if item[0] <= radius_m), key=lambda item: item[0])
+        return found[:limit] if limit is not None else found
+
+    # --- raw scraper output ---
+
+    def write_raw(self, source, records, category):
+        """Replaces one raw file's records; category is the one aggregate.py gives that file."""
+        rows = [(source, position, site_id(category, record.get("name", "Unknown"), record.get("wikipedia_link", "")),
+                 serialization.dumps(record).decode("utf-8").rstrip("\n"))
+                for position, record in enumerate(records)]
+        with self._conn:
+            self._conn.execute("DELETE FROM raw_records WHERE source = ?", (source,))
+            for start in range(0, len(rows), BATCH_SIZE):
+                self._conn.executemany("INSERT INTO raw_records VALUES (?, ?, ?, ?)", rows[start:start + BATCH_SIZE])
+
+    def read_raw(self, source):
+        rows = self._conn.execute("SELECT record FROM raw_records WHERE source = ? ORDER BY position",
+                                  (source,)).fetchall()
+        return [serialization.loads(row[0]) for row in rows]
+
+    def raw_sources(self):
+        return [row[0] for row in self._conn.execute("SELECT DISTINCT source FROM raw_records ORDER BY source")]
+
+
+def import_json(db, raw_dir=RAW_DIR, sites_path=SITES_JSON_PATH, future_sites_path=FUTURE_SITES_JSON_PATH):
+    """Loads the raw files, sites.json and future_sites.json into the store."""
+    for path in sorted(glob.glob(os.path.join(raw_dir, "*.json"))):
+        source = os.path.basename(path)
+        if source not in FILE_CATEGORY_MAP:
+            continue
+        records = serialization.load_raw(path)
+        db.write_raw(source, records, FILE_CATEGORY_MAP[source])
+        print(f"Imported {len(records)} raw records from {source}")
+    for dataset, path in ((SITES, sites_path), (FUTURE_SITES, future_sites_path)):
+        if path and os.path.exists(path):
+            written, deleted = db.write_sites(read_sites(path), dataset)
+            print(f"Imported {written} {dataset} ({deleted} rows no longer present removed)")
+
+
+def export_json(db, raw_dir=RAW_DIR, sites_path=SITES_JSON_PATH, future_sites_path=FUTURE_SITES_JSON_PATH):
+    """Writes the store back out as the JSON files the scripts and pages read."""
+    for source in db.raw_sources():
+        serialization.dump(db.read_raw(source), os.path.join(raw_dir, source))
+    for dataset, path in ((SITES, sites_path), (FUTURE_SITES, future_sites_path)):
+        if path and db.count(dataset):
+            write_sites(db.read_sites(dataset), path)
+            print(f"Exported {db.count(dataset)} {dataset} to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import, export and query the SQLite site store.")
+    parser.add_argument("command", choices=["import", "export", "query"])
+    parser.add_argument("--db", default=SITES_DB_PATH)
+    parser.add_argument("--dataset", default=SITES, choices=[SITES, FUTURE_SITES])
+    parser.add_argument("--category", help="comma-separated categories")
+    parser.add_argument("--visited", action="store_true")
+    parser.add_argument("--unvisited", action="store_true")
+    parser.add_argument("--source", help="raw file, e.g. museums.json")
+    parser.add_argument("--missing-coords", action="store_true")
+    parser.add_argument("--bbox", help="south,west,north,east")
+    parser.add_argument("--near", help="lat,lng")
+    parser.add_argument("--radius", type=float, default=500, help="meters, with --near")
+    parser.add_argument("--limit", type=int)
+    args = parser.parse_args()
+
+    db = SiteDB(args.db)
+    try:
+        if args.command == "import":
+            import_json(db)
+        elif args.command == "export":
+            export_json(db)
+        else:
+            filters = {
+                "dataset": args.dataset,
+                "category": args.category.split(",") if args.category else None,
+                "visited": True if args.visited else False if args.unvisited else None,
+                "source": args.source,
+                "missing_coords": args.missing_coords,
+            }
+            if args.near:
+                lat, lng = (float(part) for part in args.near.split(","))
+                results = db.nearby(lat, lng, args.radius, args.limit, **filters)
+            else:
+                bbox = tuple(float(part) for part in args.bbox.split(",")) if args.bbox else None
+                results = [(None, site) for site in db.query(bbox=bbox, limit=args.limit, **filters)]
+            for distance, site in results:
+                where = f"{distance:7.0f} m" if distance is not None else (
+                    f"{site.latitude:.5f},{site.longitude:.5f}" if site.coords else "no coordinates")
+                print(f"{site.id}  {where:>21}  {site.category.value:<20} {site.name}")
+            print(f"{len(results)} sites")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
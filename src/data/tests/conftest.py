@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.paths import SITES_JSON_PATH
+from common.site import read_sites
+
+
+@pytest.fixture
+def sites():
+    """A fresh copy of the first few hundred processed records."""
+    return read_sites(SITES_JSON_PATH)[:300]
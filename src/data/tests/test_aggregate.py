@@ -0,0 +1,61 @@
+"""Incremental aggregation (aggregate/aggregate.py) around records merged by clean/dedupe.py."""
+import os
+
+import pytest
+
+from aggregate.aggregate import aggregate
+from clean.dedupe import dedupe
+from common import serialization
+
+MUSEUM = {"name": "Tenement Museum", "location": "40.7188, -73.9900",
+          "wikipedia_link": "https://en.wikipedia.org/wiki/Tenement_Museum", "image": ""}
+LANDMARK = {"name": "Tenement Museum", "location": "40.7188, -73.9900",
+            "wikipedia_link": "https://en.wikipedia.org/wiki/Tenement_Museum", "image": ""}
+OTHER = {"name": "Morgan Library", "location": "40.7492, -73.9813",
+         "wikipedia_link": "https://en.wikipedia.org/wiki/Morgan_Library_%26_Museum", "image": ""}
+
+
+def write_raw(raw_dir, museums, landmarks):
+    serialization.dump(museums, os.path.join(raw_dir, "museums.json"))
+    serialization.dump(landmarks, os.path.join(raw_dir, "designated_landmarks.json"))
+
+
+@pytest.fixture
+def previous(tmp_path):
+    """A first aggregation of two raw files, deduplicated, and its state."""
+    raw_dir = str(tmp_path)
+    write_raw(raw_dir, [MUSEUM, OTHER], [LANDMARK])
+    sites, state, _ = aggregate(raw_dir)
+    sites = dedupe(sites)
+    merged = [site for site in sites if site.merged_ids]
+    assert len(merged) == 1 and len(merged[0].merged_ids) == 2
+    return raw_dir, sites, state, merged[0]
+
+
+def test_merged_record_carried_forward(previous):
+    raw_dir, sites, state, merged = previous
+    result, _, manifest = aggregate(raw_dir, sites, state)
+    assert merged in result and len(result) == 2
+    assert (manifest["added"], manifest["changed"], manifest["removed"], manifest["unchanged"]) == ([], [], [], 3)
+
+
+def test_changed_member_splits_merged_record(previous):
+    raw_dir, sites, state, merged = previous
+    # Only the museum file changes; the landmark's file is carried forward unread
+    write_raw(raw_dir, [dict(MUSEUM, location="40.7189, -73.9901"), OTHER], [LANDMARK])
+    result, _, manifest = aggregate(raw_dir, sites, state)
+    assert merged not in result
+    assert sorted(site.id for site in result if not site.merged_ids and site.name == MUSEUM["name"]) == \
+        sorted(merged.merged_ids)
+    assert manifest["added"] == [] and manifest["removed"] == []
+    assert sorted(manifest["changed"]) == sorted(merged.merged_ids) and manifest["unchanged"] == 1
+
+
+def test_removed_member_reported(previous):
+    raw_dir, sites, state, merged = previous
+    write_raw(raw_dir, [MUSEUM, OTHER], [])
+    result, _, manifest = aggregate(raw_dir, sites, state)
+    museum = next(site for site in result if site.name == MUSEUM["name"])
+    assert not museum.merged_ids and museum.id in merged.merged_ids
+    assert manifest["removed"] == [key for key in merged.merged_ids if key != museum.id]
+    assert manifest["changed"] == [museum.id] and manifest["added"] == []
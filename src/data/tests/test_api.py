@@ -0,0 +1,42 @@
+"""The query API (src/api/app.py) answers bad arguments with 400, never a 500."""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "api"))
+from app import MAX_LIMIT, SiteStore, create_app
+
+
+@pytest.fixture
+def client(sites):
+    return create_app(store=SiteStore(sites)).test_client()
+
+
+@pytest.mark.parametrize("query", [
+    "/sites/nearby?lat=nan&lng=-73.98",
+    "/sites/nearby?lat=40.75&lng=inf",
+    "/sites/nearby?lat=91&lng=-73.98",
+    "/sites/nearby?lat=40.75&lng=-181",
+    "/sites/nearby?lat=40.75&lng=-73.98&radius=nan",
+    "/sites/nearby?lat=40.75&lng=-73.98&limit=inf",
+    "/sites/nearby?lat=40.75&lng=-73.98&limit=nan",
+    "/sites/nearby?lat=40.75&lng=-73.98&limit=-1",
+    "/sites/nearby?lat=40.75&lng=-73.98&limit=0",
+    "/sites/nearby?lat=40.75&lng=-73.98&limit=2.5",
+    "/sites?bbox=nan,40,-73,41",
+    "/sites?bbox=-74,40,-73,inf",
+    "/sites?bbox=-74,40,-73",
+    "/sites?bbox=-200,40,-73,41",
+])
+def test_bad_arguments(client, query):
+    response = client.get(query)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_limit(client, sites):
+    site = next(site for site in sites if site.coords)
+    query = f"/sites/nearby?lat={site.latitude}&lng={site.longitude}&radius=5000"
+    assert client.get(query + "&limit=3").get_json()["count"] == 3
+    assert client.get(query + f"&limit={MAX_LIMIT * 10}").get_json()["count"] <= MAX_LIMIT
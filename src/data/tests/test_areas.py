@@ -0,0 +1,38 @@
+"""When areas/tag_areas.py writes its list of flagged sites."""
+import os
+
+from areas.tag_areas import tag_areas
+from common import serialization
+from common.site import Site
+
+SQUARE = [[[-74.02, 40.70], [-73.96, 40.70], [-73.96, 40.76], [-74.02, 40.76], [-74.02, 40.70]]]
+
+
+def boundaries(tmp_path):
+    path = os.path.join(tmp_path, "boroughs.geojson")
+    serialization.dump({"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"boro_name": "Manhattan"},
+         "geometry": {"type": "Polygon", "coordinates": SQUARE}}]}, path)
+    return path
+
+
+def site(listed_borough):
+    return Site("Somewhere", "landmarks", latitude=40.73, longitude=-73.99,
+                extra={"listed_borough": listed_borough})
+
+
+def test_flagged_sites_written_only_when_asked(tmp_path):
+    borough_path = boundaries(tmp_path)
+    check_path = os.path.join(tmp_path, "area_check.json")
+    sites = tag_areas([site("Brooklyn")], borough_path, None, "numpy")
+    assert sites[0].extra["borough"] == "Manhattan"
+    assert not os.path.exists(check_path)
+
+    tag_areas([site("Brooklyn")], borough_path, None, "numpy", check_path)
+    assert [flag["listed_borough"] for flag in serialization.load(check_path)["mismatched"]] == ["Brooklyn"]
+
+
+def test_nothing_written_without_flagged_sites(tmp_path):
+    check_path = os.path.join(tmp_path, "area_check.json")
+    tag_areas([site("Manhattan")], boundaries(tmp_path), None, "numpy", check_path)
+    assert not os.path.exists(check_path)
@@ -0,0 +1,35 @@
+"""Which nearby pairs clean/dedupe.py may merge."""
+from clean.dedupe import find_duplicates
+from common.site import Category, Site
+
+
+def site(name, category, link, latitude=40.7280, longitude=-73.9920):
+    return Site(name, category, latitude=latitude, longitude=longitude, wikipedia_link=link)
+
+
+def test_same_list_entries_under_one_article_stay_apart():
+    link = "https://en.wikipedia.org/wiki/Grace_Church_and_Dependencies"
+    sites = [site("Grace Church Rectory", Category.LANDMARKS, link),
+             site("Grace Church Clergy House", Category.LANDMARKS, link),
+             site("NoHo Historic District", Category.LANDMARKS, "https://en.wikipedia.org/wiki/NoHo"),
+             site("NoHo East Historic District", Category.LANDMARKS, "https://en.wikipedia.org/wiki/NoHo")]
+    groups, _ = find_duplicates(sites)
+    assert groups == []
+
+
+def test_one_site_on_two_lists_merges():
+    link = "https://en.wikipedia.org/wiki/Grace_Church_(Manhattan)"
+    sites = [site("Grace Church", Category.LANDMARKS, link),
+             site("Grace Church and Dependencies", Category.HISTORICAL_PLACES, link),
+             site("Grace Church Rectory", Category.LANDMARKS, "")]
+    groups, _ = find_duplicates(sites)
+    assert groups == [[0, 1]]
+
+
+def test_a_group_never_holds_two_entries_of_one_list():
+    link = "https://en.wikipedia.org/wiki/NoHo"
+    sites = [site("NoHo Historic District", Category.LANDMARKS, link),
+             site("NoHo Historic District", Category.HISTORICAL_PLACES, link),
+             site("NoHo East Historic District", Category.LANDMARKS, link)]
+    groups, _ = find_duplicates(sites)
+    assert groups == [[0, 1]]
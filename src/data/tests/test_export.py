@@ -0,0 +1,63 @@
+"""Round trip of export/export.py's columnar payload."""
+import json
+import os
+
+from clean.dedupe import dedupe
+from common.site import Site
+from export.clusters import build as cluster_build, popup
+from export.export import ALL_SITES_FILE, INDEX_FILE, build, decode, encode
+
+LINK = "https://en.wikipedia.org/wiki/Tenement_Museum"
+
+
+def deduped_sites():
+    sites = dedupe([
+        Site("Tenement Museum", "museums", latitude=40.7188, longitude=-73.99, wikipedia_link=LINK,
+             thumbnail="data/thumbnails/ab/abc.webp"),
+        Site("Tenement Museum", "landmarks", latitude=40.7188, longitude=-73.99, wikipedia_link=LINK),
+        Site("Morgan Library", "museums", latitude=40.7492, longitude=-73.9813,
+             wikipedia_link="https://en.wikipedia.org/wiki/Morgan_Library_%26_Museum"),
+    ])
+    assert any(site.merged_ids for site in sites)
+    return sites
+
+
+def test_round_trip_keeps_id_categories_and_thumbnail():
+    sites = deduped_sites()
+    decoded = decode(json.loads(json.dumps(encode(sites))))
+    for site, record in zip(sites, decoded):
+        assert record["id"] == site.id
+        assert record.get("categories") == ([category.value for category in site.categories]
+                                            if site.categories and len(site.categories) > 1 else None)
+        assert record.get("thumbnail") == site.thumbnail
+
+
+def test_merged_site_in_every_category_shard(tmp_path):
+    sites = deduped_sites()
+    merged = next(site for site in sites if site.merged_ids)
+    index = build(sites, str(tmp_path))
+    assert index["categories"]["landmarks"]["count"] == 1 and index["categories"]["museums"]["count"] == 2
+    for category in ("landmarks", "museums"):
+        with open(os.path.join(tmp_path, "sites", f"{category}.json"), encoding="utf-8") as f:
+            assert merged.id in [record["id"] for record in decode(json.load(f))]
+    assert os.path.exists(os.path.join(tmp_path, ALL_SITES_FILE)) and os.path.exists(os.path.join(tmp_path, INDEX_FILE))
+
+
+def test_popup_has_thumbnail():
+    site = deduped_sites()[0]
+    assert popup(site)["thumbnail"] == "data/thumbnails/ab/abc.webp"
+    assert "thumbnail" not in popup(site.copy(thumbnail=None))
+
+
+def test_cluster_build_drops_stale_files(tmp_path):
+    sites = deduped_sites()
+    cluster_build(sites, str(tmp_path), min_zoom=10, max_zoom=14)
+    popups = tmp_path / "popups"
+    assert len(list(popups.iterdir())) == len(sites)
+
+    cluster_build(sites[:1], str(tmp_path), min_zoom=10, max_zoom=12)
+    assert [path.name for path in popups.iterdir()] == [f"{sites[0].id}.json"]
+    category = sites[0].category.value
+    assert sorted(path.name for path in (tmp_path / "clusters" / category).iterdir()) == ["10", "11", "12"]
+    assert not (tmp_path / "clusters" / "museums" / "13").exists()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["clusters", "popups"]
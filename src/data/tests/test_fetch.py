@@ -0,0 +1,47 @@
+"""common/fetch.py driven against the local stand-in (common/fixture_server.py)."""
+import pytest
+import requests
+
+from common import cache, fetch, fixture_server
+
+PAGES = [f"https://en.wikipedia.org/wiki/Page_{n}" for n in range(8)]
+MISSING = "https://en.wikipedia.org/wiki/No_such_page"
+
+
+@pytest.fixture
+def stand_in(tmp_path, monkeypatch):
+    """Serves PAGES (Page_0 failing once with a 503), slowly enough to overlap requests."""
+    root = tmp_path / "fixtures"
+    for url in PAGES:
+        path = root / "en.wikipedia.org" / "wiki" / url.rsplit("/", 1)[1]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"<html><body>{url}</body></html>", encoding="utf-8")
+    server, base_url = fixture_server.start_server(str(root), delay=0.2,
+                                                   failures={"/en.wikipedia.org/wiki/Page_0": 1})
+    monkeypatch.setattr(fetch, "BASE_OVERRIDE", base_url)
+    monkeypatch.setattr(fetch, "_cache", cache.HttpCache(root=str(tmp_path / "http")))
+    yield server.RequestHandlerClass.stats
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_pages(stand_in):
+    results = {url: (html, error) for url, html, error in fetch.fetch_pages(PAGES + [MISSING])}
+
+    # Every page arrives, Page_0 after one retry; several requests ran at once, within the host limit
+    for url in PAGES:
+        html, error = results[url]
+        assert error is None and url in html
+    assert stand_in["requests"] == len(PAGES) + 1 + 1
+    assert 1 < stand_in["max_in_flight"] <= fetch.PER_HOST_LIMIT
+
+    # A 404 is not retried and comes back as the error of its tuple
+    html, error = results[MISSING]
+    assert html is None and isinstance(error, requests.HTTPError) and error.response.status_code == 404
+
+
+def test_cached_pages_revalidate(stand_in, monkeypatch):
+    list(fetch.fetch_pages(PAGES[1:2]))
+    monkeypatch.setattr(fetch._cache, "is_fresh", lambda entry: False)
+    response = fetch.fetch(PAGES[1])
+    assert PAGES[1] in response.text and stand_in["requests"] == 2
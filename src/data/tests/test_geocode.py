@@ -0,0 +1,63 @@
+"""geocode/pre_geocode.py against the local MapQuest stand-in (geocode/mock_geocoder.py)."""
+import pytest
+
+from common import cache, fetch
+from common.kvstore import KeyValueStore
+from common.site import Site
+from geocode import mock_geocoder, pre_geocode
+
+ADDRESSES = [f"{n} Broadway, New York, NY" for n in range(1, 241)] + ["1 Nowhere Lane", "2 Nowhere Lane"]
+
+
+@pytest.fixture
+def mock_api(tmp_path, monkeypatch):
+    server, base_url = mock_geocoder.start_server()
+    monkeypatch.setattr(fetch, "BASE_OVERRIDE", base_url)
+    monkeypatch.setattr(fetch, "_cache", cache.HttpCache(root=str(tmp_path / "http")))
+    monkeypatch.setattr(pre_geocode, "API_KEY", "test")
+    monkeypatch.setattr(pre_geocode, "GEOCODE_CACHE_PATH", str(tmp_path / "geocode.sqlite"))
+    yield mock_geocoder.MockGeocoderHandler.calls
+    server.shutdown()
+    server.server_close()
+
+
+def geocode(addresses, tmp_path, monkeypatch):
+    """One run with a fresh HTTP cache, so only the geocode cache can save requests."""
+    monkeypatch.setattr(fetch, "_cache", cache.HttpCache(root=str(tmp_path / f"http-{id(addresses)}")))
+    store = KeyValueStore(pre_geocode.GEOCODE_CACHE_PATH, table="geocode")
+    try:
+        return pre_geocode.geocode_all(addresses, store, rate=1000)
+    finally:
+        store.close()
+
+
+def test_batches_and_cache(mock_api, tmp_path, monkeypatch):
+    start = mock_api["batch"]
+    results = geocode(ADDRESSES, tmp_path, monkeypatch)
+    assert mock_api["batch"] - start == 3  # 242 addresses, 100 per call
+    for address in ADDRESSES:
+        assert results[pre_geocode.normalize_address(address)] == mock_geocoder.fake_lat_lng(address)
+
+    # Points and misses are both cached: a second run makes no calls
+    start = mock_api["batch"]
+    assert geocode(list(ADDRESSES), tmp_path, monkeypatch) == results
+    assert mock_api["batch"] == start
+
+
+def test_misses_expire(mock_api, tmp_path, monkeypatch):
+    geocode(ADDRESSES, tmp_path, monkeypatch)
+    monkeypatch.setattr(pre_geocode, "NO_RESULT_TTL", 0)
+    start = mock_api["batch"]
+    requested = []
+    original = pre_geocode.geocode_batch
+    monkeypatch.setattr(pre_geocode, "geocode_batch", lambda batch: requested.extend(batch) or original(batch))
+    geocode(list(ADDRESSES), tmp_path, monkeypatch)
+    assert mock_api["batch"] - start == 1 and sorted(requested) == ["1 Nowhere Lane", "2 Nowhere Lane"]
+
+
+def test_geocode_sites_leaves_misses_alone(mock_api, monkeypatch):
+    monkeypatch.setattr(pre_geocode, "load_gazetteer", lambda: None)
+    sites = [Site("Found", "museums", location=ADDRESSES[0]), Site("Lost", "museums", location=ADDRESSES[-1])]
+    pre_geocode.geocode_sites(sites)
+    assert sites[0].coords == mock_geocoder.fake_lat_lng(ADDRESSES[0])
+    assert sites[1].coords is None
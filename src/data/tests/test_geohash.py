@@ -0,0 +1,43 @@
+"""Box queries on common/geohash.py's GeohashIndex."""
+import random
+
+from common.geohash import GeohashIndex
+
+
+class CountingDict(dict):
+    """A bucket map that counts the cells looked up."""
+    lookups = 0
+
+    def get(self, key, default=None):
+        CountingDict.lookups += 1
+        return super().get(key, default)
+
+
+def brute_force(points, south, west, north, east):
+    return sorted(key for key, lat, lng in points if south <= lat <= north and west <= lng <= east)
+
+
+def test_in_bbox_matches_brute_force(sites):
+    points = [(site.id, *site.coords) for site in sites if site.coords]
+    index = GeohashIndex(points)
+    rng = random.Random(0)
+    for _ in range(200):
+        lat, lng = rng.uniform(40.5, 40.9), rng.uniform(-74.2, -73.7)
+        size = rng.choice([0.001, 0.01, 0.1, 1, 200])
+        box = (lat - size, lng - size, lat + size, lng + size)
+        assert sorted(index.in_bbox(*box)) == brute_force(points, *box)
+
+
+def test_world_box_does_not_walk_every_cell():
+    points = [("nyc", 40.75, -73.98), ("sydney", -33.87, 151.21), ("reykjavik", 64.15, -21.94)]
+    index = GeohashIndex(points)
+    for precision in index.precisions:
+        index.buckets[precision] = CountingDict(index.buckets[precision])
+    CountingDict.lookups = 0
+    assert sorted(index.in_bbox(-90, -180, 90, 180)) == ["nyc", "reykjavik", "sydney"]
+    assert index.in_bbox(-10, -10, 10, 10) == []
+    assert CountingDict.lookups <= index.max_cells
+
+
+def test_empty_index():
+    assert GeohashIndex([]).in_bbox(-90, -180, 90, 180) == []
@@ -0,0 +1,52 @@
+"""Lookup keys (geocode/local_geocoder.py) drop the city suffix, and nothing else."""
+import pytest
+
+from geocode.local_geocoder import Gazetteer, block_key, normalize_key
+from search.search_index import tokenize
+
+
+@pytest.mark.parametrize("text, key", [
+    ("75 Murray Street, New York, NY 10007", "75 murray st"),
+    ("75 Murray St, Manhattan, NY", "75 murray st"),
+    ("Brooklyn Museum, Brooklyn, NY 11238", "brooklyn museum"),
+    ("Wave Hill, The Bronx, New York", "wave hill"),
+    ("Bar Street NY 10001", "bar st"),
+    # A leading "St." is a saint, a trailing one a street
+    ("St. Mark's Place", "saint mark s pl"),
+    ("Saint Mark's Place", "saint mark s pl"),
+    ("Church of St. Paul", "church of saint paul"),
+    ("W 4th St", "w 4th st"),
+    # Words that merely end like a suffix keep their letters
+    ("Sunny", "sunny"),
+    ("Tiffany", "tiffany"),
+    ("Consulate General of Germany", "consulate general of germany"),
+    # Place names that are part of the name itself stay
+    ("Bank of Manhattan", "bank of manhattan"),
+    ("Museum of the City of New York", "museum of the city of new york"),
+    # Never the whole string
+    ("Queens", "queens"),
+    ("New York, NY", "new york"),
+])
+def test_normalize_key(text, key):
+    assert normalize_key(text) == key
+
+
+def test_location_tokens_keep_borough_names():
+    assert "germany" in tokenize("Consulate General of Germany, New York, NY", is_location=True)
+    assert "manhattan" in tokenize("Bank of Manhattan, New York, NY", is_location=True)
+
+
+def test_saint_and_street_do_not_collide():
+    assert normalize_key("St Nicholas Ave") != normalize_key("Street Nicholas Ave")
+    assert "saint" in tokenize("St. Patrick's Cathedral") and "saint" in tokenize("saint patrick")
+
+
+def test_fuzzy_lookup_blocks_on_the_street_name():
+    assert block_key("75 murray st") == "murray"
+    assert block_key("37 04 w 4th st") == "4th"
+    gazetteer = Gazetteer()
+    for number in range(1, 2000):
+        gazetteer.add(f"{number} Broadway", 40.7, -74.0)
+    gazetteer.add("75 Murray Street", 40.714, -74.011)
+    assert len(gazetteer.blocks["murray"]) == 1
+    assert gazetteer.lookup("75 Murray Str, New York, NY") == (40.714, -74.011)
@@ -0,0 +1,29 @@
+"""Scraper parse functions on small inline pages, in both the targeted and the full-tree mode."""
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scrapers"))
+from common import parsing
+import designated_landmarks
+
+URL = "https://en.wikipedia.org/wiki/List_of_New_York_City_Designated_Landmarks_in_Brooklyn"
+
+PAGE = """<html><body>
+<table class="wikitable sortable">
+<tr><th>Name</th><th>Image</th></tr>
+<tr><td><a href="/wiki/Brooklyn_Bridge">Brooklyn Bridge</a></td>
+<td><a href="/wiki/File:Bridge.jpg"><img src="//upload.wikimedia.org/bridge.jpg"></a></td></tr>
+</table>
+<table class="navbox">
+<tr><td><a href="/wiki/New_York_City_Landmarks_Preservation_Commission">Commission</a></td></tr>
+</table>
+</body></html>"""
+
+
+@pytest.mark.parametrize("targeted", [True, False])
+def test_designated_skips_navbox_rows(targeted, monkeypatch):
+    monkeypatch.setattr(parsing, "TARGETED", targeted)
+    records = designated_landmarks.parse_additional_wiki_page(URL, PAGE)
+    assert [record["name"] for record in records] == ["Brooklyn Bridge"]
@@ -0,0 +1,98 @@
+"""
+Smoke tests: every stage that needs no network or external files runs over real records,
+with the inputs that reach its less common branches (a non-empty delete list, a visit log).
+"""
+import os
+
+import pytest
+
+import pipeline
+from checklist.add_visit_state import add_visit_state
+from checklist.visit_log import VisitLog, snapshot
+from clean.clean import clean
+from common.records import site_id
+from common.site import Category, VisitState
+
+LOCAL_STAGES = ["tidy", "dedupe", "adjust", "duplicate_images"]
+
+
+@pytest.mark.parametrize("name", LOCAL_STAGES)
+def test_stage_runs(name, sites):
+    result = pipeline.get_stage(name)(sites)
+    assert isinstance(result, list) and 0 < len(result) <= len(sites)
+
+
+def test_clean_removes_listed_landmarks(sites):
+    landmark = next(site for site in sites if site.category is Category.LANDMARKS)
+    other = next(site for site in sites if site.category is not Category.LANDMARKS)
+    result = clean(sites, {landmark.name, other.name})
+    assert all(site.name != landmark.name or site.category is not Category.LANDMARKS for site in result)
+    assert other in result
+
+
+def test_visit_state_from_log(sites, tmp_path):
+    log_path = os.path.join(tmp_path, "visits.jsonl")
+    VisitLog(log_path).mark(sites[0].id)
+    add_visit_state(sites, log_path)
+    assert sites[0].visited is VisitState.VISITED
+
+
+def test_unmark_merged_site(sites, tmp_path):
+    log_path = os.path.join(tmp_path, "visits.jsonl")
+    merged = sites[0].copy(merged_ids=[sites[0].id, sites[1].id], id="ffffffffffffffff",
+                           visited=VisitState.VISITED)
+    log = VisitLog(log_path)
+    assert log.seed([merged]) == 2
+    log.set_visited(merged, False)
+    add_visit_state([merged], log_path)
+    assert merged.visited is VisitState.NOT_VISITED
+    assert VisitLog(log_path).visited() == {}
+
+
+def test_new_visit_log_keeps_existing_visits(sites, tmp_path):
+    log_path = os.path.join(tmp_path, "visits.jsonl")
+    sites[0].visited = VisitState.VISITED
+    sites[1].visited = VisitState.NOT_VISITED
+    add_visit_state(sites, log_path)
+    assert sites[0].visited is VisitState.VISITED
+    # Once seeded, the log decides: marking another site keeps the first one visited
+    VisitLog(log_path).mark(sites[1].id)
+    add_visit_state(sites, log_path)
+    assert [site.visited for site in sites[:2]] == [VisitState.VISITED, VisitState.VISITED]
+
+
+def test_visits_snapshot_keyed_by_sites_json_id(sites, tmp_path):
+    log = VisitLog(os.path.join(tmp_path, "visits.jsonl"))
+    log.mark(sites[1].id, at="2026-10-18T14:05:52Z")
+    merged = sites[2].copy(merged_ids=[sites[2].id, "0000000000000000"], id="ffffffffffffffff")
+    log.mark("0000000000000000", at="2026-10-19T09:00:00Z")
+    assert snapshot(log, [sites[0], sites[1], merged]) == {
+        "visited": {sites[1].id: "2026-10-18T14:05:52Z", "ffffffffffffffff": "2026-10-19T09:00:00Z"}}
+    # The key the page can compute from a sites.json record
+    record = sites[1].to_dict()
+    assert (record.get("id") or site_id(record["category"], record["name"], record["wikipedia_link"])) == sites[1].id
+
+
+def test_no_undefined_names():
+    """The check that would have caught a stage calling a name it never imported."""
+    pyflakes_api = pytest.importorskip("pyflakes.api")
+    from pyflakes import messages
+    from pyflakes.reporter import Reporter
+
+    class Collect(Reporter):
+        def __init__(self):
+            self.found = []
+
+        def flake(self, message):
+            if isinstance(message, (messages.UndefinedName, messages.UndefinedLocal)):
+                self.found.append(str(message))
+
+        def unexpectedError(self, filename, message):
+            self.found.append(f"{filename}: {message}")
+
+        def syntaxError(self, filename, message, lineno, offset, text):
+            self.found.append(f"{filename}:{lineno}: {message}")
+
+    reporter = Collect()
+    pyflakes_api.checkRecursive([os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")], reporter)
+    assert not reporter.found, "\n".join(reporter.found)
@@ -0,0 +1,66 @@
+"""image_url/thumbnails.py on small generated images (needs Pillow, an optional dependency)."""
+import io
+import os
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from common.kvstore import KeyValueStore
+from common.site import Site
+from image_url import thumbnails
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(thumbnails, "ORIGINALS_DIR", str(tmp_path / "originals"))
+    monkeypatch.setattr(thumbnails, "THUMBNAILS_DIR", str(tmp_path / "thumbnails"))
+    monkeypatch.setattr(thumbnails, "IMAGE_INDEX_PATH", str(tmp_path / "images.sqlite"))
+    return tmp_path
+
+
+def image_bytes(size=(800, 600), color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_make_thumbnails_for(stores):
+    digest = thumbnails.store_original(image_bytes())
+    made = thumbnails.make_thumbnails_for([digest], size=100, workers=1)
+    with Image.open(made[digest]) as thumbnail:
+        assert thumbnail.size == (133, 100)
+        assert thumbnail.format == thumbnails.thumbnail_format().upper()
+
+    # Another size is a different file, not the one just made
+    bigger = thumbnails.make_thumbnails_for([digest], size=200, workers=1)
+    assert bigger[digest] != made[digest]
+    with Image.open(bigger[digest]) as thumbnail:
+        assert min(thumbnail.size) == 200
+
+
+def test_small_images_are_not_scaled_up(stores):
+    digest = thumbnails.store_original(image_bytes((60, 40)))
+    made = thumbnails.make_thumbnails_for([digest], size=100, workers=1)
+    with Image.open(made[digest]) as thumbnail:
+        assert thumbnail.size == (60, 40)
+
+
+def test_add_thumbnails_from_local_images(stores):
+    image_dir = stores / "fixtures"
+    image_dir.mkdir()
+    (image_dir / "Flatiron.png").write_bytes(image_bytes())
+    sites = [Site("Flatiron Building", "skyscrapers", image="https://upload.wikimedia.org/a/ab/Flatiron.png"),
+             Site("No image", "skyscrapers")]
+    thumbnails.add_thumbnails(sites, str(image_dir), size=100)
+    assert sites[0].thumbnail and os.path.exists(os.path.join(thumbnails.ROOT_DIR, sites[0].thumbnail))
+    assert sites[1].thumbnail is None
+
+
+def test_cache_only_downloads_nothing(stores, monkeypatch):
+    monkeypatch.setattr(thumbnails, "CACHE_ONLY", True)
+    index = KeyValueStore(str(stores / "images.sqlite"), table="images")
+    try:
+        assert thumbnails.download_images(["http://127.0.0.1:9/not-there.jpg"], index) == {}
+    finally:
+        index.close()
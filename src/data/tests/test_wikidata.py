@@ -0,0 +1,74 @@
+"""enrich/wikidata.py against the local stand-in for the Wikipedia and Wikidata APIs."""
+import pytest
+
+from common import cache, fetch
+from common.site import Site
+from enrich import mock_wikidata, wikidata
+
+
+def article(claims, places=None):
+    """A title whose mock item has these claims (and, if given, a P131 among places)."""
+    for n in range(10000):
+        title = f"Test Site {n}"
+        entity = mock_wikidata.make_entity(mock_wikidata.fake_qid(title))
+        if not claims <= entity["claims"].keys():
+            continue
+        if places is None or entity["claims"]["P131"][0]["mainsnak"]["datavalue"]["value"]["id"] in places:
+            return title, entity
+    raise LookupError(claims)
+
+
+def link(title):
+    return "https://en.wikipedia.org/wiki/" + title.replace(" ", "_")
+
+
+@pytest.fixture
+def mock_api(tmp_path, monkeypatch):
+    server, base_url = mock_wikidata.start_server()
+    monkeypatch.setattr(fetch, "BASE_OVERRIDE", base_url)
+    monkeypatch.setattr(fetch, "_cache", cache.HttpCache(root=str(tmp_path / "http")))
+    monkeypatch.setattr(wikidata, "WIKIDATA_CACHE_PATH", str(tmp_path / "wikidata.sqlite"))
+    yield mock_wikidata.MockWikidataHandler.calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_enrich_sites(mock_api, tmp_path, monkeypatch):
+    new_title, new = article({"P625", "P18"}, places=mock_wikidata.NEIGHBOURHOODS)
+    kept_title, _ = article({"P625", "P18"})
+    linked_title, linked = article({"P18"})
+    neighbourhood = new["claims"]["P131"][0]["mainsnak"]["datavalue"]["value"]["id"]
+    linked_file = linked["claims"]["P18"][0]["mainsnak"]["datavalue"]["value"]
+    kept_image = "https://upload.wikimedia.org/wikipedia/commons/a/ab/Hand_picked.jpg"
+    sites = [
+        Site("New", "landmarks", wikipedia_link=link(new_title)),
+        Site("Kept", "landmarks", latitude=40.7, longitude=-74.0, image=kept_image,
+             wikipedia_link=link(kept_title)),
+        Site("Linked", "museums", image=f"{link(linked_title)}#/media/File:{linked_file.replace(' ', '_')}",
+             wikipedia_link=link(linked_title)),
+        Site("Missing", "museums", image="x.jpg", wikipedia_link=link("A missing page")),
+        Site("Unlinked", "museums", wikipedia_link=link("An unlinked article")),
+        Site("No link", "museums"),
+    ]
+
+    start = dict(mock_api)
+    wikidata.enrich_sites(sites)
+    assert all(mock_api[api] > start[api] for api in start)
+    first, kept, linked_site, *untouched = sites
+
+    point = new["claims"]["P625"][0]["mainsnak"]["datavalue"]["value"]
+    assert first.coords == (point["latitude"], point["longitude"])
+    assert first.image == wikidata.commons_url(new["claims"]["P18"][0]["mainsnak"]["datavalue"]["value"])
+    assert first.extra["borough"] == mock_wikidata.BOROUGHS[mock_wikidata.NEIGHBOURHOODS[neighbourhood][1]]
+
+    assert kept.coords == (40.7, -74.0) and kept.image == kept_image
+    assert linked_site.image == wikidata.commons_url(linked_file)
+
+    assert [(site.image, site.coords, site.extra) for site in untouched] == [
+        ("x.jpg", None, {}), ("", None, {}), ("", None, {})]
+
+    # Titles and items are cached now: with an empty HTTP cache, a second run asks neither API anything
+    monkeypatch.setattr(fetch, "_cache", cache.HttpCache(root=str(tmp_path / "http2")))
+    before = dict(mock_api)
+    wikidata.enrich_sites([site.copy() for site in sites])
+    assert mock_api == before